@@ -1,26 +1,35 @@
 import streamlit as st
 import pandas as pd
-import os
 import pathlib
 import data_specs
-import matplotlib.pyplot as plt
-from collections.abc import Iterable
+import storage
+import journal_log
+import journal_model
+import derived_columns
+import calendar_view
+import pnl_rollups
+import risk_metrics
+import trade_table
+import image_store
 from datetime import datetime
-from PIL import Image
-import io
-import backtest
-import numpy as np
-import july
-from july.utils import date_range
+
+# Page specific dependencies (matplotlib, july, PIL, backtest with backtrader) are imported where they
+# are used, a cold start only pays for the journal and the dashboard.
+# Import profile and start-up budget: python -m benchmarks.bench_startup
 
 # state and paths
 ROOT_DIR = pathlib.Path(__file__).resolve().parents[0]
-filepath_datastore = ROOT_DIR.joinpath('local_storage').joinpath('trades.csv')
+# journal backend: "parquet", "sqlite" (trades.csv is migrated once on first start) or "csv"
+JOURNAL_BACKEND = "parquet"
+# check the incrementally maintained dashboard statistics against a full recompute on every render
+VERIFY_STATISTICS = False
 filepath_selected_cols = ROOT_DIR.joinpath('local_storage').joinpath('selected_columns.txt')
 st.set_page_config(layout="wide")
 
 # Set pandas to display float format to remove trailing zeros
 pd.options.display.float_format = '{:,.2f}'.format
+# Sessions share the journal frame of the process wide model, copy-on-write keeps their changes local
+pd.set_option("mode.copy_on_write", True)
 
 if 'page' not in st.session_state:
     st.session_state.page = 'Dashboard'
@@ -40,25 +49,24 @@ if 'additional_metrics' not in st.session_state:
 # https://www.investopedia.com/top-7-technical-analysis-tools-4773275
 # https://www.investopedia.com/articles/fundamental-analysis/09/five-must-have-metrics-value-investors.asp
 
+@st.cache_resource
+def open_journal():
+    # One journal model per process, shared by all reruns and browser sessions
+    journal_store = storage.open_store(JOURNAL_BACKEND, ROOT_DIR.joinpath('local_storage'))
+    if JOURNAL_BACKEND != "sqlite":
+        # trade changes to journal files are appended to a mutation log which is compacted from time to time
+        journal_store = journal_log.LoggedStore(journal_store)
+    return journal_model.JournalModel(journal_store, derive_journal)
+
+
 def load_data():
-    if os.path.exists(filepath_datastore):
-        df = pd.read_csv(filepath_datastore)
-        # Convert exit dates to datetime if not already
-        df['tradeinfo_entry_date'] = pd.to_datetime(df['tradeinfo_entry_date'], format="%Y-%m-%d")
-        df['tradeinfo_exit_date'] = pd.to_datetime(df['tradeinfo_exit_date'], format="%Y-%m-%d")
-        print(f"loaded dataframe: {len(df)}")
-        return df
-    else:
-        return pd.DataFrame(columns=data_specs.journal_data_df_colums)
+    # The derived journal is only rebuilt after save_data or an external change of the journal file.
+    # Every page gets a shallow view of the shared frame, projecting columns would not save any reading.
+    return open_journal().view()
 
 
 def save_data(df):
-    # Ensure 'tradeinfo_entry_date' is in datetime format
-    df['tradeinfo_entry_date'] = pd.to_datetime(df['tradeinfo_entry_date'], format="%Y-%m-%d %H:%M:%S")
-    df['tradeinfo_exit_date'] = pd.to_datetime(df['tradeinfo_exit_date'], format="%Y-%m-%d %H:%M:%S")
-    df = df.sort_values(by="tradeinfo_entry_date", ascending=False)
-    df.to_csv(filepath_datastore, index=False)
-    print(f"saved dataframe: {len(df)}")
+    open_journal().save(df)
 
 def save_selected_columns(columns):
     with open(filepath_selected_cols, 'w') as f:
@@ -73,28 +81,70 @@ def load_selected_columns():
         st.error(f"selected_columns in {filepath_selected_cols} not found")
         return []
 
-def color_negative_red_positive_green(val):
-    color = 'red' if val < 1 else 'green' if val > 1 else 'white'
-    return f'background-color: {color}'
-
-
-# Function to categorize columns
-def categorize_column(col_name):
-    if "tradeinfo" in col_name:
-        return 0
-    elif "fundamentals" in col_name:
-        return 1
-    elif "technical" in col_name:
-        return 2
-    elif "human" in col_name:
-        return 3
-    else:
-        return -1
+# Form input for a journal field, the widget is declared in the data_specs schema registry
+def field_input(container, col, spec, value=None):
+    label = get_label(col)
+    missing = value is None or (not isinstance(value, str) and pd.isna(value))
+    if spec.widget == "select":
+        options = list(spec.vocabulary)
+        if not missing and value not in options:
+            # keep values which were entered before the vocabulary changed
+            options = [value] + options
+        # the empty first option keeps a field empty, saving a form unchanged must not fill in a vocabulary entry
+        options = [""] + options
+        selected = container.selectbox(label, options, index=0 if missing else options.index(value))
+        return None if selected == "" else selected
+    if spec.widget == "date":
+        return container.date_input(label, datetime.now() if missing else value)
+    if spec.widget in ("text", "number"):
+        return container.text_input(label, "" if missing else str(value))
+    return value
+
+def trade_labels(trades):
+    # selectbox labels for trades keyed by their trade id
+    return {trade_id: f"{ticker} {entry_date:%d.%m.%Y}" if pd.notna(entry_date) else str(ticker)
+            for trade_id, ticker, entry_date in zip(trades['trade_id'], trades['tradeinfo_Ticker'],
+                                                    trades['tradeinfo_entry_date'])}
+
 
 def get_label(labelstring):
     return " ".join(labelstring.split("_")[1:])
 
 
+@st.cache_resource
+def open_image_store():
+    # Trade screenshots by content hash with thumbnails, one store per process
+    return image_store.ImageStore(ROOT_DIR.joinpath('local_storage').joinpath('images'))
+
+
+def show_trade_image(path, key):
+    # The thumbnail on every rerun, the full picture only when asked for
+    if not isinstance(path, str) or not path:
+        st.write("No Image")
+        return
+    thumbnail = open_image_store().thumbnail(path)
+    if thumbnail is None:
+        st.write(f"IMAGE: Could not read file, does it exist?..  {path}")
+        return
+    st.image(thumbnail, caption='Uploaded Image')
+    if st.checkbox("Show full image", key=key):
+        st.image(open_image_store().full(path), caption='Uploaded Image', use_column_width=True)
+
+
+def collect_images():
+    # pictures of deleted trades and replaced pictures nobody else refers to
+    referenced = open_journal().view(['human_picture_path'])['human_picture_path']
+    removed = open_image_store().collect_garbage(referenced.dropna().tolist())
+    if removed:
+        st.info(f"Removed {len(removed)} unused images.")
+
+
+def derive_journal(df):
+    # Derived columns and rounding, runs once per journal version in the journal model
+    # Gains are only calculated when all prices are given, see derived_columns for the rules
+    return derived_columns.apply_derivations(df)
+
+
 def main():
 
     column1, column2, column3, _4, _5, _6, _7 = st.columns(7)
@@ -118,57 +168,6 @@ def main():
 
     df = load_data()
 
-    #-----------------------------------------------------------------------------------------------------------------
-    # Calculate gains when all prices are given:
-    # Ensure 'tradeinfo_entry_price', 'tradeinfo_exit_price' and 'tradeinfo_number_shares' are in float format
-    df['tradeinfo_entry_price'] = pd.to_numeric(df['tradeinfo_entry_price'], errors='coerce')
-    df['tradeinfo_exit_price'] = pd.to_numeric(df['tradeinfo_exit_price'], errors='coerce')
-    df['tradeinfo_number_shares'] = pd.to_numeric(df['tradeinfo_number_shares'], errors='coerce')
-
-    # Save rows with null 'tradeinfo_entry_price', 'tradeinfo_exit_price' or 'tradeinfo_number_shares'
-    buffer_df = df[df['tradeinfo_entry_price'].isnull() | df['tradeinfo_exit_price'].isnull() | df[
-        'tradeinfo_number_shares'].isnull()]
-
-    # Filter the dataframe to only include rows where 'tradeinfo_entry_price', 'tradeinfo_exit_price' and 'tradeinfo_number_shares' are not null
-    df = df[df['tradeinfo_entry_price'].notnull() & df['tradeinfo_exit_price'].notnull() & df[
-        'tradeinfo_number_shares'].notnull()]
-
-    # Calculate 'tradeinfo_gain_absolut'
-    df['tradeinfo_gain_absolut'] = (df['tradeinfo_exit_price'] - df['tradeinfo_entry_price']) * df[
-        'tradeinfo_number_shares']
-
-    # Calculate 'tradeinfo_gain_percentage'
-    df['tradeinfo_gain_percentage'] = ((df['tradeinfo_exit_price'] / df['tradeinfo_entry_price']) - 1) * 100
-
-    # Append the buffered rows back to the DataFrame
-    df = pd.concat([df, buffer_df], ignore_index=True)
-    # -----------------------------------------------------------------------------------------------------------------
-
-    # Round all columns in the DataFrame
-
-    # Financial figures are typically rounded to 2 decimal places
-    df[['tradeinfo_entry_price', 'tradeinfo_exit_price', 'tradeinfo_fees', 'tradeinfo_tax', 'tradeinfo_gain_absolut',
-        'fundamentals_market_cap', 'fundamentals_free_cash_flow']] = df[['tradeinfo_entry_price',
-        'tradeinfo_exit_price', 'tradeinfo_fees', 'tradeinfo_tax', 'tradeinfo_gain_absolut', 'fundamentals_market_cap',
-                                              'fundamentals_free_cash_flow']].round(2)
-
-    # Percentages are typically rounded to 2 decimal places
-    df[['tradeinfo_gain_percentage', 'technical_RSI']] = df[['tradeinfo_gain_percentage', 'technical_RSI']].round(2)
-
-    # Ratios are typically rounded to 2 decimal places
-    df[['fundamentals_price_to_earning', 'fundamentals_price_to_book', 'fundamentals_dept_to_equity',
-        'fundamentals_PEG_ratio', 'technical_trend_mac_d', 'technical_on_balance_volume',
-        'technical_AD_line', 'technical_ADX', 'technical_aroon_indicator']] = df[['fundamentals_price_to_earning',
-                                                                                  'fundamentals_price_to_book',
-                                                                                  'fundamentals_dept_to_equity',
-                                                                                  'fundamentals_PEG_ratio',
-                                                                                  'technical_trend_mac_d',
-                                                                                  'technical_on_balance_volume',
-                                                                                  'technical_AD_line', 'technical_ADX',
-                                                                                  'technical_aroon_indicator']].round(2)
-
-    # -----------------------------------------------------------------------------------------------------------------
-
     if st.session_state.page == "Dashboard":
         show_dashboard(df)
     elif st.session_state.page == "Manage Trades":
@@ -177,60 +176,40 @@ def main():
         show_analysis(df)
 
 
-def show_dashboard(df):
-    if len(df)>0:
-        # Calculate some basic statistics
-        total_trades = df.shape[0]
-        winning_trades = df[df['tradeinfo_gain_absolut'] > 0].shape[0]
-        losing_trades = df[df['tradeinfo_gain_absolut'] < 0].shape[0]
-        win_rate = winning_trades / total_trades
-
-        average_win = df[df['tradeinfo_gain_absolut'] > 0]['tradeinfo_gain_absolut'].mean()
-        average_loss = df[df['tradeinfo_gain_absolut'] < 0]['tradeinfo_gain_absolut'].mean()
-
-        #---------------------------------------------------------------------------------------------------------------
-
-        # Calculate the total profit from winning trades
-        total_profit = df[df['tradeinfo_gain_absolut'] > 0]['tradeinfo_gain_absolut'].sum()
-
-        # Calculate the total loss from losing trades
-        # Since losses are represented as negative numbers, we need to multiply by -1 to get a positive total loss
-        total_loss = (-1) * df[df['tradeinfo_gain_absolut'] < 0]['tradeinfo_gain_absolut'].sum()
-
-        #---------------------------------------------------------------------------------------------------------------
-
-        # Calculate the Profit Factor
-        profit_factor = round(total_profit / total_loss, 2)
-
-        # Calculate the cumulative returns
-        cumulative_returns = df['tradeinfo_gain_absolut'].cumsum()
-
-        # Calculate the running maximum
-        running_max = cumulative_returns.cummax()
-
-        # Calculate the drawdown
-        drawdown = running_max - cumulative_returns
-
-        # Maximum drawdown in dollar terms
-        max_drawdown_value = round(drawdown.max(),2)
-
-        # Maximum drawdown as a percentage of the portfolio value
-        max_drawdown_percentage = round(drawdown.max() / running_max.max(), 2)
+@st.cache_data(max_entries=32, show_spinner=False)
+def calendar_image(year, metric, journal_version, _day_rollup):
+    # keyed by year, metric and journal version only, the rollup itself is not hashed
+    return calendar_view.render_heatmap(calendar_view.year_days(_day_rollup, year), metric)
 
-        #---------------------------------------------------------------------------------------------------------------
 
-        # Ensure 'tradeinfo_entry_date' and 'tradeinfo_exit_date' are in datetime format
-        df['tradeinfo_entry_date'] = pd.to_datetime(df['tradeinfo_entry_date'])
-        df['tradeinfo_exit_date'] = pd.to_datetime(df['tradeinfo_exit_date'])
+@st.cache_data(max_entries=8, show_spinner=False)
+def risk_metrics_frame(window, journal_version, _stats):
+    # keyed by window and journal version, the trades in exit order come from the statistics engine
+    return risk_metrics.risk_frame(_stats.exit_gains(), window)
 
-        # Filter the dataframe to only include rows where 'tradeinfo_exit_date' is not null
-        df_tradeinfo_exit_date = df[df['tradeinfo_exit_date'].notnull()]
 
-        # Calculate holding period for each trade
-        holding_period = df_tradeinfo_exit_date['tradeinfo_exit_date'] - df_tradeinfo_exit_date['tradeinfo_entry_date']
-
-        # Calculate average holding period
-        average_holding_period = holding_period.mean()
+def show_dashboard(df):
+    if len(df)>0:
+        # Basic statistics are kept as running state and only updated when a trade changes
+        stats = open_journal().statistics()
+        if VERIFY_STATISTICS:
+            mismatches = stats.verify(df)
+            if mismatches:
+                st.error(f"Statistics engine differs from a full recompute: {', '.join(mismatches)}")
+        summary = stats.summary()
+
+        total_trades = summary['total_trades']
+        winning_trades = summary['winning_trades']
+        losing_trades = summary['losing_trades']
+        win_rate = summary['win_rate']
+        average_win = summary['average_win']
+        average_loss = summary['average_loss']
+        profit_factor = summary['profit_factor']
+
+        # Max drawdown is taken in chronological exit order
+        max_drawdown_value = summary['max_drawdown_value']
+        max_drawdown_percentage = summary['max_drawdown_percentage']
+        average_holding_period = summary['average_holding_period']
 
         # ---------------------------------------------------------------------------------------------------------------
 
@@ -262,20 +241,46 @@ def show_dashboard(df):
         # -------------------------------------------------------------------------------------------------------------
         # PLOT GAIN:
         st.subheader("ACCUMULATED GAIN")
-        # Ensure 'tradeinfo_exit_date' is in datetime format
-        df['tradeinfo_exit_date'] = pd.to_datetime(df['tradeinfo_exit_date'])
-
-        # Ensure 'tradeinfo_gain_absolut' is numeric (float or int)
-        df['tradeinfo_gain_absolut'] = pd.to_numeric(df['tradeinfo_gain_absolut'], errors='coerce')
-
-        # Sort dataframe by 'tradeinfo_exit_date'
-        df_acc_gain = df.sort_values('tradeinfo_exit_date')
+        # P&L per day, week, month, quarter and year is kept as running state like the statistics,
+        # the charts read the rollup of the selected zoom level instead of sorting the trades
+        rollups = open_journal().pnl_rollups()
+        if VERIFY_STATISTICS:
+            mismatches = rollups.verify(df)
+            if mismatches:
+                st.error(f"P&L rollups differ from a full recompute: {', '.join(mismatches)}")
+        zoom = st.radio("Zoom level", list(pnl_rollups.rollup_levels), index=2, horizontal=True)
+        rollup = rollups.frame(zoom)
+        st.area_chart(rollup[['equity', 'net_equity']])
+        st.bar_chart(rollup['pnl'])
+        with st.expander(f"P&L per {zoom.lower()}"):
+            st.dataframe(rollup.sort_index(ascending=False), use_container_width=True)
 
-        # Compute accumulated gain
-        df_acc_gain['accumulated_gain'] = df_acc_gain['tradeinfo_gain_absolut'].cumsum()
-
-        # Plot
-        st.area_chart(df_acc_gain.set_index('tradeinfo_exit_date')['accumulated_gain'])
+        # -------------------------------------------------------------------------------------------------------------
+        # ROLLING RISK METRICS over the closed trades in exit order:
+        st.subheader("ROLLING RISK METRICS")
+        window = st.number_input("Window [trades]", min_value=2, value=20, step=1)
+        risk = risk_metrics_frame(int(window), open_journal().version, stats)
+        drawdown = risk_metrics.drawdown_summary(risk)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Longest drawdown [trades]", drawdown['longest_trades'])
+        with col2:
+            st.metric("Longest drawdown [days]", drawdown['longest_days'])
+        with col3:
+            st.metric("Current drawdown [trades]", drawdown['current_trades'])
+        with col4:
+            st.metric("Current drawdown [days]", drawdown['current_days'])
+        col1, col2 = st.columns(2)
+        with col1:
+            st.caption(f"Sharpe and Sortino ratio per trade of the last {int(window)} trades")
+            st.line_chart(risk[['sharpe', 'sortino']])
+            st.caption("Underwater curve: equity below its running high")
+            st.area_chart(risk['underwater'])
+        with col2:
+            st.caption(f"Win rate [%] of the last {int(window)} trades")
+            st.line_chart(risk['win_rate'])
+            st.caption(f"Expectancy [EUR] of the last {int(window)} trades")
+            st.line_chart(risk['expectancy'])
 
         # -------------------------------------------------------------------------------------------------------------
         # PLOT ADDITIONAL METRICS:
@@ -304,8 +309,6 @@ def show_dashboard(df):
 
         # second plot for comparing different units
         st.session_state.metric2 = st.selectbox('Select metric 2:', options=metrics2)
-        # Sort DataFrame by date
-        df_sorted = df.sort_values('tradeinfo_exit_date')
 
         # Plot
         counts = df[st.session_state.metric2].value_counts()
@@ -315,44 +318,15 @@ def show_dashboard(df):
         # Plot proftable days and negative days in a heatmap:
 
         st.subheader("CALENDAR VIEW: Trade activity and profitable days")
-        # Parse dates and sort by date
-        df_temp = df.copy()  # create a copy of df to avoid changing it
-        df_temp["tradeinfo_exit_date"] = pd.to_datetime(df_temp["tradeinfo_exit_date"])
-        df_temp.sort_values(by="tradeinfo_exit_date", inplace=True)
-
-        # Create a column for the year
-        df_temp["year"] = df_temp["tradeinfo_exit_date"].dt.year
-
-        # Get unique years and create dropdown menu
-        unique_years = df_temp["year"].unique()
-        selected_year = st.selectbox("Select a Year", unique_years)
-
-        # Filter the DataFrame based on the selected year
-        df_temp = df_temp[df_temp["year"] == selected_year]
-
-        # Here, 'osl_df' is a pandas df.
-        dates = date_range("2020-01-01", "2020-12-31")
-        data = np.random.randint(0, 14, len(dates))
-
-        fig, ax = plt.subplots()
-
-        july.heatmap(dates,
-            data,
-            ax=ax,
-            month_grid=True,
-            horizontal=True,
-            value_label=False,
-            date_label=False,
-            weekday_label=True,
-            month_label=True,
-            year_label=True,
-            fontsize=8,
-            title=None,
-            titlesize='medium',
-            dpi=140,
-            cmap="github")
-
-        st.pyplot(fig)
+        years = rollups.years()
+        if years:
+            col1, col2 = st.columns(2)
+            selected_year = col1.selectbox("Select a Year", years)
+            metric = col2.radio("Show per day", list(calendar_view.calendar_metrics), horizontal=True)
+            # the same year and journal version always give the same picture, reruns reuse it
+            st.image(calendar_image(selected_year, metric, open_journal().version, rollups.frame("Day")))
+        else:
+            st.info("No closed trades yet.")
 
 
     else:
@@ -361,6 +335,7 @@ def show_dashboard(df):
 
 
 def show_manage_trades(df):
+    journal = open_journal()
     with st.expander("Open new trade"):
         with st.form(key='new_trade_form'):
             st.header('Open Trade')
@@ -370,211 +345,109 @@ def show_manage_trades(df):
             uploaded_file = st.file_uploader("Upload an image")
 
             if uploaded_file is not None:
-                # Create the images directory if it doesn't already exist
-                images_dir = ROOT_DIR.joinpath('local_storage').joinpath('images')
-                images_dir.mkdir(parents=True, exist_ok=True)
-
-                # Save the uploaded file to the images directory
-                uploaded_file_path = images_dir.joinpath(uploaded_file.name)
-                with open(uploaded_file_path, 'wb') as out_file:
-                    out_file.write(uploaded_file.read())
-
+                # Stored by content, the same picture uploaded twice is kept once
+                uploaded_file_path = open_image_store().put(uploaded_file.getvalue(), uploaded_file.name)
                 st.success(f"Image saved to {uploaded_file_path}")
 
             cols = st.columns(4)
-            for col in df.columns:
-                # Categorize the column
-                category = categorize_column(col)
-
-                # If the column belongs to one of the categories, create a text input for it in the corresponding column
-                if category >= 0:
-                    label = " ".join(col.split("_")[1:])
-                    if "sector" in label:
-                        open_trade_data[col] = cols[category].selectbox(f"{label}", data_specs.sectors)
-                    elif "market cap" in label:
-                        open_trade_data[col] = cols[category].selectbox(f"{label}", data_specs.market_cap_ranges)
-                    elif "risk reward ratio" in label:
-                        open_trade_data[col] = cols[category].selectbox(f"{label}", data_specs.risk_reward_ratios)
-                    elif "market sentiment" in label:
-                        open_trade_data[col] = cols[category].selectbox(f"{label}", data_specs.market_sentiment)
-                    elif "analyst rating" in label:
-                        open_trade_data[col] = cols[category].selectbox(f"{label}", data_specs.analyst_ratings)
-                    elif "mood on entry" in label:
-                        open_trade_data[col] = cols[category].selectbox(f"{label}", data_specs.sorted_moods)
-                    elif "entry date" in label:
-                        open_trade_data[col] = cols[category].date_input(f"{label}", datetime.now())
-                    elif "picture path" in label:
-                        open_trade_data[col] = str(uploaded_file_path)
+            for col, spec in data_specs.journal_schema.items():
+                # Fields are placed in the form column of their category, see the data_specs schema registry
+                if spec.category >= 0:
+                    if spec.widget == "picture":
+                        open_trade_data[col] = str(uploaded_file_path) if uploaded_file_path else None
+                    elif spec.on_open:
+                        open_trade_data[col] = field_input(cols[spec.category], col, spec)
                     else:
-                        close_trade_labels = ["mood on exit", "mistake", "reflection for", "exit date", "exit price", "tax", "fees", "gain"]
-                        if not any(close_trade_label in label for close_trade_label in close_trade_labels):
-                            open_trade_data[col] = cols[category].text_input(f"{label}")
-                        else:
-                            open_trade_data[col] = None
+                        open_trade_data[col] = None
 
             open_button = st.form_submit_button(label='Open Trade')
 
             if open_button:
-                # Append the new trade to the DataFrame
-                df.loc[len(df)] = open_trade_data
-                save_data(df)
+                # Append the new trade to the journal
+                journal.open_trade(open_trade_data)
                 st.success('Trade opened successfully!')
 
     with st.expander("Close Trade"):
         # Let the user select a trade to edit
-        # Filter DataFrame where 'tradeinfo_exit_price' is NaN
-        open_trades = df[df['tradeinfo_exit_price'].isna()]
-
-        # open_trades = ensure_iterable(open_trades.index)
+        # Only the open trades of the journal model, keyed by their trade id
+        open_trades = journal.open_trades(['trade_id', 'tradeinfo_Ticker', 'tradeinfo_entry_date'])
+        open_trade_labels = trade_labels(open_trades)
 
-        # Use the filtered DataFrame in the selectbox
-        trade_to_close = st.selectbox('Select a trade to close', open_trades.index)
+        # Use the open trades in the selectbox
+        trade_to_close = st.selectbox('Select a trade to close', open_trades['trade_id'],
+                                      format_func=open_trade_labels.get)
 
         # Create the form to edit the selected trade
         if trade_to_close is not None:
+            trade = journal.get_trade(trade_to_close)
+            # outside of the form, so asking for the full image reruns right away
+            show_trade_image(trade["human_picture_path"], 'close_full_image')
             with st.form(key='close_trade_form'):
-                st.header(f'Close Trade {trade_to_close}')
+                st.header(f'Close Trade {open_trade_labels[trade_to_close]}')
                 close_trade_data = {}
 
-                image_path = None
-                if df.loc[trade_to_close, "human_picture_path"]:
-                    image_path = pathlib.Path(str(df.loc[trade_to_close, "human_picture_path"]))
-
-                # Check if the path is valid
-                if image_path is not None:
-                    try:
-                        image = Image.open(image_path)
-                        st.image(image, caption='Uploaded Image', width=800)
-                    except IOError as e:
-                        st.write(f"IMAGE: Could not read file, does it exist?..  {image_path}: {e}")
-                else:
-                    st.write("IMAGE: The image file does not exist.")
-
-
                 # Create 4 columns
                 cols = st.columns(4)
 
-                for col in df.columns:
-                    # Categorize the column
-                    category = categorize_column(col)
-                    default_value = df.loc[trade_to_close, col]
-
-                    # If the column belongs to one of the categories, create a text input for it in the corresponding column
-                    if category >= 0:
-                        label = " ".join(col.split("_")[1:])
-                        if "Ticker" in label:
-                            close_trade_data[col] = cols[category].text_input(f"{label}",default_value)
-                        if "entry date" in label:
-                            close_trade_data[col] = cols[category].date_input(f"{label}",default_value)
-                        elif "mood on exit" in label:
-                            close_trade_data[col] = cols[category].selectbox(f"{label}",
-                                                                             data_specs.sorted_moods)
-                        elif "mistake" in label:
-                            close_trade_data[col] = cols[category].selectbox(f"{label}",
-                                                                            data_specs.trading_mistakes)
-                        elif "exit date" in label:
-                            close_trade_data[col] = cols[category].date_input(f"{label}", datetime.now())
+                for col in trade.index:
+                    spec = data_specs.field_spec(col)
+                    default_value = trade[col]
+
+                    # Only the fields entered on closing get an input, all others keep their value
+                    if spec.category >= 0:
+                        if spec.on_close:
+                            close_trade_data[col] = field_input(cols[spec.category], col, spec, default_value)
                         else:
-                            close_trade_labels = ["reflection for", "exit price", "entry price"]
-                            if any(close_trade_label in label for close_trade_label in close_trade_labels):
-                                close_trade_data[col] = cols[category].text_input(f"{label}", default_value)
-                            else:
-                                close_trade_data[col] = default_value
+                            close_trade_data[col] = default_value
 
                 close_button = st.form_submit_button(label='Close Trade')
 
                 if close_button:
-                    # Update the trade in the DataFrame
-                    for col in df.columns:
-                        df.loc[trade_to_close, col] = close_trade_data[col]
-                    save_data(df)
-                    st.success(f'Trade {trade_to_close} closed successfully!')
+                    # Update the trade in the journal
+                    journal.close_trade(trade_to_close, close_trade_data, trade)
+                    st.success(f'Trade {open_trade_labels[trade_to_close]} closed successfully!')
         else:
             st.info("No open trades")
 
 
     with st.expander("Edit trade"):
         # Let the user select a trade to edit which is already closed:
-        closed_trades = df[df['tradeinfo_exit_price'].notna()]
-        trade_to_edit = st.selectbox('Select a trade to edit', closed_trades.index)
+        closed_trades = journal.closed_trades(['trade_id', 'tradeinfo_Ticker', 'tradeinfo_entry_date'])
+        closed_trade_labels = trade_labels(closed_trades)
+        trade_to_edit = st.selectbox('Select a trade to edit', closed_trades['trade_id'],
+                                     format_func=closed_trade_labels.get)
+
+        trade = journal.get_trade(trade_to_edit) if trade_to_edit is not None else None
+        if trade is not None:
+            show_trade_image(trade["human_picture_path"], 'edit_full_image')
 
         # Create the form to edit the selected trade
         with st.form(key='edit_trade_form'):
-            st.header(f'Edit Trade {trade_to_edit}')
+            st.header(f'Edit Trade {closed_trade_labels.get(trade_to_edit, "")}')
             edit_trade_data = {}
 
-            image_path = None
-
-            if trade_to_edit is not None:
-
-                if df.loc[trade_to_edit, "human_picture_path"]:
-                    image_path = pathlib.Path(str(df.loc[trade_to_edit, "human_picture_path"]))
-
-                    # Check if the path is valid
-                if image_path is not None:
-                    try:
-                        image = Image.open(image_path)
-                        st.image(image, caption='Uploaded Image', width=800)
-                    except IOError as e:
-                        st.write(f"IMAGE: Could not read file, does it exist?..  {image_path}: {e}")
-                else:
-                    st.write("No Image")
-
+            if trade is not None:
                 uploaded_file = st.file_uploader("Change the Image")
 
 
                 # Create 4 columns
                 cols = st.columns(4)
 
-                for col in df.columns:
-                    # Categorize the column
-                    category = categorize_column(col)
-                    default_value = df.loc[trade_to_edit, col]
-
-                    # If the column belongs to one of the categories, create a text input for it in the corresponding column
-                    if category >= 0:
-                        label = " ".join(col.split("_")[1:])
-                        if "sector" in label:
-                            edit_trade_data[col] = cols[category].selectbox(f"{label}", [default_value] + data_specs.sectors)
-                        elif "market cap" in label:
-                            edit_trade_data[col] = cols[category].selectbox(f"{label}",
-                                                                            [default_value] + data_specs.market_cap_ranges)
-                        elif "risk reward ratio" in label:
-                            edit_trade_data[col] = cols[category].selectbox(f"{label}",
-                                                                            [default_value] + data_specs.risk_reward_ratios)
-                        elif "market sentiment" in label:
-                            edit_trade_data[col] = cols[category].selectbox(f"{label}", [default_value] + data_specs.market_sentiment)
-                        elif "analyst rating" in label:
-                            edit_trade_data[col] = cols[category].selectbox(f"{label}", [default_value] + data_specs.analyst_ratings)
-                        elif "mood" in label:
-                            edit_trade_data[col] = cols[category].selectbox(f"{label}", [default_value] + data_specs.sorted_moods)
-                        elif "mistake" in label:
-                            edit_trade_data[col] = cols[category].selectbox(f"{label}", [default_value] + data_specs.trading_mistakes)
-                        elif "date" in label:
-                            edit_trade_data[col] = cols[category].date_input(f"{label}", default_value)
-                        elif "picture path" in label:
-                            if uploaded_file:
-                                default_value = ROOT_DIR.joinpath('local_storage').joinpath('images').joinpath(uploaded_file.name)
-                                with open(default_value, 'wb') as out_file:
-                                    out_file.write(uploaded_file.read())
-
-                                # delete old picture
-                                try:
-                                    os.remove(image_path)
-                                    st.info(f"File {image_path} has been deleted.")
-                                except FileNotFoundError:
-                                    st.info(f"File {image_path} not found.")
-                                except PermissionError:
-                                    st.info(f"Permission denied.")
-                                except Exception as e:
-                                    st.info(f"An error occurred: {e}")
-                            edit_trade_data[col] = default_value
+                for col in trade.index:
+                    spec = data_specs.field_spec(col)
+                    default_value = trade[col]
 
+                    # Every field which is not calculated gets an input in the form column of its category
+                    if spec.category >= 0:
+                        if spec.widget == "derived":
+                            edit_trade_data[col] = default_value
+                        elif spec.widget != "picture":
+                            edit_trade_data[col] = field_input(cols[spec.category], col, spec, default_value)
                         else:
-                            if not 'gain' in label:
-                                edit_trade_data[col] = cols[category].text_input(f"{label}", value=default_value)
-                            else:
-                                edit_trade_data[col] = default_value
+                            if uploaded_file:
+                                # the old picture is removed by collect_images once no trade uses it
+                                default_value = open_image_store().put(uploaded_file.getvalue(), uploaded_file.name)
+                            edit_trade_data[col] = default_value
 
             else:
                 st.info("No closed trades in your trades list.")
@@ -586,58 +459,101 @@ def show_manage_trades(df):
             submit_button = cols[0].form_submit_button(label='Submit Changes')
             delete_button = cols[1].form_submit_button('Delete Trade')
 
-            if submit_button:
-                # Update the trade in the DataFrame
-                for col in df.columns:
-                    df.loc[trade_to_edit, col] = edit_trade_data[col]
-                save_data(df)
-                st.success(f'Trade {trade_to_edit} updated successfully!')
+            if submit_button and trade_to_edit is not None:
+                # Update the trade in the journal
+                journal.edit_trade(trade_to_edit, edit_trade_data, trade)
+                collect_images()
+                st.success(f'Trade {closed_trade_labels[trade_to_edit]} updated successfully!')
 
             if trade_to_edit is not None:
                 if delete_button:
-                    # Delete the trade from the DataFrame
-                    df = df.drop(trade_to_edit)
-                    save_data(df)
-                    st.success(f'Trade {trade_to_edit} deleted successfully!')
+                    # Delete the trade from the journal
+                    journal.delete_trade(trade_to_edit)
+                    collect_images()
+                    st.success(f'Trade {closed_trade_labels[trade_to_edit]} deleted successfully!')
 
 
     default_columns = load_selected_columns()
-    #default_columns = [get_label(label) for label in default_columns]
-    #st.text(default_columns)
     selected_columns = st.multiselect("Select the columns you want to display", df.columns, default=default_columns)
 
-    col1, col2, col3, col4 = st.columns(4)
-
     if selected_columns:
-        # Create a list of all columns in selected_columns containing 'gain'
-        gain_columns = [s for s in selected_columns if "gain" in s]
-
-        if gain_columns:
-            #st.markdown(styled_df.to_html(escape=False), unsafe_allow_html=True)
-            keys = df.columns
-            my_dict = {key: key.split('_', 1)[1] for key in keys}
-            my_dict["tradeinfo_entry_date"] = st.column_config.DateColumn(
-                "entry_date",
-                format="DD.MM.YYYY",
-                step=1
-            )
-            my_dict["tradeinfo_exit_date"] = st.column_config.DateColumn(
-                "exit_date",
-                format="DD.MM.YYYY",
-                step=1
-            )
-            st.dataframe(df.style.applymap(color_negative_red_positive_green, subset=['tradeinfo_gain_percentage']), column_order=selected_columns, column_config=my_dict, use_container_width=True)
-        else:
-            st.dataframe(df, column_order=selected_columns, column_config=my_dict, use_container_width=True)
-
+        show_trade_table(journal.table_index(), selected_columns)
         save_selected_columns(selected_columns)
     else:
         st.write("Select columns from selectbox!")
 
 
+def show_trade_table(index, selected_columns):
+    # Filtering, sorting and paging run on the server, only the visible page is styled and sent
+    col1, col2, col3, col4 = st.columns(4)
+    tickers = col1.multiselect("Ticker", index.options('tradeinfo_Ticker'))
+    sectors = col2.multiselect("Sector", index.options('fundamentals_sector'))
+    moods = col3.multiselect("Mood on entry", index.options('human_mood_on_entry'))
+    status = col4.radio("Trades", [trade_table.STATUS_ALL, trade_table.STATUS_OPEN, trade_table.STATUS_CLOSED],
+                        horizontal=True)
+
+    col1, col2, col3, col4 = st.columns(4)
+    search = col1.text_input("Search (ticker, ideas, mistakes, reflections)")
+    entry_between = col2.date_input("Entry date between", value=())
+    sort_by = col3.selectbox("Sort by", selected_columns,
+                             index=selected_columns.index('tradeinfo_entry_date')
+                             if 'tradeinfo_entry_date' in selected_columns else 0)
+    ascending = col4.radio("Order", ["Descending", "Ascending"], horizontal=True) == "Ascending"
+
+    # the date range is only applied once both ends are picked
+    mask = index.mask(tickers, status, sectors, moods,
+                      tuple(entry_between) if len(entry_between) == 2 else None, search.strip())
+    rows = index.rows(mask, sort_by, ascending)
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    page_size = col1.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+    pages = trade_table.page_count(rows, page_size)
+    page = col2.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+    col3.caption(f"{len(rows)} of {len(index)} trades, page {min(page, pages)} of {pages}")
+
+    column_config = {key: key.split('_', 1)[1] for key in selected_columns if '_' in key}
+    column_config["tradeinfo_entry_date"] = st.column_config.DateColumn("entry_date", format="DD.MM.YYYY", step=1)
+    column_config["tradeinfo_exit_date"] = st.column_config.DateColumn("exit_date", format="DD.MM.YYYY", step=1)
+    visible = index.page(rows, min(page, pages) - 1, page_size)[selected_columns]
+    st.dataframe(trade_table.style_page(visible), column_order=selected_columns, column_config=column_config,
+                 use_container_width=True, hide_index=True)
+
+
+# Rankings of the per symbol table: (title, metric, largest first)
+symbol_rankings = [
+    ("Most profitable", "net_profit", True),
+    ("Least profitable", "net_profit", False),
+    ("Highest win rate [%]", "win_rate", True),
+    ("Most traded", "trades", True),
+]
+
+
 def show_analysis(df):
+    show_symbol_performance()
+    import backtest
     backtest.show_backtest()
 
 
+def show_symbol_performance():
+    # Per ticker aggregates are kept as running state by the journal model, nothing is regrouped on a rerun
+    st.subheader("PERFORMANCE PER SYMBOL")
+    symbols = open_journal().symbol_statistics()
+    if not symbols:
+        st.info("Your trading list is empty! In order to add trades, go to Manage Trades.")
+        return
+    if VERIFY_STATISTICS:
+        mismatches = symbols.verify(open_journal().view())
+        if mismatches:
+            st.error(f"Symbol statistics differ from a full recompute: {', '.join(mismatches)}")
+
+    min_results = st.number_input("Closed trades a symbol needs for the rankings", min_value=1, value=1, step=1)
+    for col, (title, metric, largest) in zip(st.columns(len(symbol_rankings)), symbol_rankings):
+        col.caption(title)
+        top = pd.DataFrame(symbols.top(metric, 5, largest, min_results), columns=["ticker", metric])
+        col.dataframe(top, hide_index=True, use_container_width=True)
+    with st.expander(f"All symbols ({len(symbols)})", expanded=False):
+        st.dataframe(symbols.table(), use_container_width=True)
+
+
 if __name__ == "__main__":
     main()
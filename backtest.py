@@ -1,55 +1,77 @@
 import streamlit as st
-import yfinance as yf
 import backtrader as bt
-from backtrader.feeds import PandasData
 import numpy as np
 import datetime
-import importlib
-import os
-
-strategies_dict = {}
-
-# Define the directory where your strategy files are located
-directory = 'strategies'
-
-# Iterate over all Python files in the directory
-for filename in os.listdir(directory):
-    if filename.endswith('.py'):
-        # Remove the .py part to get the module name
-        module_name = filename[:-3]
-        # Import the module
-        module = importlib.import_module(f'{directory}.{module_name}')
-        # Assume each file only has one class, get that class
-        # Note: This will only get the first class in each file
-        strategy_class = next(c for n, c in module.__dict__.items() if isinstance(c, type))
-        # Add the class to the dictionary
-        strategies_dict[module_name] = strategy_class
-
-@st.cache_data  # cache
-def load_OHLC(ticker, start_date, end_date):
-    data = yf.download(ticker, start=start_date, end=end_date)
-    return data
-
-@st.cache_data  # cache
+import pathlib
+import ohlc_cache
+import info_cache
+import backtest_engine
+import backtest_batch
+import backtest_optimize
+import backtest_charts
+import backtest_cache
+import vector_backtest
+import strategy_registry
+from backtest_engine import ExtendedPandasData
+
+@st.cache_resource
+def open_strategy_registry():
+    # Strategies are discovered by scanning the source files, a module is imported when its strategy is selected
+    return strategy_registry.StrategyRegistry(pathlib.Path(__file__).resolve().parent.joinpath('strategies'))
+
+
+def load_strategy(key):
+    try:
+        return open_strategy_registry().load(key)
+    except Exception as e:
+        st.error(f"Strategy {key} could not be loaded: {e}")
+        return None
+
+
+@st.cache_resource
+def result_store():
+    # Backtest results by content address of their inputs, shared by all sessions and kept across restarts
+    return backtest_cache.BacktestCache(pathlib.Path(__file__).resolve().parent.joinpath('local_storage')
+                                        .joinpath('backtests'))
+
+
+# Only serve bars which are already in the local OHLC cache, no downloads
+OHLC_OFFLINE = False
+# Seeded synthetic bars per ticker instead of yfinance, reproducible backtests without network
+OHLC_SYNTHETIC = False
+
+
+@st.cache_resource
+def ohlc_store():
+    # Persistent bar cache shared by all sessions, survives restarts and date range changes
+    if OHLC_SYNTHETIC:
+        import synthetic_ohlc
+        return ohlc_cache.OHLCCache(ohlc_cache_directory(), downloader=synthetic_ohlc.SyntheticDownloader(),
+                                    offline=OHLC_OFFLINE)
+    return ohlc_cache.OHLCCache(ohlc_cache_directory(), downloader=ohlc_cache.YahooDownloader(), offline=OHLC_OFFLINE)
+
+
+def load_OHLC(ticker, start_date, end_date, offline=None):
+    return ohlc_store().load(ticker, start_date, end_date, offline=offline)
+
+@st.cache_resource
+def info_store():
+    # Ticker fundamentals, served from disk and refreshed in the background once older than a day
+    return info_cache.InfoCache(str(pathlib.Path(__file__).resolve().parent.joinpath('local_storage')
+                                    .joinpath('ticker_info.sqlite')), fetch=info_cache.yahoo_info, ttl=24 * 60 * 60)
+
+
 def load_INFO(ticker):
-    return yf.Ticker(ticker).info
-
-# Class to hold your custom fundamental/technical data
-class ExtendedPandasData(PandasData):
-    lines = (
-        'price_to_earning',
-        'price_to_book',
-        'dept_to_equity',
-        'free_cash_flow',
-        'PEG_ratio',
-        'RSI',
-        'mac_d',
-        'on_balance_volume',
-        'AD_line',
-        'ADX',
-        'aroon_indicator',
-    )
-    params = ((col, -1) for col in lines)
+    return info_store().get(ticker)
+
+# Tickers offered by the watchlist selector and as default of the batch backtest
+watchlist = ["AAPL", "TSLA", "NFLX", "S92.DE"]
+
+
+def ohlc_cache_directory():
+    # synthetic bars are cached apart, they must never mix with downloaded ones
+    return pathlib.Path(__file__).resolve().parent.joinpath('local_storage').joinpath(
+        'ohlc_synthetic' if OHLC_SYNTHETIC else 'ohlc')
 
 
 def show_backtest():
@@ -70,18 +92,25 @@ def show_backtest():
         if ticker_list == "Manual selection":
             ticker = st.text_input("Choose Ticker", 'AAPL')
         if ticker_list == "Watchlist":
-            ticker = st.selectbox("Chosse from Watchlist", ["APPL", "TSLA", "NFLX", "S92.DE"])
+            ticker = st.selectbox("Chosse from Watchlist", watchlist)
         if ticker_list == "Open Trades":
             ticker = st.selectbox("Chosse from Open Trades", ["APPL", "TSLA", "NFLX"])
     with col2:
         start_date = st.date_input("Start Date", value=datetime.date(2021,1, 1))
-        strategy_chosen = st.selectbox("Select Strategy", strategies_dict.keys())
+        strategy_chosen = st.selectbox("Select Strategy", open_strategy_registry().keys())
+        if strategy_chosen is not None and open_strategy_registry().info(strategy_chosen).doc:
+            st.caption(open_strategy_registry().info(strategy_chosen).doc)
     with col3:
         end_date = st.date_input("End Date")
         stake = int(st.text_input("Set trade stake", value=5))
     with col4:
         cash = int(st.text_input("Set start cash", value=1000))
         comission = float(st.text_input("Comission [%]", value=0.1))
+        offline = st.checkbox("Offline (cached data only)", value=OHLC_OFFLINE)
+    if open_strategy_registry().errors:
+        with st.expander("Strategy files with problems", expanded=False):
+            for path, message in open_strategy_registry().errors.items():
+                st.write(f"{path}: {message}")
     st.subheader('Backtrader Integration')
 
 
@@ -95,72 +124,168 @@ def show_backtest():
             info_dict = load_INFO(ticker)
     with button_col2:
         if st.button('Run backtest'):
-            OHLC_dataframe = load_OHLC(ticker=ticker, start_date=start_date, end_date=end_date)
+            OHLC_dataframe = load_OHLC(ticker=ticker, start_date=start_date, end_date=end_date, offline=offline)
 
 
     if info_dict:
         st.write(info_dict)
 
+    if OHLC_dataframe is not None and OHLC_dataframe.empty:
+        # offline without cached bars, unknown ticker or no trading days in the range: nothing to run or to store
+        st.info(f"No data for {ticker} from {start_date} to {end_date}"
+                + (" in the offline cache." if offline else "."))
+        OHLC_dataframe = None
+        st.session_state.backtest_result = None
 
-    if OHLC_dataframe is not None:
-        cerebro = bt.Cerebro()
+    strategy = load_strategy(strategy_chosen) if OHLC_dataframe is not None else None
+    if strategy is not None:
+        info = open_strategy_registry().info(strategy_chosen)
+        key = backtest_cache.result_key(pathlib.Path(info.path).read_text(encoding="utf-8"), info.class_name, {},
+                                        ticker, start_date, end_date, stake, cash, comission, OHLC_dataframe)
+        # identical inputs and bars -> the stored result, cerebro only runs on a miss
+        result = result_store().get(key)
+        if result is None:
+            result = run_backtest(OHLC_dataframe, strategy, cash, stake, comission, start_date, end_date)
+            result_store().put(key, result)
+        st.session_state.backtest_result = result
 
-        # Add combined strategy to cerebro
-        cerebro.addstrategy(strategies_dict[strategy_chosen])
+    if st.session_state.get('backtest_result') is not None:
+        show_backtest_result(st.session_state.backtest_result)
 
-        # Pass it to the backtrader datafeed and add it to the cerebro
-        data_feed = ExtendedPandasData(dataname=OHLC_dataframe)
-        cerebro.adddata(data_feed)
-        # Add resampled data for Pivot Indicator resampled data: data1
-        data1 = cerebro.resampledata(data_feed, timeframe=bt.TimeFrame.Months, compression=1)
-        data1.plotinfo.plot = False
+    show_batch_backtest(strategy_chosen, start_date, end_date, cash, stake, comission, offline)
+    show_optimization(ticker, strategy_chosen, start_date, end_date, cash, stake, comission, offline)
 
-        # set cash
-        cerebro.broker.setcash(cash=cash)
-        # Add a FixedSize sizer according to the stake
-        cerebro.addsizer(bt.sizers.FixedSize, stake=stake)
 
-        # 0.1% ... divide by 100 to remove the %
-        cerebro.broker.setcommission(commission=(comission/100))
+def run_backtest(OHLC_dataframe, strategy, cash, stake, comission, start_date, end_date):
+    cerebro = backtest_engine.build_cerebro(OHLC_dataframe, strategy, cash, stake, comission)
+    backtest_charts.add_chart_analyzers(cerebro)
 
-        # Add the analyzer to the Cerebro engine
-        cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name="tradeanalyzer")
+    # RUN
+    # Print out the starting conditions
+    start_cash = cerebro.broker.getvalue()
+    results = cerebro.run()
+    strat = results[0]
+    protfolio_value = cerebro.broker.getvalue()
+    account_cash = cerebro.broker.getcash()
+    backtested_days = end_date - start_date
 
-        # RUN
-        # Print out the starting conditions
-        start_cash = cerebro.broker.getvalue()
-        results = cerebro.run()
-        strat = results[0]
-        protfolio_value = cerebro.broker.getvalue()
-        account_cash = cerebro.broker.getcash()
-        backtested_days = end_date - start_date
+    try:
+        print('\n# Stats: -----------------------------------------------------------')
+        print('Starting Portfolio Value: %.2f' % start_cash)
+        # Print out the final result
+        print('Final Portfolio Value: %.2f' % protfolio_value)
+        print('Remaining Cash: %.2f' % account_cash)
+        print('Gain: %.2f' % (protfolio_value + account_cash - start_cash))
+        print("Total trades:", strat.analyzers.tradeanalyzer.get_analysis().total.closed)
+        print("Total wins:", strat.analyzers.tradeanalyzer.get_analysis().won.total)
+        print("Total losses:", strat.analyzers.tradeanalyzer.get_analysis().lost.total)
+        # calculate the win rate
+        win_rate = strat.analyzers.tradeanalyzer.get_analysis().won.total / strat.analyzers.tradeanalyzer.get_analysis().total.closed
+        print('Win Rate: %.2f%%' % (win_rate * 100))
+        print(f'Backtested days: {backtested_days.days}')
+        print('# -------------------------------------------------------------------\n')
+    except KeyError as e:
+        print(f"Keyerror: {e}")
+
+    return {
+        'summary': backtest_engine.summarize(strat),
+        'analysis': backtest_cache.plain(strat.analyzers.tradeanalyzer.get_analysis()),
+        'lines': backtest_charts.extract_lines(strat),
+        # strategies not based on strategy_events.EventStrategy have no events
+        'events': strat.events.to_frame() if hasattr(strat, 'events') else None,
+    }
+
+
+def show_backtest_result(result):
+    summary = result['summary']
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Trades", summary['trades'])
+    col2.metric("Win rate", f"{summary['win_rate']:.1f} %")
+    col3.metric("Final value", f"{summary['final_value']:.2f}", f"{summary['gain']:.2f}")
+    col4.metric("Max drawdown", f"{summary['max_drawdown']:.1f} %")
+    cache_stats = result_store().stats()
+    col5.metric("Result cache hits / misses", f"{cache_stats['hits']} / {cache_stats['misses']}")
+    show_backtest_chart(result['lines'])
+    with st.expander(f"Closed trades ({len(result['lines']['trades'])})", expanded=False):
+        st.dataframe(result['lines']['trades'], use_container_width=True)
+    events = result.get('events')
+    if events is not None:
+        with st.expander(f"Strategy events ({len(events)})", expanded=False):
+            st.dataframe(events, use_container_width=True)
 
-        try:
-            print('\n# Stats: -----------------------------------------------------------')
-            print('Starting Portfolio Value: %.2f' % start_cash)
-            # Print out the final result
-            print('Final Portfolio Value: %.2f' % protfolio_value)
-            print('Remaining Cash: %.2f' % account_cash)
-            print('Gain: %.2f' % (protfolio_value + account_cash - start_cash))
-            print("Total trades:", strat.analyzers.tradeanalyzer.get_analysis().total.closed)
-            print("Total wins:", strat.analyzers.tradeanalyzer.get_analysis().won.total)
-            print("Total losses:", strat.analyzers.tradeanalyzer.get_analysis().lost.total)
-            # calculate the win rate
-            win_rate = strat.analyzers.tradeanalyzer.get_analysis().won.total / strat.analyzers.tradeanalyzer.get_analysis().total.closed
-            print('Win Rate: %.2f%%' % (win_rate * 100))
-            print(f'Backtested days: {backtested_days.days}')
-            print('# -------------------------------------------------------------------\n')
-        except KeyError as e:
-            print(f"Keyerror: {e}")
-
-        cerebro.plot(start=start_date, end=end_date,
-        #  Format string for the display of ticks on the x axis
-        fmt_x_ticks = '%Y-%b-%d %H:%M',
-        # Format string for the display of data points values
-        fmt_x_data = '%Y-%b-%d %H:%M', style='candlestick', barup='green', bardown='red')
-
-        # Display the data
-        st.write(OHLC_dataframe)
 
+def show_backtest_chart(lines):
+    # The chart is drawn from the lines of the last run kept in the session, zooming reruns only this part
+    dates = lines['price'].index
+    if len(dates) < 2:
+        return
+    start, end = st.slider("Zoom", min_value=dates[0].to_pydatetime(), max_value=dates[-1].to_pydatetime(),
+                           value=(dates[0].to_pydatetime(), dates[-1].to_pydatetime()), format="YYYY-MM-DD")
+    panels = st.multiselect("Indicator panels", list(lines['panels']), default=list(lines['panels'])[:1])
+    # full resolution data of the zoomed range, downsampled again to the pixel budget
+    view = backtest_charts.window(lines, start, end)
+    st.altair_chart(backtest_charts.build_chart(view, panels), use_container_width=True)
+    with st.expander(f"Bars in view ({len(view['price'])})", expanded=False):
+        st.dataframe(view['price'], use_container_width=True)
 
 
+def show_batch_backtest(strategy_chosen, start_date, end_date, cash, stake, comission, offline):
+    st.subheader('Batch backtest')
+    tickers_text = st.text_area("Tickers (comma or line separated)", value=", ".join(watchlist))
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers_text.replace("\n", ",").split(",") if t.strip()))
+
+    if st.button(f"Run {strategy_chosen} on {len(tickers)} tickers") and tickers:
+        strategy = load_strategy(strategy_chosen)
+        if strategy is None:
+            return
+        progress = st.progress(0.0)
+        table = st.empty()
+        rows = []
+        # rows arrive as the worker processes finish, the table is redrawn after each one
+        for row in backtest_batch.batch_backtest(tickers, strategy, start_date, end_date,
+                                                 cash, stake, comission, ohlc_cache_directory(),
+                                                 downloader=ohlc_store().downloader, offline=offline):
+            rows.append(row)
+            progress.progress(len(rows) / len(tickers))
+            table.dataframe(backtest_batch.results_table(rows), use_container_width=True)
+
+
+def show_optimization(ticker, strategy_chosen, start_date, end_date, cash, stake, comission, offline):
+    st.subheader('Parameter optimization')
+    info = open_strategy_registry().info(strategy_chosen)
+    # the statically scanned params, the strategy itself is only imported to run it
+    defaults = info.params
+    if defaults is None:
+        strategy = load_strategy(strategy_chosen)
+        if strategy is None:
+            return
+        defaults = backtest_optimize.strategy_params(strategy)
+    if not defaults:
+        st.info(f"{strategy_chosen} has no parameters to optimize.")
+        return
+
+    st.write("Values per parameter: a single value, a list `10, 15, 20` or a range `start:stop:step`")
+    grids = {}
+    cols = st.columns(len(defaults))
+    for col, (name, default) in zip(cols, defaults.items()):
+        text = col.text_input(name, value=str(default))
+        try:
+            grids[name] = backtest_optimize.parse_grid(text, default)
+        except ValueError as e:
+            col.error(f"Cannot read '{text}': {e}")
+            return
+    metric = st.selectbox("Rank by", list(backtest_optimize.ranking_metrics))
+    vectorized = False
+    if vector_backtest.supports(info.class_name):
+        vectorized = st.checkbox("Vectorized engine (same results as backtrader, much faster)", value=True)
+    combinations = len(backtest_optimize.param_combinations(grids))
+
+    if st.button(f"Optimize {strategy_chosen} on {ticker} ({combinations} combinations)"):
+        strategy = load_strategy(strategy_chosen)
+        if strategy is None:
+            return
+        OHLC_dataframe = load_OHLC(ticker=ticker, start_date=start_date, end_date=end_date, offline=offline)
+        with st.spinner("Running all combinations ..."):
+            results = backtest_optimize.optimize(OHLC_dataframe, strategy, grids, cash, stake, comission,
+                                                  vectorized=vectorized)
+        st.dataframe(backtest_optimize.rank(results, metric), use_container_width=True)
@@ -0,0 +1,55 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import backtest_engine
+import ohlc_cache
+import strategy_events
+
+# Columns of the batch result table, one row per ticker
+result_columns = ['ticker', 'trades', 'wins', 'losses', 'win_rate', 'final_value', 'gain', 'max_drawdown', 'error']
+
+# OHLC cache of a worker process, opened once per process
+worker_cache = None
+
+
+def open_worker_cache(directory, downloader, offline):
+    global worker_cache
+    if worker_cache is None:
+        worker_cache = ohlc_cache.OHLCCache(directory, downloader, offline)
+    return worker_cache
+
+
+def run_ticker(ticker, strategy, start_date, end_date, cash, stake, comission, cache_directory, downloader, offline):
+    # Runs in a worker: bars come from the shared on-disk OHLC cache, only the small summary travels back
+    row = {'ticker': ticker}
+    # nobody reads the events of a batch row
+    strategy_events.level = strategy_events.OFF
+    try:
+        bars = open_worker_cache(cache_directory, downloader, offline).load(ticker, start_date, end_date)
+        if len(bars) == 0:
+            row['error'] = 'no data'
+            return row
+        _, _, summary = backtest_engine.run_backtest(bars, strategy, cash, stake, comission)
+        row.update(summary)
+    except Exception as e:
+        row['error'] = f'{type(e).__name__}: {e}'
+    return row
+
+
+def batch_backtest(tickers, strategy, start_date, end_date, cash, stake, comission, cache_directory,
+                   downloader=None, offline=False, workers=None):
+    # Runs the strategy on every ticker in a process pool, yields the result rows in completion order
+    downloader = downloader if downloader is not None else ohlc_cache.YahooDownloader()
+    workers = min(workers or os.cpu_count() or 1, len(tickers)) or 1
+    # spawn: forking the threaded streamlit server is not safe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(run_ticker, ticker, strategy, start_date, end_date, cash, stake, comission,
+                                   cache_directory, downloader, offline) for ticker in tickers]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def results_table(rows, sort_by='final_value'):
+    table = pd.DataFrame(rows, columns=result_columns)
+    return table.sort_values(sort_by, ascending=False, na_position='last').reset_index(drop=True)
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+import threading
+import pandas as pd
+import storage
+
+# Part of every key, bump it when the engine or the cached result layout changes
+CACHE_VERSION = 2
+
+
+def ohlc_fingerprint(OHLC_dataframe):
+    # content hash of the bars (index included), a refetched or extended frame gives a new fingerprint
+    hashes = pd.util.hash_pandas_object(OHLC_dataframe, index=True).to_numpy()
+    return hashlib.sha256(hashes.tobytes() + ",".join(map(str, OHLC_dataframe.columns)).encode()).hexdigest()
+
+
+def result_key(strategy_source, strategy_name, strategy_params, ticker, start_date, end_date, stake, cash, comission,
+               OHLC_dataframe):
+    # Content address of a backtest: everything its result depends on
+    inputs = {
+        "version": CACHE_VERSION,
+        "strategy_source": hashlib.sha256(strategy_source.encode()).hexdigest(),
+        "strategy": strategy_name,
+        "params": sorted((strategy_params or {}).items()),
+        "ticker": ticker,
+        "start": str(start_date),
+        "end": str(end_date),
+        "stake": stake,
+        "cash": cash,
+        "comission": comission,
+        "ohlc": ohlc_fingerprint(OHLC_dataframe),
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def plain(value):
+    # analyzer output (AutoOrderedDict) -> plain dicts, independent of backtrader when unpickled
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    return value
+
+
+class BacktestCache:
+    # Results on disk as <key>.pkl. A hit touches the file, above max_bytes the least recently used
+    # results are removed.
+
+    def __init__(self, directory, max_bytes=256 * 2 ** 20):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return self.directory.joinpath(f"{key}.pkl")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            result = None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            # unreadable entry, e.g. written by an older layout: treat as a miss and drop it
+            print(f"dropped backtest cache entry {key}: {e}")
+            os.remove(path)
+            result = None
+        with self.lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, key, result):
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            storage.write_atomically(self.path(key), lambda tmp_path: tmp_path.write_bytes(data))
+            self.evict()
+
+    def evict(self):
+        entries = [(entry.stat().st_mtime_ns, entry.stat().st_size, entry.path)
+                   for entry in os.scandir(self.directory) if entry.name.endswith(".pkl")]
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,183 @@
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+# Points drawn per line, about one per horizontal pixel of the chart
+PIXEL_BUDGET = 1200
+
+# backtrader stores datetimes as float days, 1.0 = 0001-01-01 and 719163.0 = 1970-01-01
+EPOCH_ORDINAL = 719163
+
+
+class OrderLog(bt.Analyzer):
+    # executed orders: date, price, size (negative for sells)
+    def start(self):
+        self.rets.orders = []
+
+    def notify_order(self, order):
+        if order.status == order.Completed:
+            self.rets.orders.append((bt.num2date(order.executed.dt), order.executed.price, order.executed.size))
+
+
+class TradeList(bt.Analyzer):
+    # closed trades: entry and exit date, size, net profit including commission
+    def start(self):
+        self.rets.trades = []
+
+    def notify_trade(self, trade):
+        if trade.isclosed:
+            self.rets.trades.append((trade.open_datetime(), trade.close_datetime(),
+                                     trade.history[0].event.size if trade.history else None, trade.pnl, trade.pnlcomm))
+
+
+class EquityCurve(bt.Analyzer):
+    # broker value per bar: (datetime as float days, value)
+    def start(self):
+        self.rets.values = []
+
+    def prenext(self):
+        self.next()
+
+    def next(self):
+        self.rets.values.append((self.strategy.datetime[0], self.strategy.broker.getvalue()))
+
+
+def add_chart_analyzers(cerebro):
+    cerebro.addanalyzer(OrderLog, _name="orderlog")
+    cerebro.addanalyzer(TradeList, _name="tradelist")
+    cerebro.addanalyzer(EquityCurve, _name="equitycurve")
+
+
+def to_dates(values):
+    return pd.to_datetime((np.asarray(values) - EPOCH_ORDINAL) * 86400 * 1e9).round("ms")
+
+
+def root_indicator(indicator):
+    # indicators computed on another indicator are drawn in the panel of that indicator
+    while isinstance(indicator.datas[0], bt.Indicator):
+        indicator = indicator.datas[0]
+    return indicator
+
+
+def extract_lines(strat):
+    # Full resolution lines of a finished run: price, indicators, orders and equity, all on the data0 dates
+    data = strat.data
+    dates = to_dates(data.datetime.array)
+    price = pd.DataFrame({name: np.asarray(getattr(data, name).array) for name in ["open", "high", "low", "close"]},
+                         index=dates)
+
+    overlays, panels, names = {}, {}, {}
+    for indicator in strat.getindicators():
+        if not isinstance(indicator, bt.Indicator) or not indicator.plotinfo.plot or \
+                len(indicator.lines[0].array) != len(dates):
+            # line operations like close(-1), hidden indicators and indicators on the resampled data1
+            continue
+        root = root_indicator(indicator)
+        # drawn on the price like backtrader does unless the (root) indicator has its own subplot
+        overlay = not root.plotinfo.subplot
+        group = "price" if overlay else f"{type(root).__name__}#{id(root)}"
+        for alias, line in zip(indicator.lines.getlinealiases(), indicator.lines):
+            name = f"{type(indicator).__name__}.{alias}"
+            names[name] = names.get(name, 0) + 1
+            if names[name] > 1:
+                name = f"{name} ({names[name]})"
+            series = pd.Series(np.asarray(line.array, dtype="float64"), index=dates, name=name)
+            if overlay:
+                overlays[name] = series
+            else:
+                panels.setdefault(group, {})[name] = series
+    # readable panel names, numbered if an indicator type appears twice
+    panel_names = {}
+    for group in list(panels):
+        base = group.split("#")[0]
+        panel_names[group] = base if base not in panel_names.values() else f"{base} {len(panel_names) + 1}"
+    panels = {panel_names[group]: lines for group, lines in panels.items()}
+
+    orders = pd.DataFrame(strat.analyzers.orderlog.get_analysis().orders, columns=["date", "price", "size"])
+    values = pd.DataFrame(strat.analyzers.equitycurve.get_analysis().values, columns=["date", "value"])
+    # the last value per bar, the strategy can be called twice on the last bar
+    equity = pd.Series(values["value"].to_numpy(), index=to_dates(values["date"]), name="equity")
+    equity = equity[~equity.index.duplicated(keep="last")].reindex(dates).bfill().ffill()
+    trades = pd.DataFrame(strat.analyzers.tradelist.get_analysis().trades,
+                          columns=["entry_date", "exit_date", "size", "pnl", "pnlcomm"])
+    return {"price": price, "overlays": overlays, "panels": panels, "orders": orders, "trades": trades,
+            "equity": equity}
+
+
+def lttb(y, n_out):
+    # Largest-Triangle-Three-Buckets: indices of n_out points which keep the visual shape of the line.
+    # x is the bar number, so the line is taken as evenly spaced
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    y = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(y).any() else 0.0, y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # average of the next bucket is the third corner of the triangle
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        next_x = (next_start + next_end - 1) / 2
+        next_y = y[next_start:next_end].mean()
+        x = np.arange(start, end)
+        areas = np.abs((previous - next_x) * (y[start:end] - y[previous]) - (previous - x) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample(series, n_out=PIXEL_BUDGET):
+    valid = series.dropna()
+    return valid.iloc[lttb(valid.to_numpy(dtype="float64"), n_out)]
+
+
+def window(lines, start, end):
+    # full resolution lines between start and end, zooming in shows every bar again once it fits the budget
+    def cut(frame):
+        return frame.loc[(frame.index >= start) & (frame.index <= end)]
+    orders = lines["orders"]
+    return {
+        "price": cut(lines["price"]),
+        "overlays": {name: cut(series) for name, series in lines["overlays"].items()},
+        "panels": {panel: {name: cut(series) for name, series in panel_lines.items()}
+                   for panel, panel_lines in lines["panels"].items()},
+        "orders": orders[(orders["date"] >= start) & (orders["date"] <= end)],
+        "trades": lines["trades"],
+        "equity": cut(lines["equity"]),
+    }
+
+
+def long_format(series_by_name, n_out):
+    frames = [downsample(series, n_out).rename("value").rename_axis("date").reset_index().assign(line=name)
+              for name, series in series_by_name.items()]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["date", "value", "line"])
+
+
+def build_chart(lines, panels=(), n_out=PIXEL_BUDGET, width=PIXEL_BUDGET):
+    # Price with overlays and orders, equity and the chosen indicator panels, each line downsampled to
+    # n_out points. Panning and zooming inside the chart works on the downsampled points.
+    import altair as alt
+
+    x = alt.X("date:T", title=None)
+    price = long_format({"close": lines["price"]["close"], **lines["overlays"]}, n_out)
+    price_chart = alt.Chart(price).mark_line(strokeWidth=1).encode(
+        x=x, y=alt.Y("value:Q", title="price", scale=alt.Scale(zero=False)), color=alt.Color("line:N", title=None))
+    orders = lines["orders"].assign(side=np.where(lines["orders"]["size"] > 0, "buy", "sell"))
+    order_chart = alt.Chart(orders).mark_point(filled=True, size=60).encode(
+        x="date:T", y="price:Q",
+        shape=alt.Shape("side:N", scale=alt.Scale(domain=["buy", "sell"], range=["triangle-up", "triangle-down"])),
+        color=alt.Color("side:N", scale=alt.Scale(domain=["buy", "sell"], range=["green", "red"]), legend=None),
+        tooltip=["date:T", "price:Q", "size:Q"])
+    charts = [(price_chart + order_chart).properties(width=width, height=300)]
+
+    equity = long_format({"equity": lines["equity"]}, n_out)
+    charts.append(alt.Chart(equity).mark_area(opacity=0.4, line=True).encode(
+        x=x, y=alt.Y("value:Q", title="equity", scale=alt.Scale(zero=False))).properties(width=width, height=120))
+    for panel in panels:
+        data = long_format(lines["panels"][panel], n_out)
+        charts.append(alt.Chart(data).mark_line(strokeWidth=1).encode(
+            x=x, y=alt.Y("value:Q", title=panel, scale=alt.Scale(zero=False)), color=alt.Color("line:N", title=None))
+            .properties(width=width, height=120))
+    return alt.vconcat(*charts).resolve_scale(x="shared", color="independent").interactive(bind_y=False)
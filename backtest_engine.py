@@ -0,0 +1,80 @@
+import backtrader as bt
+from backtrader.feeds import PandasData
+
+
+# Class to hold your custom fundamental/technical data
+class ExtendedPandasData(PandasData):
+    lines = (
+        'price_to_earning',
+        'price_to_book',
+        'dept_to_equity',
+        'free_cash_flow',
+        'PEG_ratio',
+        'RSI',
+        'mac_d',
+        'on_balance_volume',
+        'AD_line',
+        'ADX',
+        'aroon_indicator',
+    )
+    params = ((col, -1) for col in lines)
+
+
+class PortfolioValue(bt.Analyzer):
+    # Start and end value of the broker, kept with the analyzers so optimization results carry it too
+    def start(self):
+        self.rets.start_value = self.strategy.broker.getvalue()
+
+    def stop(self):
+        self.rets.final_value = self.strategy.broker.getvalue()
+
+
+def build_cerebro(OHLC_dataframe, strategy, cash, stake, comission, strategy_params=None, cerebro=None, resample=True):
+    # The backtest setup of the backtest page, without streamlit so it also runs in worker processes.
+    # resample=False leaves out the monthly data1, only for strategies which do not use it
+    if cerebro is None:
+        cerebro = bt.Cerebro()
+        cerebro.addstrategy(strategy, **(strategy_params or {}))
+
+    # Pass it to the backtrader datafeed and add it to the cerebro
+    data_feed = ExtendedPandasData(dataname=OHLC_dataframe)
+    cerebro.adddata(data_feed)
+    if resample:
+        # Add resampled data for Pivot Indicator resampled data: data1
+        data1 = cerebro.resampledata(data_feed, timeframe=bt.TimeFrame.Months, compression=1)
+        data1.plotinfo.plot = False
+
+    cerebro.broker.setcash(cash=cash)
+    # Add a FixedSize sizer according to the stake
+    cerebro.addsizer(bt.sizers.FixedSize, stake=stake)
+    # 0.1% ... divide by 100 to remove the %
+    cerebro.broker.setcommission(commission=(comission / 100))
+
+    cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name="tradeanalyzer")
+    cerebro.addanalyzer(bt.analyzers.DrawDown, _name="drawdown")
+    cerebro.addanalyzer(PortfolioValue, _name="value")
+    return cerebro
+
+
+def summarize(strat):
+    # Key figures of a finished run from the analyzers, works on strategies and optimization results
+    trades = strat.analyzers.tradeanalyzer.get_analysis()
+    closed = trades.get('total', {}).get('closed', 0)
+    won = trades.get('won', {}).get('total', 0)
+    value = strat.analyzers.value.get_analysis()
+    final_value = value.final_value
+    return {
+        'trades': closed,
+        'wins': won,
+        'losses': trades.get('lost', {}).get('total', 0),
+        'win_rate': won / closed * 100 if closed else float('nan'),
+        'final_value': final_value,
+        'gain': final_value - value.start_value,
+        'max_drawdown': strat.analyzers.drawdown.get_analysis().max.drawdown,
+    }
+
+
+def run_backtest(OHLC_dataframe, strategy, cash, stake, comission, strategy_params=None, resample=True):
+    cerebro = build_cerebro(OHLC_dataframe, strategy, cash, stake, comission, strategy_params, resample=resample)
+    strat = cerebro.run()[0]
+    return cerebro, strat, summarize(strat)
@@ -0,0 +1,87 @@
+import itertools
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import backtest_engine
+import strategy_events
+import vector_backtest
+
+# Metrics the optimization can be ranked by -> True when higher is better
+ranking_metrics = {
+    'final_value': True,
+    'gain': True,
+    'win_rate': True,
+    'trades': True,
+    'max_drawdown': False,
+}
+
+
+def strategy_params(strategy):
+    # Tunable parameters of a strategy class with their defaults, from its backtrader params
+    return dict(strategy.params._getitems())
+
+
+def parse_grid(text, default):
+    # "10" -> [10], "10, 15, 20" -> [10, 15, 20], "10:30:5" -> 10, 15, ..., 30 (end included when on a step),
+    # values take the type of the parameter default
+    kind = type(default) if isinstance(default, (int, float)) and not isinstance(default, bool) else str
+    text = text.strip()
+    if not text:
+        return [default]
+    if ':' in text:
+        start, stop, step = (float(part) for part in text.split(':'))
+        if step <= 0:
+            raise ValueError(f"the step of '{text}' has to be greater than 0")
+        # the stop only when a step lands on it, the epsilon absorbs float steps like 0.1
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [kind(round(start + i * step, 10)) for i in range(max(count, 0))]
+    return [kind(part.strip()) for part in text.split(',') if part.strip()]
+
+
+def param_combinations(grids):
+    names = list(grids)
+    return [dict(zip(names, values)) for values in itertools.product(*(grids[name] for name in names))]
+
+
+# OHLC bars of a worker process, set once per process by init_worker
+worker_bars = None
+
+
+def init_worker(OHLC_dataframe):
+    global worker_bars
+    worker_bars = OHLC_dataframe
+    # no event recording in the sweep, set in every worker whatever the start method
+    strategy_events.level = strategy_events.OFF
+
+
+def run_combination(strategy, params, cash, stake, comission):
+    # Runs in a worker: one parameter combination on the bars of init_worker
+    _, _, summary = backtest_engine.run_backtest(worker_bars, strategy, cash, stake, comission, strategy_params=params)
+    return {**params, **summary}
+
+
+def optimize(OHLC_dataframe, strategy, grids, cash, stake, comission, maxcpus=None, vectorized=None):
+    # Strategies with a vector_backtest fast path are swept in process (same trades and values,
+    # orders of magnitude faster), unless vectorized=False
+    if vectorized is None:
+        vectorized = vector_backtest.supports(strategy)
+    if vectorized:
+        return pd.DataFrame([{**params, **vector_backtest.run_backtest(OHLC_dataframe, strategy, cash, comission, params)[2]}
+                             for params in param_combinations(grids)])
+
+    # One task per combination in a spawn pool like backtest_batch: forking the threaded streamlit server is
+    # not safe. The bars reach every worker once through the initializer, after that only the params and
+    # the summary travel.
+    combinations = param_combinations(grids)
+    workers = min(maxcpus or os.cpu_count() or 1, len(combinations)) or 1
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=init_worker, initargs=(OHLC_dataframe,)) as executor:
+        rows = list(executor.map(run_combination, itertools.repeat(strategy), combinations, itertools.repeat(cash),
+                                 itertools.repeat(stake), itertools.repeat(comission)))
+    return pd.DataFrame(rows)
+
+
+def rank(results, metric='final_value'):
+    return results.sort_values(metric, ascending=not ranking_metrics[metric], na_position='last').reset_index(drop=True)
@@ -0,0 +1,150 @@
+# Throughput and peak memory of every strategy in strategies/ on seeded synthetic bars, no network involved
+# Run from the repository root:
+#   python -m benchmarks.bench_backtest [--bars 1000 10000 100000 ...] [--strategies KEY ...]
+#                                       [--output results.json] [--baseline results.json] [--tolerance 1.5]
+# Each strategy runs with and without the monthly resampledata (data1) step. Every run gets its own
+# interpreter, so the peak RSS belongs to that run alone. Results are written as JSON, with --baseline the
+# script exits with 1 when a run got slower or needs more memory than tolerance times the baseline.
+import argparse
+import datetime
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import time
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+DEFAULT_OUTPUT = ROOT_DIR.joinpath("benchmarks", "results", "bench_backtest.json")
+
+# business day bars end in 2262 (the limit of pandas timestamps), longer runs use minute bars
+MAX_DAILY_BARS = 60_000
+
+# memory differences below this are noise, whatever the ratio
+MIN_RSS_MB = 5.0
+
+
+def bar_frequency(bars, freq):
+    if freq != "auto":
+        return freq
+    return "B" if bars <= MAX_DAILY_BARS else "min"
+
+
+def run_case(case):
+    # Runs in the child interpreter: one strategy on one synthetic feed, measured around cerebro.run()
+    import resource
+    import backtest_engine
+    import strategy_events
+    import strategy_registry
+    import synthetic_ohlc
+
+    # like batch runs: nobody reads the events
+    strategy_events.level = strategy_events.OFF
+    result = {}
+    try:
+        strategy = strategy_registry.StrategyRegistry(ROOT_DIR.joinpath("strategies")).load(case["strategy"])
+        bars = synthetic_ohlc.gbm_bars(case["bars"], freq=case["freq"], seed=case["seed"])
+        cerebro = backtest_engine.build_cerebro(bars, strategy, cash=10 ** 6, stake=1, comission=0.1,
+                                                resample=case["resample"])
+        # ru_maxrss is in KB on Linux: the peak so far includes the interpreter and the bars
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        start = time.perf_counter()
+        cerebro.run()
+        seconds = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        result.update(seconds=seconds, bars_per_second=case["bars"] / seconds, peak_rss_mb=peak,
+                      run_rss_mb=peak - rss_before)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def run_child(case, timeout):
+    try:
+        completed = subprocess.run([sys.executable, "-m", "benchmarks.bench_backtest", "--case", json.dumps(case)],
+                                   cwd=ROOT_DIR, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"error": f"timeout after {timeout} s"}
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return {"error": (completed.stderr.strip().splitlines() or ["no output"])[-1]}
+    return json.loads(lines[-1])
+
+
+def compare(results, baseline, tolerance):
+    # -> regressions as text lines, cases missing or failing in either run are skipped
+    def key(result):
+        return result["strategy"], result["bars"], result["resample"]
+    previous = {key(result): result for result in baseline["results"] if "error" not in result}
+    regressions = []
+    for result in results:
+        before = previous.get(key(result))
+        if before is None or "error" in result:
+            continue
+        name = f"{result['strategy']} {result['bars']} bars {'resampled' if result['resample'] else 'plain'}"
+        if result["bars_per_second"] * tolerance < before["bars_per_second"]:
+            regressions.append(f"{name}: {before['bars_per_second']:.0f} -> {result['bars_per_second']:.0f} bars/s")
+        if result["run_rss_mb"] > max(before["run_rss_mb"] * tolerance, before["run_rss_mb"] + MIN_RSS_MB):
+            regressions.append(f"{name}: {before['run_rss_mb']:.1f} -> {result['run_rss_mb']:.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--strategies", nargs="+", help="strategy registry keys, default all of strategies/")
+    parser.add_argument("--freq", default="auto", help="pandas frequency of the bars, auto: business days or minutes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=3600)
+    parser.add_argument("--output", type=pathlib.Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=pathlib.Path)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case is not None:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return 0
+
+    import strategy_registry
+    keys = args.strategies or sorted(strategy_registry.StrategyRegistry(ROOT_DIR.joinpath("strategies")).keys())
+    print(f"{'strategy':<30} {'bars':>10} {'resample':>9} {'time [s]':>10} {'bars/s':>10} {'peak [MB]':>10} "
+          f"{'run [MB]':>10}")
+    results = []
+    for bars in args.bars:
+        for strategy in keys:
+            for resample in (True, False):
+                case = {"strategy": strategy, "bars": bars, "freq": bar_frequency(bars, args.freq),
+                        "seed": args.seed, "resample": resample}
+                result = {**case, **run_child(case, args.timeout)}
+                results.append(result)
+                if "error" in result:
+                    print(f"{strategy:<30} {bars:>10} {str(resample):>9}   {result['error']}")
+                else:
+                    print(f"{strategy:<30} {bars:>10} {str(resample):>9} {result['seconds']:>10.2f} "
+                          f"{result['bars_per_second']:>10.0f} {result['peak_rss_mb']:>10.1f} "
+                          f"{result['run_rss_mb']:>10.1f}")
+
+    run = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(run, indent=1))
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline is not None:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f"FAIL: {len(regressions)} regressions against {args.baseline} (tolerance {args.tolerance}x)")
+            print("\n".join(regressions))
+            return 1
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
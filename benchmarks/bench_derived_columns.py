@@ -0,0 +1,67 @@
+# Compares the old split/concat gain pipeline of main() with derived_columns.apply_derivations
+# Run from the repository root: python -m benchmarks.bench_derived_columns [rows ...]
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import derived_columns
+
+
+def legacy_derivations(df):
+    # the pipeline main() used before derived_columns, kept here as the baseline
+    df['tradeinfo_entry_price'] = pd.to_numeric(df['tradeinfo_entry_price'], errors='coerce')
+    df['tradeinfo_exit_price'] = pd.to_numeric(df['tradeinfo_exit_price'], errors='coerce')
+    df['tradeinfo_number_shares'] = pd.to_numeric(df['tradeinfo_number_shares'], errors='coerce')
+    buffer_df = df[df['tradeinfo_entry_price'].isnull() | df['tradeinfo_exit_price'].isnull() | df[
+        'tradeinfo_number_shares'].isnull()]
+    df = df[df['tradeinfo_entry_price'].notnull() & df['tradeinfo_exit_price'].notnull() & df[
+        'tradeinfo_number_shares'].notnull()]
+    df['tradeinfo_gain_absolut'] = (df['tradeinfo_exit_price'] - df['tradeinfo_entry_price']) * df[
+        'tradeinfo_number_shares']
+    df['tradeinfo_gain_percentage'] = ((df['tradeinfo_exit_price'] / df['tradeinfo_entry_price']) - 1) * 100
+    df = pd.concat([df, buffer_df], ignore_index=True)
+    groups = [['tradeinfo_entry_price', 'tradeinfo_exit_price', 'tradeinfo_fees', 'tradeinfo_tax',
+               'tradeinfo_gain_absolut', 'fundamentals_free_cash_flow'],
+              ['tradeinfo_gain_percentage', 'technical_RSI'],
+              ['fundamentals_price_to_earning', 'fundamentals_price_to_book', 'fundamentals_dept_to_equity',
+               'fundamentals_PEG_ratio', 'technical_trend_mac_d', 'technical_on_balance_volume',
+               'technical_AD_line', 'technical_ADX', 'technical_aroon_indicator']]
+    for group in groups:
+        df[group] = df[group].round(2)
+    return df
+
+
+def journal_frame(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({col: rng.uniform(1, 500, rows) for col in derived_columns.rounding_rules})
+    df['tradeinfo_number_shares'] = rng.integers(1, 50, rows).astype("float64")
+    # a quarter of the trades is still open
+    df.loc[rng.random(rows) < 0.25, 'tradeinfo_exit_price'] = np.nan
+    df['tradeinfo_Ticker'] = rng.choice(['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA'], rows)
+    return df
+
+
+def measure(pipeline, df):
+    tracemalloc.start()
+    start = time.perf_counter()
+    pipeline(df)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main(sizes):
+    print(f"{'rows':>10} {'pipeline':>10} {'time [ms]':>10} {'peak alloc [MB]':>16}")
+    for rows in sizes:
+        df = journal_frame(rows)
+        frame_mb = df.memory_usage(deep=True).sum() / 2 ** 20
+        for name, pipeline in [("legacy", legacy_derivations), ("derived", derived_columns.apply_derivations)]:
+            seconds, peak = measure(pipeline, df.copy())
+            print(f"{rows:>10} {name:>10} {seconds * 1000:>10.1f} {peak / 2 ** 20:>16.1f}")
+        print(f"{'':>10} {'(frame)':>10} {'':>10} {frame_mb:>16.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000])
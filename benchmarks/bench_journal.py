@@ -0,0 +1,197 @@
+# Time and peak memory of the journal code paths at several journal sizes, on synthetic journals
+# Run from the repository root:
+#   python -m benchmarks.bench_journal [--sizes 10000 100000 ...] [--backends csv parquet sqlite]
+#                                      [--output results.json] [--baseline results.json] [--tolerance 1.5]
+# The results are written as JSON. With --baseline every path is compared against an earlier run and the
+# script exits with 1 when one got slower or needs more memory than tolerance times the baseline.
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+import calendar_view
+import derived_columns
+import journal_log
+import journal_model
+import journal_stats
+import pnl_rollups
+import storage
+import synthetic_journal
+import trade_table
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+DEFAULT_OUTPUT = ROOT_DIR.joinpath("benchmarks", "results", "bench_journal.json")
+
+# differences below this are noise, whatever the ratio
+MIN_SECONDS = 0.005
+MIN_PEAK_MB = 1.0
+
+
+def measure(run, setup=lambda: None, repeat=3):
+    # best time of repeat runs, then one more run under tracemalloc for the peak allocation;
+    # setup() builds the input of run() outside of the measurement
+    seconds = []
+    for _ in range(repeat):
+        argument = setup()
+        start = time.perf_counter()
+        run(argument)
+        seconds.append(time.perf_counter() - start)
+    argument = setup()
+    tracemalloc.start()
+    run(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(seconds), peak / 2 ** 20
+
+
+def trades_daily_pnl(df, year):
+    # baseline of calendar_view.year_days: the calendar days of a year grouped from the trades themselves,
+    # what the dashboard did before pnl_rollups
+    exit_dates = pd.to_datetime(df["tradeinfo_exit_date"])
+    in_year = (exit_dates.dt.year == year).to_numpy()
+    days = exit_dates[in_year].dt.normalize()
+    gains = pd.to_numeric(df.loc[in_year, "tradeinfo_gain_absolut"], errors="coerce").fillna(0.0)
+    daily = pd.DataFrame({"pnl": gains.to_numpy(), "day": days.to_numpy()}).groupby("day")["pnl"].agg(["sum", "size"])
+    calendar = pd.date_range(f"{year}-01-01", f"{year}-12-31", freq="D", name="day")
+    daily = daily.reindex(calendar, fill_value=0)
+    return pd.DataFrame({"pnl": daily["sum"].astype("float64"), "trades": daily["size"].astype("int64")})
+
+
+def journal_paths(df, backend, directory):
+    # (name, setup, run) of every journal code path for one backend: what save_data, load_data,
+    # the derivations of main() and show_dashboard run on a journal of this size
+    store = storage.open_store(backend, directory)
+    if backend != "sqlite":
+        store = journal_log.LoggedStore(store)
+    store.save(df.copy())
+    derived = derived_columns.apply_derivations(store.load())
+    stats = journal_stats.JournalStatistics.from_frame(derived)
+    rollups = pnl_rollups.PnlRollups.from_frame(derived)
+    trade = derived.iloc[len(derived) // 2].to_dict()
+    year = rollups.years()[0]
+    table = trade_table.TradeTableIndex(derived)
+
+    def table_page(_):
+        rows = table.rows(table.mask(status=trade_table.STATUS_CLOSED), "tradeinfo_gain_absolut", ascending=False)
+        return trade_table.style_page(table.page(rows, 0, 50)).to_html()
+
+    def fresh_model():
+        return journal_model.JournalModel(store, derived_columns.apply_derivations)
+
+    def loaded_model():
+        model = fresh_model()
+        model.current()
+        return model
+
+    def edit_trade(model):
+        # the same values again: the store and the model do all the work of a real edit
+        trade_id = trade[storage.TRADE_ID]
+        model.edit_trade(trade_id, {"tradeinfo_fees": trade["tradeinfo_fees"]}, model.get_trade(trade_id))
+
+    return [
+        ("save_data", lambda: df.copy(), store.save),
+        ("load_data", None, lambda _: store.load()),
+        ("load_data columns", None, lambda _: store.load(["tradeinfo_Ticker", "tradeinfo_exit_price"])),
+        ("journal model cold start", fresh_model, lambda model: model.current()),
+        ("derivations", lambda: store.load(), derived_columns.apply_derivations),
+        ("statistics from_frame", None, lambda _: journal_stats.JournalStatistics.from_frame(derived)),
+        ("statistics recompute", None, lambda _: journal_stats.recompute_summary(derived)),
+        ("statistics summary", None, lambda _: stats.summary()),
+        ("statistics upsert", None, lambda _: stats.upsert(trade[storage.TRADE_ID], trade)),
+        ("cumulative returns", None, lambda _: stats.cumulative_returns()),
+        ("calendar daily pnl", None, lambda _: trades_daily_pnl(derived, year)),
+        ("pnl rollups from_frame", None, lambda _: pnl_rollups.PnlRollups.from_frame(derived)),
+        ("pnl rollups upsert", None, lambda _: rollups.upsert(trade[storage.TRADE_ID], trade)),
+        ("pnl rollups month frame", None, lambda _: pnl_rollups.rollup_frame(rollups.buckets["Month"])),
+        ("calendar year days", None, lambda _: calendar_view.year_days(rollups.frame("Day"), year)),
+        ("open trades", None, lambda _: store.open_trades()),
+        ("trade table sort index", None,
+         lambda _: trade_table.TradeTableIndex(derived).sort_order("tradeinfo_gain_absolut")),
+        ("trade table page", None, table_page),
+        # last: it writes to the store
+        ("journal model edit trade", loaded_model, edit_trade),
+    ]
+
+
+def run_size(rows, backends, repeat, seed):
+    results = []
+    start = time.perf_counter()
+    df = synthetic_journal.generate_journal(rows, seed=seed)
+    print(f"\n{rows} trades, generated in {time.perf_counter() - start:.2f} s, "
+          f"{df.memory_usage(deep=True).sum() / 2 ** 20:.1f} MB in memory")
+    seconds, peak = measure(lambda _: synthetic_journal.generate_journal(rows, seed=seed), repeat=1)
+    results.append({"rows": rows, "path": "generate", "seconds": seconds, "peak_mb": peak})
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as directory:
+            # the stores report every load and save on stdout
+            with contextlib.redirect_stdout(io.StringIO()):
+                paths = journal_paths(df, backend, directory)
+                for name, setup, run in paths:
+                    seconds, peak = measure(run, setup or (lambda: None), repeat)
+                    results.append({"rows": rows, "path": f"{backend}: {name}", "seconds": seconds, "peak_mb": peak})
+    for result in results:
+        print(f"{result['path']:<45} {result['seconds'] * 1000:>12.1f} {result['peak_mb']:>12.1f}")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # -> regressions as text lines, paths missing in the baseline are skipped
+    previous = {(result["rows"], result["path"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["rows"], result["path"]))
+        if before is None:
+            continue
+        for key, unit, floor in [("seconds", "s", MIN_SECONDS), ("peak_mb", "MB", MIN_PEAK_MB)]:
+            if result[key] > max(before[key] * tolerance, before[key] + floor):
+                regressions.append(f"{result['rows']:>10} {result['path']:<45} {key}: "
+                                   f"{before[key]:.3f} -> {result[key]:.3f} {unit}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--backends", nargs="+", default=["parquet", "sqlite", "csv"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=pathlib.Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=pathlib.Path)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args()
+
+    pd.set_option("mode.copy_on_write", True)
+    print(f"{'path':<45} {'time [ms]':>12} {'peak [MB]':>12}")
+    results = [result for rows in args.sizes for result in run_size(rows, args.backends, args.repeat, args.seed)]
+
+    run = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(run, indent=1))
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline is not None:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f"FAIL: {len(regressions)} regressions against {args.baseline} (tolerance {args.tolerance}x)")
+            print("\n".join(regressions))
+            return 1
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+# Time of the rolling risk metrics kernel against pandas rolling windows, on seeded random trade gains
+# Run from the repository root:
+#   python -m benchmarks.bench_risk_metrics [--sizes 10000 1000000 ...] [--windows 20 250 ...]
+#                                           [--output results.json] [--baseline results.json] [--tolerance 1.5]
+# Every run also checks the kernel against the pandas results and exits with 1 when they differ, a difference
+# where the kernel is closer to exactly rounded window sums than pandas does not count.
+# With --baseline the script exits with 1 when the kernel got slower than tolerance times the baseline.
+import argparse
+import datetime
+import json
+import math
+import pathlib
+import platform
+import sys
+import time
+import numpy as np
+import pandas as pd
+import risk_metrics
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+DEFAULT_OUTPUT = ROOT_DIR.joinpath("benchmarks", "results", "bench_risk_metrics.json")
+
+# differences below this are noise, whatever the ratio
+MIN_SECONDS = 0.005
+
+
+def pandas_metrics(returns, window):
+    # reference: the same metrics with one pandas rolling window per statistic
+    gains = pd.Series(returns)
+    rolling = gains.rolling(window)
+    mean, std = rolling.mean(), rolling.std()
+    downside = np.sqrt((gains.clip(upper=0.0) ** 2).rolling(window).mean())
+    return {
+        "sharpe": (mean / std).where(std > 0).to_numpy(),
+        "sortino": (mean / downside).where(downside > 0).to_numpy(),
+        "win_rate": ((gains > 0).rolling(window).mean() * 100).to_numpy(),
+        "expectancy": mean.to_numpy(),
+    }
+
+
+def exact_metrics(returns, window, position):
+    # the metrics of the window ending at position from exactly rounded sums, to settle differences against pandas
+    gains = returns[position - window + 1:position + 1]
+    mean = math.fsum(gains) / window
+    std = math.sqrt(math.fsum((gain - mean) ** 2 for gain in gains) / (window - 1)) if window > 1 else math.nan
+    downside = math.sqrt(math.fsum(min(gain, 0.0) ** 2 for gain in gains) / window)
+    return {
+        "sharpe": mean / std if std > 0 else math.nan,
+        "sortino": mean / downside if downside > 0 else math.nan,
+        "win_rate": sum(gain > 0 for gain in gains) / window * 100,
+        "expectancy": mean,
+    }
+
+
+def mismatched(returns, window, kernel, reference):
+    # -> the metrics where the kernel differs from pandas and not because pandas is off. pandas adds and removes
+    # every value of a rolling sum, so where a window statistic is tiny against its neighbours (a sortino with a
+    # single small loss, two nearly equal gains) pandas itself drifts. Exactly rounded sums of the differing
+    # windows, of at most about 1000 of them, decide: the kernel has to match them or be closer than pandas.
+    mismatches = []
+    for name in kernel:
+        differing = np.flatnonzero(~np.isclose(kernel[name], reference[name], rtol=1e-7, atol=1e-6, equal_nan=True))
+        for position in differing[::max(1, len(differing) // 1000)]:
+            exact = exact_metrics(returns, window, position)[name]
+            if not np.isclose(kernel[name][position], exact, rtol=1e-7, atol=1e-6, equal_nan=True) and \
+                    not abs(kernel[name][position] - exact) <= abs(reference[name][position] - exact):
+                mismatches.append(name)
+                break
+    return mismatches
+
+
+def best_time(run, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def run_case(rows, window, repeat, seed):
+    returns = np.random.default_rng(seed).normal(20.0, 500.0, rows)
+    kernel = risk_metrics.rolling_metrics(returns, window)
+    reference = pandas_metrics(returns, window)
+    mismatches = mismatched(returns, window, kernel, reference)
+    return {
+        "rows": rows,
+        "window": window,
+        "kernel_seconds": best_time(lambda: risk_metrics.rolling_metrics(returns, window), repeat),
+        "pandas_seconds": best_time(lambda: pandas_metrics(returns, window), repeat),
+        "drawdown_seconds": best_time(lambda: risk_metrics.drawdown_duration(risk_metrics.underwater_curve(returns)),
+                                      repeat),
+        "mismatches": mismatches,
+    }
+
+
+def compare(results, baseline, tolerance):
+    # -> regressions as text lines, cases missing in the baseline are skipped
+    previous = {(result["rows"], result["window"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["rows"], result["window"]))
+        if before is None:
+            continue
+        for key in ["kernel_seconds", "drawdown_seconds"]:
+            if result[key] > max(before[key] * tolerance, before[key] + MIN_SECONDS):
+                regressions.append(f"{result['rows']:>10} {result['window']:>8} {key}: "
+                                   f"{before[key]:.4f} -> {result[key]:.4f} s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--windows", type=int, nargs="+", default=[20, 250, 5_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=pathlib.Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=pathlib.Path)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'window':>8} {'kernel [ms]':>12} {'pandas [ms]':>12} {'drawdown [ms]':>14}  check")
+    results = []
+    for rows in args.sizes:
+        for window in args.windows:
+            result = run_case(rows, window, args.repeat, args.seed)
+            results.append(result)
+            print(f"{rows:>10} {window:>8} {result['kernel_seconds'] * 1000:>12.1f} "
+                  f"{result['pandas_seconds'] * 1000:>12.1f} {result['drawdown_seconds'] * 1000:>14.1f}  "
+                  f"{', '.join(result['mismatches']) or 'ok'}")
+
+    run = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(run, indent=1))
+    print(f"\nresults written to {args.output}")
+
+    failed = [result for result in results if result["mismatches"]]
+    if failed:
+        print(f"FAIL: the kernel differs from pandas in {len(failed)} cases")
+        return 1
+    if args.baseline is not None:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f"FAIL: {len(regressions)} regressions against {args.baseline} (tolerance {args.tolerance}x)")
+            print("\n".join(regressions))
+            return 1
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# Import-time profile and cold-start budget of the streamlit entry point
+# Run from the repository root: python -m benchmarks.bench_startup [--budget SECONDS] [--runs N] [--top N]
+# Exits with 1 when the median cold import of app.py exceeds the budget or a deferred module is
+# imported at start-up again.
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+
+# Median seconds a fresh interpreter may take to import app.py, override with --budget or STARTUP_BUDGET
+STARTUP_BUDGET = float(os.environ.get("STARTUP_BUDGET", 1.0))
+
+# Page specific dependencies which must not be loaded by a cold start (PIL is imported by streamlit itself)
+deferred_modules = ["matplotlib.pyplot", "july", "backtest", "backtrader", "yfinance"]
+
+cold_start_script = """
+import json, sys, time
+start = time.perf_counter()
+import app
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def run_python(args):
+    # streamlit's bare mode warnings go to stderr, they are not part of the measurement
+    return subprocess.run([sys.executable] + args, cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+
+
+def import_profile(target="app"):
+    # -X importtime: one line per module with its own and its cumulative import time in microseconds
+    stderr = run_python(["-X", "importtime", "-c", f"import {target}"]).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip())) // 2))
+    return rows
+
+
+def print_profile(rows, top):
+    print(f"{'module':<45} {'self [ms]':>10} {'cumulative [ms]':>16}")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: row[2], reverse=True)[:top]:
+        print(f"{name:<45} {self_us / 1000:>10.1f} {cumulative_us / 1000:>16.1f}")
+
+    # own import time summed up per top level package
+    packages = {}
+    for name, self_us, _, _ in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(f"\n{'package':<45} {'total [ms]':>10}")
+    for package, total_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{package:<45} {total_us / 1000:>10.1f}")
+
+
+def cold_start(runs):
+    results = [json.loads(run_python(["-c", cold_start_script % deferred_modules]).stdout.strip().splitlines()[-1])
+               for _ in range(runs)]
+    return [result["seconds"] for result in results], sorted({m for result in results for m in result["loaded"]})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    print_profile(import_profile(), args.top)
+
+    seconds, loaded = cold_start(args.runs)
+    median = statistics.median(seconds)
+    print(f"\ncold import of app: median {median:.3f} s, min {min(seconds):.3f} s, max {max(seconds):.3f} s "
+          f"over {args.runs} runs (budget {args.budget:.3f} s)")
+    failed = False
+    if median > args.budget:
+        print(f"FAIL: start-up exceeds the budget by {median - args.budget:.3f} s")
+        failed = True
+    if loaded:
+        print(f"FAIL: deferred modules imported at start-up: {', '.join(loaded)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
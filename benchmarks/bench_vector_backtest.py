@@ -0,0 +1,109 @@
+# Equivalence check and speed comparison of vector_backtest against the backtrader engine
+# Run from the repository root: python -m benchmarks.bench_vector_backtest [years]
+# Exits with 1 if a trade or the final value of any checked run differs from backtrader.
+import math
+import sys
+import time
+import backtrader as bt
+import numpy as np
+import pandas as pd
+import backtest_engine
+import strategy_events
+import vector_backtest
+from strategies.buyandhold import BuyAndHold
+from strategies.timerange_breakout import BreakoutStrategy
+
+# (strategy, params) pairs which are checked
+cases = [
+    (BuyAndHold, {}),
+    (BreakoutStrategy, {}),
+    (BreakoutStrategy, {"breakout_period": 5, "close_period": 3}),
+    (BreakoutStrategy, {"breakout_period": 120, "close_period": 30}),
+]
+
+
+def ohlc_frame(years, seed=0):
+    # random walk daily bars with overnight gaps, so fills at the open differ from the signal close
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2000-01-03", periods=int(years * 252), name="Date")
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, len(index))))
+    open_ = np.r_[close[0], close[:-1]] * np.exp(rng.normal(0, 0.01, len(index)))
+    return pd.DataFrame({"Open": open_, "High": np.maximum(open_, close) * 1.005,
+                         "Low": np.minimum(open_, close) * 0.995, "Close": close, "Adj Close": close,
+                         "Volume": rng.integers(10 ** 5, 10 ** 6, len(index)).astype("float64")}, index=index)
+
+
+class TradeList(bt.Analyzer):
+    def start(self):
+        self.rets.trades = []
+
+    def notify_trade(self, trade):
+        if trade.isclosed:
+            self.rets.trades.append((trade.open_datetime().date(), trade.close_datetime().date(),
+                                     abs(trade.history[0].event.size) if trade.history else None, trade.pnlcomm))
+
+
+def backtrader_run(bars, strategy, cash, comission, params):
+    cerebro = backtest_engine.build_cerebro(bars, strategy, cash, 1, comission, params)
+    cerebro.addanalyzer(TradeList, _name="tradelist")
+    strat = cerebro.run()[0]
+    return strat.analyzers.tradelist.get_analysis().trades, backtest_engine.summarize(strat)
+
+
+def compare(bars, strategy, cash, comission, params):
+    expected_trades, expected = backtrader_run(bars, strategy, cash, comission, params)
+    trades, _, actual = vector_backtest.run_backtest(bars, strategy, cash, comission, params)
+    closed = trades[trades["exit_bar"].notna()]
+    actual_trades = list(zip(closed["entry_date"].dt.date, closed["exit_date"].dt.date, closed["pnlcomm"]))
+    problems = []
+    if len(actual_trades) != len(expected_trades):
+        problems.append(f"trades {len(actual_trades)} != {len(expected_trades)}")
+    for (entry, exit, pnlcomm), (bt_entry, bt_exit, _, bt_pnlcomm) in zip(actual_trades, expected_trades):
+        if (entry, exit) != (bt_entry, bt_exit) or not math.isclose(pnlcomm, bt_pnlcomm, rel_tol=1e-9, abs_tol=1e-6):
+            problems.append(f"trade {entry}..{exit} {pnlcomm:.4f} != {bt_entry}..{bt_exit} {bt_pnlcomm:.4f}")
+            break
+    for key in ["trades", "wins", "losses", "final_value", "max_drawdown"]:
+        if not math.isclose(actual[key], expected[key], rel_tol=1e-9, abs_tol=1e-6):
+            problems.append(f"{key} {actual[key]} != {expected[key]}")
+    return problems
+
+
+def check_equivalence(seeds=range(5), cash_amounts=(1000, 10_000, 1_000_000), comissions=(0.1, 1.0)):
+    failures = 0
+    for seed in seeds:
+        bars = ohlc_frame(4, seed)
+        for strategy, params in cases:
+            for cash in cash_amounts:
+                for comission in comissions:
+                    problems = compare(bars, strategy, cash, comission, params)
+                    if problems:
+                        failures += 1
+                        print(f"MISMATCH {strategy.__name__} {params} seed={seed} cash={cash} "
+                              f"comission={comission}: {'; '.join(problems)}")
+    runs = len(seeds) * len(cases) * len(cash_amounts) * len(comissions)
+    print(f"equivalence: {runs - failures}/{runs} runs identical to backtrader")
+    return failures == 0
+
+
+def benchmark(years):
+    bars = ohlc_frame(years, seed=42)
+    print(f"{'strategy':>18} {'bars':>6} {'backtrader [ms]':>16} {'vector [ms]':>12} {'speedup':>8}")
+    for strategy, params in cases[:2]:
+        start = time.perf_counter()
+        backtrader_run(bars, strategy, 10_000, 0.1, params)
+        backtrader_seconds = time.perf_counter() - start
+        repeats = 20
+        start = time.perf_counter()
+        for _ in range(repeats):
+            vector_backtest.run_backtest(bars, strategy, 10_000, 0.1, params)
+        vector_seconds = (time.perf_counter() - start) / repeats
+        print(f"{strategy.__name__:>18} {len(bars):>6} {backtrader_seconds * 1000:>16.1f} {vector_seconds * 1000:>12.2f} "
+              f"{backtrader_seconds / vector_seconds:>7.0f}x")
+
+
+if __name__ == "__main__":
+    # nobody reads the events of the backtrader runs
+    strategy_events.level = strategy_events.OFF
+    identical = check_equivalence()
+    benchmark(float(sys.argv[1]) if len(sys.argv) > 1 else 20)
+    sys.exit(0 if identical else 1)
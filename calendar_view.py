@@ -0,0 +1,55 @@
+import io
+import numpy as np
+import pandas as pd
+
+# Values the calendar heatmap can show per day -> (column of year_days, colormap)
+calendar_metrics = {
+    "P&L": ("pnl", "RdYlGn"),
+    "Trades": ("trades", "github"),
+}
+
+
+def year_days(day_rollup, year):
+    # P&L and number of closed trades per calendar day of the year from the Day rollup of pnl_rollups,
+    # days without exits are 0
+    calendar = pd.date_range(f"{year}-01-01", f"{year}-12-31", freq="D", name="day")
+    return pd.DataFrame({"pnl": day_rollup["pnl"].reindex(calendar, fill_value=0.0).astype("float64"),
+                         "trades": day_rollup["trades"].reindex(calendar, fill_value=0).astype("int64")})
+
+
+def render_heatmap(daily, metric):
+    # -> PNG bytes. A standalone Figure keeps the pyplot state machine out of the sessions' threads
+    from matplotlib.figure import Figure
+    import july
+
+    column, cmap = calendar_metrics[metric]
+    values = daily[column].to_numpy(dtype="float64")
+    if column == "pnl":
+        # symmetric color range, so losses are red and gains green whatever the year looks like
+        limit = max(np.abs(values).max(), 1.0)
+        color_range = dict(cmin=-limit, cmax=limit)
+    else:
+        color_range = dict(cmin=None, cmax=max(values.max(), 1.0))
+
+    fig = Figure()
+    ax = fig.subplots()
+    july.heatmap(daily.index.date,
+                 values,
+                 ax=ax,
+                 month_grid=True,
+                 horizontal=True,
+                 value_label=False,
+                 date_label=False,
+                 weekday_label=True,
+                 month_label=True,
+                 year_label=True,
+                 colorbar=True,
+                 fontsize=8,
+                 title=None,
+                 titlesize='medium',
+                 dpi=140,
+                 cmap=cmap,
+                 **color_range)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
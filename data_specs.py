@@ -1,40 +1,5 @@
-journal_data_df_colums = [
-    "tradeinfo_Ticker",
-    "tradeinfo_entry_date",
-    "tradeinfo_entry_price",
-    "tradeinfo_exit_date",
-    "tradeinfo_exit_price",
-    "tradeinfo_number_shares",
-    "tradeinfo_gain_percentage",
-    "tradeinfo_gain_absolut",
-    "tradeinfo_tax",
-    "tradeinfo_fees",
-
-    "fundamentals_sector",
-    "fundamentals_market_cap",
-    "fundamentals_price_to_earning",
-    "fundamentals_price_to_book",
-    "fundamentals_dept_to_equity",
-    "fundamentals_free_cash_flow",
-    "fundamentals_PEG_ratio",
-    "fundamentals_market_sentiment",
-    "fundamentals_additional_ideas",
-
-    "technical_risk_reward_ratio",
-    "technical_RSI",
-    "technical_trend_mac_d",
-    "technical_on_balance_volume",
-    "technical_AD_line",
-    "technical_ADX",
-    "technical_aroon_indicator",
-
-    "human_trading_idea_description",
-    "human_mood_on_entry",
-    "human_mood_on_exit",
-    "human_mistake",
-    "human_reflection_for_improvement",
-    "human_picture_path",
-]
+from collections import namedtuple
+import pandas as pd
 
 sectors = [
     "Basic Materials",
@@ -121,3 +86,78 @@ trading_mistakes = [
     "Not considering the opportunity cost of investment decisions",
     "Investing without understanding the level of risk involved"
 ]
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Schema registry: one entry per journal column, in display order.
+# dtype:      pandas dtype the column is kept in ("category" uses the vocabulary as categories)
+# category:   form column the field is shown in: 0 tradeinfo, 1 fundamentals, 2 technical, 3 human, -1 not shown
+# widget:     "text", "number", "date", "select" (from vocabulary), "picture", "derived" (calculated) or "hidden"
+# rounding:   decimal places the value is rounded to, None keeps it as is
+# on_open:    field is entered in the Open Trade form
+# on_close:   field is entered in the Close Trade form, the Edit form shows every field which is not derived
+FieldSpec = namedtuple("FieldSpec", ["dtype", "category", "widget", "vocabulary", "rounding", "on_open", "on_close"],
+                       defaults=[None, None, False, False])
+
+journal_schema = {
+    "trade_id": FieldSpec("object", -1, "hidden"),
+
+    "tradeinfo_Ticker": FieldSpec("object", 0, "text", on_open=True, on_close=True),
+    "tradeinfo_entry_date": FieldSpec("datetime64[ns]", 0, "date", on_open=True, on_close=True),
+    "tradeinfo_entry_price": FieldSpec("float64", 0, "number", rounding=2, on_open=True, on_close=True),
+    "tradeinfo_exit_date": FieldSpec("datetime64[ns]", 0, "date", on_close=True),
+    "tradeinfo_exit_price": FieldSpec("float64", 0, "number", rounding=2, on_close=True),
+    "tradeinfo_number_shares": FieldSpec("float64", 0, "number", on_open=True),
+    "tradeinfo_gain_percentage": FieldSpec("float64", 0, "derived", rounding=2),
+    "tradeinfo_gain_absolut": FieldSpec("float64", 0, "derived", rounding=2),
+    "tradeinfo_tax": FieldSpec("float64", 0, "number", rounding=2),
+    "tradeinfo_fees": FieldSpec("float64", 0, "number", rounding=2),
+
+    "fundamentals_sector": FieldSpec("category", 1, "select", sectors, on_open=True),
+    "fundamentals_market_cap": FieldSpec("category", 1, "select", market_cap_ranges, on_open=True),
+    "fundamentals_price_to_earning": FieldSpec("float32", 1, "number", rounding=2, on_open=True),
+    "fundamentals_price_to_book": FieldSpec("float32", 1, "number", rounding=2, on_open=True),
+    "fundamentals_dept_to_equity": FieldSpec("float32", 1, "number", rounding=2, on_open=True),
+    "fundamentals_free_cash_flow": FieldSpec("float64", 1, "number", rounding=2, on_open=True),
+    "fundamentals_PEG_ratio": FieldSpec("float32", 1, "number", rounding=2, on_open=True),
+    "fundamentals_market_sentiment": FieldSpec("category", 1, "select", market_sentiment, on_open=True),
+    "fundamentals_additional_ideas": FieldSpec("object", 1, "text", on_open=True),
+
+    "technical_risk_reward_ratio": FieldSpec("category", 2, "select", risk_reward_ratios, on_open=True),
+    "technical_RSI": FieldSpec("float32", 2, "number", rounding=2, on_open=True),
+    "technical_trend_mac_d": FieldSpec("float32", 2, "number", rounding=2, on_open=True),
+    "technical_on_balance_volume": FieldSpec("float64", 2, "number", rounding=2, on_open=True),
+    "technical_AD_line": FieldSpec("float32", 2, "number", rounding=2, on_open=True),
+    "technical_ADX": FieldSpec("float32", 2, "number", rounding=2, on_open=True),
+    "technical_aroon_indicator": FieldSpec("float32", 2, "number", rounding=2, on_open=True),
+
+    "human_trading_idea_description": FieldSpec("object", 3, "text", on_open=True),
+    "human_mood_on_entry": FieldSpec("category", 3, "select", sorted_moods, on_open=True),
+    "human_mood_on_exit": FieldSpec("category", 3, "select", sorted_moods, on_close=True),
+    "human_mistake": FieldSpec("category", 3, "select", trading_mistakes, on_close=True),
+    "human_reflection_for_improvement": FieldSpec("object", 3, "text", on_close=True),
+    "human_picture_path": FieldSpec("object", 3, "picture"),
+}
+
+journal_data_df_colums = list(journal_schema)
+
+form_categories = {"tradeinfo": 0, "fundamentals": 1, "technical": 2, "human": 3}
+
+
+def field_spec(col):
+    # columns unknown to the registry (e.g. from older journals) are free text in the form column of their prefix
+    spec = journal_schema.get(col)
+    if spec is None:
+        spec = FieldSpec("object", form_categories.get(col.split("_")[0], -1), "text")
+    return spec
+
+
+def journal_dtype(col):
+    spec = field_spec(col)
+    if spec.dtype == "category":
+        return pd.CategoricalDtype(spec.vocabulary)
+    return pd.api.types.pandas_dtype(spec.dtype)
+
+
+def columns_of_dtype(dtype):
+    return [col for col, spec in journal_schema.items() if spec.dtype == dtype]
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import data_specs
+
+# Inputs of the gain calculation, coerced to float before anything is derived
+price_columns = ["tradeinfo_entry_price", "tradeinfo_exit_price", "tradeinfo_number_shares"]
+
+# Derived columns: column -> (input columns, formula on float arrays).
+# A derived value is only computed for rows where all inputs are given, other rows keep their stored value.
+derived_columns = {
+    "tradeinfo_gain_absolut": (price_columns, lambda entry, exit, shares: (exit - entry) * shares),
+    "tradeinfo_gain_percentage": (price_columns, lambda entry, exit, shares: ((exit / entry) - 1) * 100),
+}
+
+# Rounding rules: column -> decimal places, declared per field in the data_specs schema registry
+rounding_rules = {col: spec.rounding for col, spec in data_specs.journal_schema.items() if spec.rounding is not None}
+
+
+def float_values(df, col):
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    if df[col].dtype.kind != "f":
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df[col].to_numpy(dtype="float64")
+
+
+def apply_derivations(df):
+    # Single pass over the journal: every derived or rounded column is replaced exactly once,
+    # rows are neither split, concatenated nor reordered
+    derived = {}
+    for col, (inputs, formula) in derived_columns.items():
+        values = [float_values(df, input_col) for input_col in inputs]
+        complete = np.logical_and.reduce([~np.isnan(v) for v in values])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = formula(*values)
+        # keep the stored value where an input is missing
+        derived[col] = np.where(complete, result, float_values(df, col))
+
+    for col in set(rounding_rules) | set(derived):
+        if col in derived:
+            values = derived[col]
+        elif col in df.columns and df[col].dtype.kind == "f":
+            values = df[col].to_numpy(dtype="float64", copy=True)
+        else:
+            continue
+        if col in rounding_rules:
+            np.round(values, rounding_rules[col], out=values)
+        # back into the registry dtype, e.g. float32 for ratios
+        df[col] = values.astype(data_specs.journal_dtype(col), copy=False)
+    return df
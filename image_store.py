@@ -0,0 +1,134 @@
+import collections
+import hashlib
+import io
+import os
+import pathlib
+import re
+import threading
+import time
+import storage
+
+# Largest side of a thumbnail in pixels
+THUMBNAIL_SIZE = 480
+
+# Names of the files put() writes, collect_garbage() never touches anything else
+stored_name = re.compile(r"^[0-9a-f]{64}\.(png|jpg|jpeg|webp|gif)$")
+
+
+class ImageStore:
+    # Trade screenshots by content: <sha256>.<ext>, so uploading the same picture twice keeps one file
+    # and same named uploads never overwrite each other. A thumbnail is written next to it at upload time
+    # and served from an in-memory LRU, the full image is only read when asked for.
+
+    def __init__(self, directory, thumbnail_size=THUMBNAIL_SIZE, cache_entries=256):
+        self.directory = pathlib.Path(directory)
+        self.thumbnail_directory = self.directory.joinpath("thumbnails")
+        self.thumbnail_directory.mkdir(parents=True, exist_ok=True)
+        self.thumbnail_size = thumbnail_size
+        self.cache_entries = cache_entries
+        self.lock = threading.Lock()
+        self.thumbnails = collections.OrderedDict()
+
+    def put(self, data, name=""):
+        # -> path of the stored image, the path of the existing copy when the content is already stored
+        digest = hashlib.sha256(data).hexdigest()
+        suffix = pathlib.Path(name).suffix.lower() or ".img"
+        # a <digest>.<ext>.tmp left by an interrupted write is not a stored image
+        existing = next((path for path in self.directory.glob(f"{digest}.*") if path.suffix != ".tmp"), None)
+        if existing is not None:
+            # fresh again for collect_garbage, the new reference may not be saved yet
+            os.utime(existing)
+            return str(existing)
+        path = self.directory.joinpath(f"{digest}{suffix}")
+        storage.write_atomically(path, lambda tmp_path: tmp_path.write_bytes(data))
+        self.write_thumbnail(path, data)
+        return str(path)
+
+    def thumbnail_path(self, path):
+        # the full file name, pictures from before the store may share their stem
+        return self.thumbnail_directory.joinpath(f"{pathlib.Path(path).name}.{self.thumbnail_format()[1]}")
+
+    def thumbnail_format(self):
+        from PIL import features
+        return ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+
+    def make_thumbnail(self, data):
+        from PIL import Image, ImageOps
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+        image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format=self.thumbnail_format()[0], quality=80)
+        return buffer.getvalue()
+
+    def write_thumbnail(self, path, data):
+        try:
+            thumbnail = self.make_thumbnail(data)
+        except (OSError, ValueError) as e:
+            # not an image PIL can read, it is kept but shown without preview
+            print(f"no thumbnail for {path}: {e}")
+            return None
+        storage.write_atomically(self.thumbnail_path(path), lambda tmp_path: tmp_path.write_bytes(thumbnail))
+        return thumbnail
+
+    def thumbnail(self, path):
+        # -> thumbnail bytes or None. Pictures from before the store (any path) get theirs on first view.
+        path = pathlib.Path(path)
+        try:
+            key = (str(path.resolve()), os.stat(path).st_mtime_ns)
+        except OSError:
+            return None
+        with self.lock:
+            if key in self.thumbnails:
+                self.thumbnails.move_to_end(key)
+                return self.thumbnails[key]
+        thumbnail_path = self.thumbnail_path(path) if self.contains(path) else None
+        if thumbnail_path is not None and thumbnail_path.exists():
+            thumbnail = thumbnail_path.read_bytes()
+        elif thumbnail_path is not None:
+            thumbnail = self.write_thumbnail(path, path.read_bytes())
+        else:
+            try:
+                thumbnail = self.make_thumbnail(path.read_bytes())
+            except (OSError, ValueError):
+                thumbnail = None
+        with self.lock:
+            self.thumbnails[key] = thumbnail
+            while len(self.thumbnails) > self.cache_entries:
+                self.thumbnails.popitem(last=False)
+        return thumbnail
+
+    def full(self, path):
+        try:
+            return pathlib.Path(path).read_bytes()
+        except OSError:
+            return None
+
+    def contains(self, path):
+        return pathlib.Path(path).resolve().parent == self.directory.resolve()
+
+    def collect_garbage(self, referenced, min_age=60 * 60):
+        # Removes images written by put() which no trade refers to any more, with their thumbnails. Other files
+        # are left alone. References match by file name, journals may hold absolute paths of a moved checkout
+        # (also Windows paths). Files younger than min_age seconds are kept, an upload may belong to a form
+        # which is not submitted yet.
+        referenced = {pathlib.PureWindowsPath(path).name for path in referenced if isinstance(path, str) and path}
+        now = time.time()
+        removed = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or not stored_name.match(entry.name) or entry.name in referenced or \
+                    now - entry.stat().st_mtime < min_age:
+                continue
+            path = pathlib.Path(entry.path)
+            os.remove(path)
+            thumbnail_path = self.thumbnail_path(path)
+            if thumbnail_path.exists():
+                os.remove(thumbnail_path)
+            removed.append(str(path))
+        # thumbnails whose image is gone
+        images = {entry.name for entry in os.scandir(self.directory) if entry.is_file()}
+        for entry in os.scandir(self.thumbnail_directory):
+            if pathlib.Path(entry.name).stem not in images:
+                os.remove(entry.path)
+        return removed
@@ -0,0 +1,89 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def yahoo_info(ticker):
+    import yfinance as yf
+    return yf.Ticker(ticker).info
+
+
+class InfoCache:
+    # Persistent ticker info (fundamentals) in SQLite. Entries older than ttl seconds are stale: they are
+    # still returned at once while a background thread fetches the new info (stale-while-revalidate).
+    # Only a ticker which was never fetched waits for the download. Beyond max_entries the least
+    # recently used tickers are evicted.
+    table = "ticker_info"
+
+    def __init__(self, path, fetch=yahoo_info, ttl=24 * 60 * 60, max_entries=2000, workers=2):
+        self.path = path
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="info-refresh")
+        self.refreshing = set()
+        with self.lock, self.connection:
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS {self.table} "
+                                    f"(ticker TEXT PRIMARY KEY, info TEXT NOT NULL, "
+                                    f"fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed_at "
+                                    f"ON {self.table} (accessed_at)")
+
+    def get(self, ticker):
+        ticker = ticker.upper()
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute(f"SELECT info, fetched_at FROM {self.table} WHERE ticker = ?",
+                                          (ticker,)).fetchone()
+            if row is not None:
+                self.connection.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE ticker = ?", (now, ticker))
+        if row is None:
+            return self.refresh(ticker)
+        info, fetched_at = row
+        if now - fetched_at > self.ttl:
+            self.refresh_in_background(ticker)
+        return json.loads(info)
+
+    def refresh(self, ticker):
+        info = self.fetch(ticker)
+        if info:
+            self.put(ticker, info)
+        return info
+
+    def refresh_in_background(self, ticker):
+        with self.lock:
+            if ticker in self.refreshing:
+                return
+            self.refreshing.add(ticker)
+        self.executor.submit(self.background_refresh, ticker)
+
+    def background_refresh(self, ticker):
+        try:
+            self.refresh(ticker)
+        except Exception as e:
+            # the stale entry stays in place and is retried on the next lookup
+            print(f"refreshing info of {ticker} failed: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(ticker)
+
+    def put(self, ticker, info):
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(f"INSERT OR REPLACE INTO {self.table} (ticker, info, fetched_at, accessed_at) "
+                                    f"VALUES (?, ?, ?, ?)", (ticker, json.dumps(info, default=str), now, now))
+            self.evict()
+
+    def evict(self):
+        # keep the max_entries most recently used tickers, caller holds the lock
+        self.connection.execute(f"DELETE FROM {self.table} WHERE ticker NOT IN "
+                                f"(SELECT ticker FROM {self.table} ORDER BY accessed_at DESC LIMIT ?)",
+                                (self.max_entries,))
+
+    def invalidate(self, ticker):
+        with self.lock, self.connection:
+            self.connection.execute(f"DELETE FROM {self.table} WHERE ticker = ?", (ticker.upper(),))
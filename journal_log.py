@@ -0,0 +1,136 @@
+import datetime
+import json
+import os
+import pathlib
+import numpy as np
+import pandas as pd
+import storage
+from storage import TRADE_ID, new_trade_id
+
+# Operations written to the log, every record carries the stable trade id it applies to
+OPEN, CLOSE, EDIT, DELETE = "open", "close", "edit", "delete"
+
+
+def to_json_value(value):
+    # json.dumps fallback for the values coming out of the journal DataFrame and the forms
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (datetime.date, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def read_log(log_path):
+    if not os.path.exists(log_path):
+        return []
+    records = []
+    with open(log_path, "r") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # a torn line from a crash during the append, everything before it is intact
+                print(f"skipped unreadable record in {log_path}")
+    return records
+
+
+def replay(df, records, columns=None):
+    # Apply the logged operations to the base DataFrame, one vectorized step per operation kind
+    if not records:
+        return df
+    log = pd.DataFrame.from_records(records, columns=["op", "id", "fields"])
+
+    # open: upsert, so replaying a log which was already compacted into the base stays correct
+    opens = log[log["op"] == OPEN].drop_duplicates("id", keep="last")
+    if len(opens) > 0:
+        opened = pd.DataFrame.from_records(opens["fields"].tolist())
+        opened[TRADE_ID] = opens["id"].to_numpy()
+        opened = opened[[col for col in opened.columns if columns is None or col in columns or col == TRADE_ID]]
+        storage.coerce_columns(opened, opened.columns)
+        df = pd.concat([df[~df[TRADE_ID].isin(opened[TRADE_ID])], opened], ignore_index=True)
+
+    # close / edit: last write per (trade, column) wins
+    updates = log[log["op"].isin([CLOSE, EDIT])]
+    if len(updates) > 0:
+        changes = pd.DataFrame(
+            [(trade_id, col, value) for trade_id, fields in zip(updates["id"], updates["fields"])
+             for col, value in fields.items() if col in df.columns and col != TRADE_ID],
+            columns=["id", "column", "value"],
+        ).drop_duplicates(["id", "column"], keep="last")
+        changes["row"] = pd.Index(df[TRADE_ID]).get_indexer(changes["id"])
+        changes = changes[changes["row"] >= 0]
+        for col, col_changes in changes.groupby("column"):
+            values = df[col].astype(object).to_numpy(copy=True)
+            values[col_changes["row"].to_numpy()] = col_changes["value"].to_numpy()
+            df[col] = values
+        storage.coerce_columns(df, changes["column"].unique())
+
+    deleted = log.loc[log["op"] == DELETE, "id"]
+    if len(deleted) > 0:
+        df = df[~df[TRADE_ID].isin(deleted)].reset_index(drop=True)
+    return df
+
+
+class LoggedStore(storage.JournalStore):
+    # Wraps a file store: trade changes are appended to <base file>.log and folded into
+    # the base file only when the log grows past compact_bytes
+
+    def __init__(self, base, compact_bytes=256 * 1024):
+        super().__init__(base.path)
+        self.base = base
+        self.log_path = pathlib.Path(f"{base.path}.log")
+        self.compact_bytes = compact_bytes
+
+    def fingerprint(self):
+        return self.base.fingerprint(), storage.file_fingerprint(self.log_path)
+
+    def load(self, columns=None):
+        if columns is not None and TRADE_ID not in columns:
+            columns = [TRADE_ID] + list(columns)
+        df = self.base.load(columns)
+        if TRADE_ID not in df.columns or df[TRADE_ID].isna().any():
+            # journal from before trade ids existed: assign them once and persist them
+            self.assign_trade_ids()
+            df = self.base.load(columns)
+        return replay(df, read_log(self.log_path), columns)
+
+    def save(self, df):
+        # Full rewrite of the base file, the log is folded in and can be dropped
+        storage.assign_trade_ids(df)
+        self.base.save(df)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+    def assign_trade_ids(self):
+        df = self.base.load()
+        if TRADE_ID not in df.columns:
+            df[TRADE_ID] = None
+        self.save(replay(df, read_log(self.log_path)))
+
+    def compact(self):
+        self.save(self.load())
+
+    def append(self, op, trade_id, fields=None):
+        record = json.dumps({"op": op, "id": trade_id, "fields": fields or {}}, default=to_json_value)
+        with open(self.log_path, "a") as f:
+            f.write(record + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.getsize(self.log_path) > self.compact_bytes:
+            self.compact()
+
+    def open_trade(self, fields):
+        trade_id = new_trade_id()
+        self.append(OPEN, trade_id, {col: value for col, value in fields.items() if col != TRADE_ID})
+        return trade_id
+
+    def close_trade(self, trade_id, fields):
+        self.append(CLOSE, trade_id, fields)
+
+    def edit_trade(self, trade_id, fields):
+        self.append(EDIT, trade_id, fields)
+
+    def delete_trade(self, trade_id):
+        self.append(DELETE, trade_id)
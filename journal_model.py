@@ -0,0 +1,185 @@
+import threading
+import numpy as np
+import pandas as pd
+import journal_stats
+import pnl_rollups
+import storage
+import symbol_stats
+import trade_table
+from storage import TRADE_ID
+
+
+def typed_row(trade_id, record, columns):
+    # one trade as a journal row in the registry dtypes, like the store would load it
+    row = pd.DataFrame([{col: record.get(col) for col in columns}])
+    row[TRADE_ID] = trade_id
+    storage.coerce_columns(row, row.columns)
+    return row
+
+
+def aligned_categories(frame, row):
+    # the same categories in frame and row, so they can be combined without falling back to object columns
+    for col in frame.columns:
+        if not isinstance(frame[col].dtype, pd.CategoricalDtype):
+            continue
+        new = [value for value in row[col].dropna() if value not in frame[col].cat.categories]
+        if new:
+            frame = frame.copy(deep=False)
+            frame[col] = frame[col].cat.add_categories(new)
+        row[col] = row[col].cat.set_categories(frame[col].cat.categories)
+    return frame, row
+
+
+def replaced_row(frame, position, row):
+    # a new frame with the row at position replaced, only the changed columns are copied
+    frame = frame.copy(deep=False)
+    for col in frame.columns:
+        value, current = row[col].iloc[0], frame[col].iloc[position]
+        if (pd.isna(value) and pd.isna(current)) or (not pd.isna(value) and not pd.isna(current) and value == current):
+            continue
+        values = frame[col].copy()
+        values.iloc[position] = value
+        frame[col] = values
+    return frame
+
+
+class JournalModel:
+    # Process wide journal: the derived DataFrame, the dashboard statistics, per symbol statistics and P&L rollups are
+    # built once per store fingerprint and shared by all reruns and browser sessions. Sessions get shallow views,
+    # with pandas copy-on-write enabled their changes never reach the shared frame.
+
+    def __init__(self, store, derive):
+        self.store = store
+        self.derive = derive
+        self.lock = threading.RLock()
+        self.fingerprint = None
+        self.version = 0
+        self.frame = None
+        self.stats = None
+        self.symbols = None
+        self.rollups = None
+        self.table = None
+
+    def refresh(self):
+        # (re)load the journal and rebuild everything derived from it
+        with self.lock:
+            fingerprint = self.store.fingerprint()
+            self.frame = self.derive(self.store.load())
+            self.stats = journal_stats.JournalStatistics.from_frame(self.frame)
+            self.symbols = symbol_stats.SymbolStatistics.from_frame(self.frame)
+            self.rollups = pnl_rollups.PnlRollups.from_frame(self.frame)
+            self.fingerprint = fingerprint
+            self.version += 1
+            self.table = None
+
+    def apply(self, trade_id, record=None):
+        # One trade change on the in-memory frame and the running state instead of a reload, record None removes
+        # the trade. Only the row is typed and derived, and the running state gets that derived row, the same
+        # values from_frame() sees on the next load. The fingerprint is taken after the store wrote the change,
+        # so only changes from outside make current() reload.
+        frame = self.frame
+        if record is None:
+            for state in self.running_state():
+                state.discard(trade_id)
+            frame = frame[frame[TRADE_ID] != trade_id].reset_index(drop=True)
+        elif set(record) - set(frame.columns):
+            # a column the journal does not have yet
+            self.refresh()
+            return
+        else:
+            row = self.derive(typed_row(trade_id, record, frame.columns))
+            derived = row.iloc[0].to_dict()
+            for state in self.running_state():
+                state.upsert(trade_id, derived)
+            frame, row = aligned_categories(frame, row)
+            positions = np.flatnonzero(frame[TRADE_ID].to_numpy() == trade_id)
+            frame = replaced_row(frame, positions[0], row) if len(positions) else \
+                pd.concat([frame, row], ignore_index=True)
+        self.frame = frame
+        self.fingerprint = self.store.fingerprint()
+        self.version += 1
+        self.table = None
+
+    def current(self):
+        # an external change of the journal file (other process, manual edit) invalidates the model
+        with self.lock:
+            if self.frame is None or self.store.fingerprint() != self.fingerprint:
+                self.refresh()
+            return self.frame
+
+    def view(self, columns=None):
+        frame = self.current()
+        if columns is not None:
+            frame = frame[[col for col in columns if col in frame.columns]]
+        return frame.copy(deep=False)
+
+    def statistics(self):
+        with self.lock:
+            self.current()
+            return self.stats
+
+    def symbol_statistics(self):
+        with self.lock:
+            self.current()
+            return self.symbols
+
+    def pnl_rollups(self):
+        with self.lock:
+            self.current()
+            return self.rollups
+
+    def table_index(self):
+        # filter and sort index of the trade table, built on first use per journal version
+        with self.lock:
+            frame = self.current()
+            if self.table is None:
+                self.table = trade_table.TradeTableIndex(frame)
+            return self.table
+
+    # The queries of the trade forms, answered from the frame of the current version instead of the store
+
+    def open_trades(self, columns=None):
+        index = self.table_index()
+        return index.trades(index.is_open, columns)
+
+    def closed_trades(self, columns=None):
+        index = self.table_index()
+        return index.trades(~index.is_open, columns)
+
+    def get_trade(self, trade_id):
+        return self.table_index().trade(trade_id)
+
+    # Trade changes go through the model, so the frame and the statistics follow them without a reload
+
+    def running_state(self):
+        return [self.stats, self.symbols, self.rollups]
+
+    def open_trade(self, fields):
+        with self.lock:
+            self.current()
+            trade_id = self.store.open_trade(fields)
+            self.apply(trade_id, fields)
+            return trade_id
+
+    def close_trade(self, trade_id, fields, trade):
+        with self.lock:
+            self.current()
+            self.store.close_trade(trade_id, fields)
+            self.apply(trade_id, {**trade, **fields})
+
+    def edit_trade(self, trade_id, fields, trade):
+        with self.lock:
+            self.current()
+            self.store.edit_trade(trade_id, fields)
+            self.apply(trade_id, {**trade, **fields})
+
+    def delete_trade(self, trade_id):
+        with self.lock:
+            self.current()
+            self.store.delete_trade(trade_id)
+            self.apply(trade_id)
+
+    def save(self, df):
+        with self.lock:
+            self.store.save(df)
+            self.refresh()
@@ -0,0 +1,286 @@
+import math
+import random
+import numpy as np
+import pandas as pd
+from storage import TRADE_ID
+
+
+def to_number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return number
+
+
+def to_timestamp(value):
+    timestamp = pd.to_datetime(value, errors="coerce")
+    return None if pd.isna(timestamp) else timestamp
+
+
+def trade_contribution(record):
+    # What a single trade adds to the statistics: (gain, exit date, holding period)
+    entry_price = to_number(record.get("tradeinfo_entry_price"))
+    exit_price = to_number(record.get("tradeinfo_exit_price"))
+    shares = to_number(record.get("tradeinfo_number_shares"))
+    if math.isnan(entry_price) or math.isnan(exit_price) or math.isnan(shares):
+        # same rule as main(): gains are only recomputed when all prices are given
+        gain = to_number(record.get("tradeinfo_gain_absolut"))
+    else:
+        gain = (exit_price - entry_price) * shares
+    gain = None if math.isnan(gain) else gain
+    entry_date = to_timestamp(record.get("tradeinfo_entry_date"))
+    exit_date = to_timestamp(record.get("tradeinfo_exit_date"))
+    # holding period in nanoseconds, python ints do not overflow when summed up
+    holding = (exit_date - entry_date).value if entry_date is not None and exit_date is not None else None
+    return gain, exit_date, holding
+
+
+def frame_gains(df):
+    # the gain rule of trade_contribution for a whole journal at once, NaN where no gain is known
+    def column(col):
+        return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64") if col in df.columns \
+            else np.full(len(df), np.nan)
+    entry, exit, shares = column("tradeinfo_entry_price"), column("tradeinfo_exit_price"), \
+        column("tradeinfo_number_shares")
+    complete = ~(np.isnan(entry) | np.isnan(exit) | np.isnan(shares))
+    return np.where(complete, (exit - entry) * shares, column("tradeinfo_gain_absolut"))
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Treap ordered by (exit date, trade id). Every node keeps the aggregates of its subtree in exit order:
+# sum of gains, highest and lowest running total and the max drawdown, so inserting or removing a trade
+# anywhere in the timeline only touches O(log n) nodes.
+
+class Node:
+    __slots__ = ("key", "gain", "priority", "left", "right", "total", "max_prefix", "min_prefix", "max_drawdown")
+
+    def __init__(self, key, gain, priority=None):
+        self.key = key
+        self.gain = gain
+        self.priority = random.random() if priority is None else priority
+        self.left = None
+        self.right = None
+        update(self)
+
+
+def update(node):
+    # node aggregates = left subtree, then the node itself, then the right subtree
+    total, max_prefix, min_prefix, max_drawdown = node.gain, node.gain, node.gain, 0.0
+    left, right = node.left, node.right
+    if left is not None:
+        max_drawdown = max(left.max_drawdown, left.max_prefix - (left.total + node.gain))
+        max_prefix = max(left.max_prefix, left.total + node.gain)
+        min_prefix = min(left.min_prefix, left.total + node.gain)
+        total = left.total + node.gain
+    if right is not None:
+        max_drawdown = max(max_drawdown, right.max_drawdown, max_prefix - (total + right.min_prefix))
+        max_prefix = max(max_prefix, total + right.max_prefix)
+        min_prefix = min(min_prefix, total + right.min_prefix)
+        total = total + right.total
+    node.total, node.max_prefix, node.min_prefix, node.max_drawdown = total, max_prefix, min_prefix, max_drawdown
+
+
+def split(node, key):
+    # -> (keys < key, keys >= key)
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = split(node.right, key)
+        node.right = left
+        update(node)
+        return node, right
+    left, right = split(node.left, key)
+    node.left = right
+    update(node)
+    return left, node
+
+
+def merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = merge(left.right, right)
+        update(left)
+        return left
+    right.left = merge(left, right.left)
+    update(right)
+    return right
+
+
+def build(items):
+    # O(n) treap construction from (key, gain) pairs sorted by key
+    stack = []
+    for key, gain in items:
+        node = Node(key, gain)
+        last = None
+        while stack and stack[-1].priority < node.priority:
+            last = stack.pop()
+            update(last)
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+    for node in reversed(stack):
+        update(node)
+    return stack[0] if stack else None
+
+
+def in_order(node):
+    stack, items = [], []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        items.append((node.key, node.gain))
+        node = node.right
+    return items
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class JournalStatistics:
+    # Dashboard statistics kept as running state, upsert()/discard() update them in O(log n)
+
+    def __init__(self):
+        self.trades = {}
+        self.total_trades = 0
+        self.winning_trades = 0
+        self.losing_trades = 0
+        self.total_profit = 0.0
+        self.total_loss = 0.0
+        self.holding_total = 0
+        self.holding_count = 0
+        self.root = None
+
+    @classmethod
+    def from_frame(cls, df):
+        stats = cls()
+        items = []
+        for record in df.to_dict("records"):
+            contribution = trade_contribution(record)
+            stats.add_counts(record[TRADE_ID], contribution)
+            gain, exit_date, _ = contribution
+            if gain is not None and exit_date is not None:
+                items.append(((exit_date.value, record[TRADE_ID]), gain))
+        stats.root = build(sorted(items))
+        return stats
+
+    def add_counts(self, trade_id, contribution, sign=1):
+        gain, _, holding = contribution
+        if sign > 0:
+            self.trades[trade_id] = contribution
+        self.total_trades += sign
+        if gain is not None and gain > 0:
+            self.winning_trades += sign
+            self.total_profit += sign * gain
+        elif gain is not None and gain < 0:
+            self.losing_trades += sign
+            self.total_loss -= sign * gain
+        if holding is not None:
+            self.holding_total += sign * holding
+            self.holding_count += sign
+
+    def upsert(self, trade_id, record):
+        # open, close and edit: replace whatever the trade contributed before
+        self.discard(trade_id)
+        contribution = trade_contribution(record)
+        self.add_counts(trade_id, contribution)
+        gain, exit_date, _ = contribution
+        if gain is not None and exit_date is not None:
+            key = (exit_date.value, trade_id)
+            left, right = split(self.root, key)
+            self.root = merge(merge(left, Node(key, gain)), right)
+
+    def discard(self, trade_id):
+        contribution = self.trades.pop(trade_id, None)
+        if contribution is None:
+            return
+        self.add_counts(trade_id, contribution, sign=-1)
+        gain, exit_date, _ = contribution
+        if gain is not None and exit_date is not None:
+            key = (exit_date.value, trade_id)
+            left, rest = split(self.root, key)
+            _, right = split(rest, (exit_date.value, trade_id + "\0"))
+            self.root = merge(left, right)
+
+    def exit_gains(self):
+        # gains of the closed trades in chronological exit order, indexed by exit date
+        items = in_order(self.root)
+        dates = pd.to_datetime([key[0] for key, _ in items])
+        return pd.Series([gain for _, gain in items], index=dates, dtype="float64")
+
+    def cumulative_returns(self):
+        # running total of the gains in chronological exit order
+        return self.exit_gains().cumsum()
+
+    def summary(self):
+        profit_factor = self.total_profit / self.total_loss if self.total_loss else \
+            (math.inf if self.total_profit else math.nan)
+        running_max = self.root.max_prefix if self.root is not None else math.nan
+        max_drawdown = self.root.max_drawdown if self.root is not None else math.nan
+        return {
+            "total_trades": self.total_trades,
+            "winning_trades": self.winning_trades,
+            "losing_trades": self.losing_trades,
+            "win_rate": self.winning_trades / self.total_trades if self.total_trades else math.nan,
+            "average_win": self.total_profit / self.winning_trades if self.winning_trades else math.nan,
+            "average_loss": -self.total_loss / self.losing_trades if self.losing_trades else math.nan,
+            "profit_factor": round(profit_factor, 2),
+            "max_drawdown_value": round(max_drawdown, 2),
+            "max_drawdown_percentage": round(max_drawdown / running_max, 2) if running_max else math.nan,
+            "average_holding_period": pd.Timedelta(self.holding_total // self.holding_count) if self.holding_count
+            else pd.NaT,
+        }
+
+    def verify(self, df):
+        # Verification mode: compare the running state against a full recompute, returns the differing metrics
+        expected = recompute_summary(df)
+        actual = self.summary()
+        return [name for name in expected if not same_value(expected[name], actual[name])]
+
+
+def same_value(a, b):
+    if pd.isna(a) or pd.isna(b):
+        return pd.isna(a) and pd.isna(b)
+    if isinstance(a, pd.Timedelta):
+        return abs(a - b) < pd.Timedelta(seconds=1)
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def recompute_summary(df):
+    # Reference implementation from scratch over the whole journal, used by verify()
+    contributions = pd.DataFrame([trade_contribution(record) for record in df.to_dict("records")],
+                                 columns=["gain", "exit_date", "holding"])
+    contributions[TRADE_ID] = df[TRADE_ID].to_numpy()
+    gain = contributions["gain"].astype("float64")
+    total_profit = gain[gain > 0].sum()
+    total_loss = -gain[gain < 0].sum()
+    closed = contributions[gain.notna() & contributions["exit_date"].notna()].copy()
+    closed["exit_date"] = pd.to_datetime(closed["exit_date"])
+    closed = closed.sort_values(["exit_date", TRADE_ID])
+    cumulative_returns = closed["gain"].astype("float64").cumsum()
+    running_max = cumulative_returns.cummax()
+    drawdown = running_max - cumulative_returns
+    holding = contributions["holding"].astype("float64")
+    total_trades = len(df)
+    if total_loss:
+        profit_factor = total_profit / total_loss
+    else:
+        profit_factor = math.inf if total_profit else math.nan
+    return {
+        "total_trades": total_trades,
+        "winning_trades": int((gain > 0).sum()),
+        "losing_trades": int((gain < 0).sum()),
+        "win_rate": (gain > 0).sum() / total_trades if total_trades else math.nan,
+        "average_win": gain[gain > 0].mean(),
+        "average_loss": gain[gain < 0].mean(),
+        "profit_factor": round(profit_factor, 2),
+        "max_drawdown_value": round(drawdown.max(), 2) if len(drawdown) else math.nan,
+        "max_drawdown_percentage": round(drawdown.max() / running_max.max(), 2) if len(drawdown) and running_max.max()
+        else math.nan,
+        "average_holding_period": pd.Timedelta(holding.mean()) if holding.notna().any() else pd.NaT,
+    }
@@ -0,0 +1,164 @@
+import json
+import pathlib
+import re
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import storage
+
+# Bar columns as yfinance delivers them, every cached ticker file has exactly these
+OHLC_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+ONE_DAY = pd.Timedelta(days=1)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Downloaders: download(ticker, start, end) -> daily bars in [start, end) indexed by date, columns OHLC_COLUMNS.
+# Anything with that method can be plugged into OHLCCache, e.g. a local stand-in for tests or offline work.
+# A failed request raises DownloadError, an empty result means there are no bars in the range
+# (weekend, holiday, before the listing).
+
+class DownloadError(Exception):
+    pass
+
+
+class YahooDownloader:
+
+    def download(self, ticker, start, end):
+        import yfinance as yf
+        import yfinance.shared
+        data = yf.download(ticker, start=start, end=end, auto_adjust=False, progress=False)
+        # yfinance reports failures (unknown ticker, network, rate limit) only in its error registry
+        error = yfinance.shared._ERRORS.get(ticker)
+        if error:
+            raise DownloadError(f"{ticker}: {error}")
+        if isinstance(data.columns, pd.MultiIndex):
+            # newer yfinance versions return (price, ticker) columns even for a single ticker
+            data.columns = data.columns.get_level_values(0)
+        return data
+
+
+class CsvDownloader:
+    # Serves bars from <directory>/<TICKER>.csv files with a Date column, no network involved
+
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+
+    def download(self, ticker, start, end):
+        path = self.directory.joinpath(f"{ticker}.csv")
+        if not path.exists():
+            raise DownloadError(f"{ticker}: no file {path}")
+        data = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+        return data.loc[(data.index >= start) & (data.index < end)]
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def to_day(value):
+    return pd.Timestamp(value).normalize().tz_localize(None)
+
+
+def normalize_bars(data):
+    data = data.reindex(columns=OHLC_COLUMNS).astype("float64")
+    data.index = pd.DatetimeIndex(data.index).tz_localize(None).normalize()
+    data.index.name = "Date"
+    return data
+
+
+def merge_intervals(intervals):
+    # [start, end) day intervals -> sorted, non overlapping, adjacent ones joined
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_intervals(coverage, start, end):
+    # parts of [start, end) which are not in the (merged) coverage
+    missing = []
+    for covered_start, covered_end in coverage:
+        if covered_end <= start:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > start:
+            missing.append((start, covered_start))
+        start = max(start, covered_end)
+    if start < end:
+        missing.append((start, end))
+    return missing
+
+
+class OHLCCache:
+    # Persistent per-ticker bar store: <directory>/<ticker>.parquet holds all bars fetched so far and,
+    # in the file metadata, the date ranges they cover. A request only downloads the ranges which are
+    # not covered yet, any other range is a slice of the stored bars.
+
+    def __init__(self, directory, downloader=None, offline=False):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.downloader = downloader if downloader is not None else YahooDownloader()
+        self.offline = offline
+        self.lock = threading.Lock()
+
+    def path(self, ticker):
+        # tickers like ^GSPC or S92.DE -> file system safe names
+        return self.directory.joinpath(re.sub(r"[^A-Za-z0-9._-]", "_", ticker.upper()) + ".parquet")
+
+    def read(self, ticker):
+        path = self.path(ticker)
+        if not path.exists():
+            return pd.DataFrame(columns=OHLC_COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype="float64"), []
+        table = pq.read_table(path)
+        coverage = json.loads(table.schema.metadata.get(b"coverage", b"[]"))
+        return table.to_pandas(), [(pd.Timestamp(start), pd.Timestamp(end)) for start, end in coverage]
+
+    def write(self, ticker, bars, coverage):
+        table = pa.Table.from_pandas(bars, preserve_index=True)
+        metadata = {**(table.schema.metadata or {}),
+                    b"coverage": json.dumps([(start.isoformat(), end.isoformat()) for start, end in coverage])}
+        table = table.replace_schema_metadata(metadata)
+        storage.write_atomically(self.path(ticker), lambda tmp_path: pq.write_table(table, tmp_path))
+
+    def load(self, ticker, start_date, end_date, offline=None):
+        # Daily bars in [start_date, end_date), the same range yf.download returns
+        start, end = to_day(start_date), to_day(end_date)
+        offline = self.offline if offline is None else offline
+        with self.lock:
+            bars, coverage = self.read(ticker)
+            missing = missing_intervals(coverage, start, end)
+            if missing and offline:
+                print(f"offline: {ticker} not cached for {', '.join(f'{s:%Y-%m-%d}..{e - ONE_DAY:%Y-%m-%d}' for s, e in missing)}")
+            elif missing:
+                bars, coverage = self.fetch(ticker, bars, coverage, missing)
+        return bars.loc[(bars.index >= start) & (bars.index < end)]
+
+    def fetch(self, ticker, bars, coverage, missing):
+        today = to_day(pd.Timestamp.now())
+        fetched = []
+        covered = coverage
+        for start, end in missing:
+            try:
+                data = self.downloader.download(ticker, start, end)
+            except DownloadError as e:
+                # not marked as covered, the range is asked for again next time
+                print(f"download failed: {e}")
+                continue
+            if len(data) > 0:
+                fetched.append(normalize_bars(data))
+            # also when there are no bars (weekend, holiday, before the listing), so the range is not downloaded
+            # again. Today's bar is not final before the close, it is fetched again next time.
+            if start < today:
+                covered = covered + [(start, min(end, today))]
+        if not fetched and covered == coverage:
+            return bars, coverage
+        if fetched:
+            bars = pd.concat([bars] + fetched) if len(bars) else pd.concat(fetched)
+            bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+        coverage = merge_intervals(covered)
+        self.write(ticker, bars, coverage)
+        print(f"cached {ticker}: {len(bars)} bars")
+        return bars, coverage
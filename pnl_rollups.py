@@ -0,0 +1,186 @@
+import math
+import numpy as np
+import pandas as pd
+import journal_stats
+from storage import TRADE_ID
+
+# Zoom levels -> pandas period frequency. A bucket is named by the day it starts on (weeks start on Monday).
+rollup_levels = {"Day": "D", "Week": "W-SUN", "Month": "M", "Quarter": "Q", "Year": "Y"}
+
+# A coarser bucket is the sum of the buckets of this level inside it
+source_levels = {"Week": "Day", "Month": "Day", "Quarter": "Month", "Year": "Quarter"}
+
+ONE_DAY = pd.Timedelta(days=1)
+
+# Aggregate of a bucket, a list indexed by these positions
+PNL, FEES, TAX, TRADES, WINS = range(5)
+
+rollup_columns = ["pnl", "fees", "tax", "trades", "wins"]
+
+
+def bucket_of(day, level):
+    return day.to_period(rollup_levels[level]).start_time
+
+
+def parts_of(bucket, level):
+    # the buckets of source_levels[level] inside a bucket, without building a period range
+    if level == "Week":
+        return [bucket + i * ONE_DAY for i in range(7)]
+    if level == "Month":
+        return [bucket + i * ONE_DAY for i in range(bucket.days_in_month)]
+    if level == "Quarter":
+        return [bucket.replace(month=bucket.month + i) for i in range(3)]
+    return [bucket.replace(month=1 + 3 * i) for i in range(4)]
+
+
+def number(value):
+    value = journal_stats.to_number(value)
+    return 0.0 if math.isnan(value) else value
+
+
+def record_contribution(record):
+    # (exit day, realized P&L, fees, tax, won) of a closed trade, None while it is open.
+    # A closed trade without a known gain counts as a trade with 0 P&L, like the calendar heatmap.
+    gain, exit_date, _ = journal_stats.trade_contribution(record)
+    if exit_date is None:
+        return None
+    return (exit_date.normalize(), 0.0 if gain is None else gain, number(record.get("tradeinfo_fees")),
+            number(record.get("tradeinfo_tax")), gain is not None and gain > 0)
+
+
+def frame_contributions(df):
+    # record_contribution for the whole journal at once, closed trades only
+    def column(col):
+        return pd.to_numeric(df[col], errors="coerce").fillna(0.0).to_numpy(dtype="float64") if col in df.columns \
+            else np.zeros(len(df))
+    gain = journal_stats.frame_gains(df)
+    days = pd.to_datetime(df["tradeinfo_exit_date"], errors="coerce").dt.normalize().to_numpy()
+    closed = ~np.isnat(days)
+    return pd.DataFrame({"day": days, "pnl": np.nan_to_num(gain), "fees": column("tradeinfo_fees"),
+                         "tax": column("tradeinfo_tax"), "trades": 1, "wins": gain > 0},
+                        index=df[TRADE_ID].to_numpy())[closed]
+
+
+def daily_aggregates(contributions):
+    # {day: aggregate} of the contributions of one or many trades
+    grouped = contributions.groupby("day", sort=False)[rollup_columns].sum()
+    return {day: [float(row[0]), float(row[1]), float(row[2]), int(row[3]), int(row[4])]
+            for day, row in zip(grouped.index, grouped.to_numpy(dtype="float64"))}
+
+
+def summed(aggregates):
+    total = [0.0, 0.0, 0.0, 0, 0]
+    for aggregate in aggregates:
+        for position, value in enumerate(aggregate):
+            total[position] += value
+    return total
+
+
+def rollup_frame(buckets):
+    # {bucket: aggregate} -> the table the dashboard charts, in time order with the equity curve
+    frame = pd.DataFrame.from_dict(buckets, orient="index", columns=rollup_columns).sort_index()
+    frame = frame.astype({"pnl": "float64", "fees": "float64", "tax": "float64", "trades": "int64", "wins": "int64"})
+    frame.index = pd.DatetimeIndex(frame.index, name="bucket")
+    frame["net_pnl"] = frame["pnl"] - frame["fees"] - frame["tax"]
+    frame["win_rate"] = frame["wins"] / frame["trades"].where(frame["trades"] > 0) * 100
+    frame["equity"] = frame["pnl"].cumsum()
+    frame["net_equity"] = frame["net_pnl"].cumsum()
+    return frame
+
+
+class PnlRollups:
+    # Realized P&L, fees, tax, trades and wins per day, week, month, quarter and year as running state.
+    # A trade change rebuilds only the buckets its old and new exit day fall into: the days from their trades,
+    # every coarser bucket from the few finer buckets inside it. Rebuilding instead of adding and subtracting
+    # keeps the sums free of drift however often a trade is edited.
+
+    def __init__(self):
+        self.trades = {}
+        self.members = {}
+        self.buckets = {level: {} for level in rollup_levels}
+        self.frames = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        rollups = cls()
+        contributions = frame_contributions(df)
+        rollups.trades = {
+            trade_id: (pd.Timestamp(day), pnl, fees, tax, bool(won))
+            for trade_id, day, pnl, fees, tax, won in zip(contributions.index, contributions["day"],
+                                                          contributions["pnl"], contributions["fees"],
+                                                          contributions["tax"], contributions["wins"])}
+        for trade_id, (day, *_) in rollups.trades.items():
+            rollups.members.setdefault(day, set()).add(trade_id)
+        rollups.buckets["Day"] = daily_aggregates(contributions)
+        days = pd.DataFrame.from_dict(rollups.buckets["Day"], orient="index", columns=rollup_columns)
+        for level, freq in rollup_levels.items():
+            if level != "Day" and len(days):
+                grouped = days.groupby(pd.DatetimeIndex(days.index).to_period(freq).start_time).sum()
+                rollups.buckets[level] = {bucket: [float(row[0]), float(row[1]), float(row[2]), int(row[3]),
+                                                   int(row[4])]
+                                          for bucket, row in zip(grouped.index, grouped.to_numpy(dtype="float64"))}
+        return rollups
+
+    def upsert(self, trade_id, record):
+        # open, close and edit: the trade may move to another day or stop being closed
+        # record is the derived journal row, with the rounded values from_frame() reads
+        touched = self.remove(trade_id)
+        contribution = record_contribution(record)
+        if contribution is not None:
+            self.trades[trade_id] = contribution
+            self.members.setdefault(contribution[0], set()).add(trade_id)
+            touched.add(contribution[0])
+        self.rebuild(touched)
+
+    def discard(self, trade_id):
+        self.rebuild(self.remove(trade_id))
+
+    def remove(self, trade_id):
+        # -> the days whose buckets have to be rebuilt
+        contribution = self.trades.pop(trade_id, None)
+        if contribution is None:
+            return set()
+        day = contribution[0]
+        self.members[day].discard(trade_id)
+        if not self.members[day]:
+            del self.members[day]
+        return {day}
+
+    def store(self, level, bucket, aggregate):
+        if aggregate[TRADES]:
+            self.buckets[level][bucket] = aggregate
+        else:
+            self.buckets[level].pop(bucket, None)
+
+    def rebuild(self, days):
+        for day in days:
+            self.store("Day", day, summed([self.trades[trade_id][1:4] + (1, int(self.trades[trade_id][4]))
+                                           for trade_id in self.members.get(day, ())]))
+        for level, source in source_levels.items():
+            for bucket in {bucket_of(day, level) for day in days}:
+                self.store(level, bucket, summed(self.buckets[source][part] for part in parts_of(bucket, level)
+                                                 if part in self.buckets[source]))
+        if days:
+            self.frames.clear()
+
+    def frame(self, level):
+        # the rollup of one zoom level as a DataFrame, built once per change
+        if level not in self.frames:
+            self.frames[level] = rollup_frame(self.buckets[level])
+        return self.frames[level]
+
+    def years(self):
+        # years with closed trades, newest first
+        return sorted((bucket.year for bucket in self.buckets["Year"]), reverse=True)
+
+    def verify(self, df):
+        # Verification mode: compare the running state against a full recompute, returns the differing levels
+        expected = PnlRollups.from_frame(df)
+        mismatches = []
+        for level in rollup_levels:
+            actual, wanted = self.frame(level), expected.frame(level)
+            if not (actual.index.equals(wanted.index) and
+                    np.allclose(actual[rollup_columns].to_numpy(dtype="float64"),
+                                wanted[rollup_columns].to_numpy(dtype="float64"))):
+                mismatches.append(level)
+        return mismatches
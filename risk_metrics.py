@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+# Rolling risk metrics over the closed trades in exit order. Every window statistic comes from cumulative sums,
+# all of them taken in one pass over a (sums x trades) matrix, so the cost is the same for a window of 5 or of
+# 5000 trades.
+
+# Rows of the window sums: gain minus the overall mean, its square, the squared loss and the win flag.
+# One row per sum keeps every cumulative sum on contiguous memory.
+CENTERED, SQUARED, DOWNSIDE, WINS = range(4)
+
+
+def window_sums(values, window):
+    # sum over the last `window` values at every position along the last axis, NaN before the first full window.
+    # The cumulative sums restart every `window` values, so a window sum is the sum of its block so far plus the
+    # rest of the block before. The subtracted sums stay as small as two windows and keep their precision however
+    # long the series grows.
+    values = np.asarray(values, dtype="float64")
+    length = values.shape[-1]
+    if not 0 < window <= length:
+        return np.full(values.shape, np.nan)
+    blocks = -(-length // window)
+    cumulative = np.empty(values.shape[:-1] + (blocks * window,))
+    cumulative[..., :length] = values
+    cumulative[..., length:] = 0.0
+    cumulative = cumulative.reshape(values.shape[:-1] + (blocks, window))
+    np.cumsum(cumulative, axis=-1, out=cumulative)
+    # the last sum of a block is its window, every other one gets the rest of the block before added
+    cumulative[..., 1:, :-1] += cumulative[..., :-1, -1:] - cumulative[..., :-1, :-1]
+    cumulative[..., 0, :-1] = np.nan
+    return cumulative.reshape(values.shape[:-1] + (blocks * window,))[..., :length]
+
+
+def rolling_metrics(returns, window):
+    # -> dict of arrays like returns: sharpe and sortino per trade (not annualized), win rate in %,
+    # expectancy (average gain per trade) of the last `window` trades
+    returns = np.asarray(returns, dtype="float64")
+    # centered gains keep the sums of squares small, the variance does not depend on the shift
+    center = returns.mean() if len(returns) else 0.0
+    columns = np.empty((4, len(returns)))
+    np.subtract(returns, center, out=columns[CENTERED])
+    np.square(columns[CENTERED], out=columns[SQUARED])
+    np.minimum(returns, 0.0, out=columns[DOWNSIDE])
+    np.square(columns[DOWNSIDE], out=columns[DOWNSIDE])
+    np.greater(returns, 0.0, out=columns[WINS])
+    sums = window_sums(columns, window)
+    mean = sums[CENTERED] / window + center
+    # sample variance like pandas rolling().std(), a single trade has none
+    variance = (sums[SQUARED] - sums[CENTERED] ** 2 / window) / (window - 1) if window > 1 \
+        else np.full(len(returns), np.nan)
+    std = np.sqrt(np.maximum(variance, 0.0))
+    downside = np.sqrt(sums[DOWNSIDE] / window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std, np.nan)
+        sortino = np.where(downside > 0, mean / downside, np.nan)
+    return {
+        "sharpe": sharpe,
+        "sortino": sortino,
+        "win_rate": sums[WINS] / window * 100,
+        "expectancy": mean,
+    }
+
+
+def underwater_curve(returns):
+    # distance of the equity below its running high after every trade, 0 at a new high
+    equity = np.cumsum(np.asarray(returns, dtype="float64"))
+    return equity - np.maximum.accumulate(equity) if len(equity) else equity
+
+
+def drawdown_duration(underwater):
+    # trades since the last equity high at every trade
+    positions = np.arange(len(underwater))
+    last_high = np.maximum.accumulate(np.where(underwater >= 0, positions, 0)) if len(underwater) else positions
+    return positions - last_high, last_high
+
+
+def risk_frame(gains, window=20):
+    # gains: Series of trade gains in exit order indexed by exit date, e.g. JournalStatistics.exit_gains()
+    returns = gains.to_numpy(dtype="float64")
+    exit_dates = pd.DatetimeIndex(gains.index)
+    underwater = underwater_curve(returns)
+    duration, last_high = drawdown_duration(underwater)
+    return pd.DataFrame({
+        "gain": returns,
+        "equity": np.cumsum(returns),
+        "underwater": underwater,
+        "drawdown_trades": duration,
+        "drawdown_days": (exit_dates - exit_dates[last_high]).days if len(returns) else duration,
+        **rolling_metrics(returns, window),
+    }, index=exit_dates.rename("exit_date"))
+
+
+def drawdown_summary(frame):
+    # longest and current time under water, in trades and in calendar days
+    if len(frame) == 0:
+        return {"longest_trades": 0, "longest_days": 0, "current_trades": 0, "current_days": 0}
+    return {
+        "longest_trades": int(frame["drawdown_trades"].max()),
+        "longest_days": int(frame["drawdown_days"].max()),
+        "current_trades": int(frame["drawdown_trades"].iloc[-1]),
+        "current_days": int(frame["drawdown_days"].iloc[-1]),
+    }
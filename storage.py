@@ -0,0 +1,364 @@
+import os
+import pathlib
+import sqlite3
+import threading
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import data_specs
+
+# Stable primary key of a trade, unlike the positional DataFrame index it survives sorting, inserts and deletes
+TRADE_ID = "trade_id"
+
+date_columns = data_specs.columns_of_dtype("datetime64[ns]")
+
+
+def new_trade_id():
+    return uuid.uuid4().hex
+
+
+def assign_trade_ids(df):
+    # Give rows without a trade id a new one, in place
+    if TRADE_ID not in df.columns:
+        df[TRADE_ID] = None
+    missing = df[TRADE_ID].isna()
+    df.loc[missing, TRADE_ID] = [new_trade_id() for _ in range(missing.sum())]
+
+
+def column_type(col):
+    # Arrow type of a journal column, taken from the data_specs schema registry
+    dtype = data_specs.field_spec(col).dtype
+    if dtype == "datetime64[ns]":
+        return pa.timestamp("ns")
+    if dtype == "float64":
+        return pa.float64()
+    if dtype == "float32":
+        return pa.float32()
+    if dtype == "category":
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.string()
+
+
+def journal_schema(columns=None):
+    columns = data_specs.journal_data_df_colums if columns is None else columns
+    return pa.schema([pa.field(col, column_type(col)) for col in columns])
+
+
+def to_categorical(values, vocabulary):
+    # values outside the vocabulary (older journals, manual edits) are kept as extra categories
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+    categories = [str(category) for category in values.cat.categories]
+    values = values.cat.rename_categories(categories)
+    extras = [category for category in categories if category not in vocabulary]
+    return values.cat.set_categories(list(vocabulary) + extras)
+
+
+def coerce_columns(df, columns):
+    # Convert the given columns in place to their registry dtypes
+    for col in columns:
+        spec = data_specs.field_spec(col)
+        if spec.dtype != "object" and df[col].dtype == data_specs.journal_dtype(col):
+            continue
+        if spec.dtype == "datetime64[ns]":
+            # values replayed from the mutation log are ISO strings
+            date_format = "ISO8601" if df[col].dtype == object else None
+            df[col] = pd.to_datetime(df[col], errors="coerce", format=date_format)
+        elif spec.dtype in ("float64", "float32"):
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(spec.dtype)
+        elif spec.dtype == "category":
+            df[col] = to_categorical(df[col], spec.vocabulary)
+        else:
+            values = df[col].astype(object).where(df[col].notna(), None)
+            given = values.notna()
+            values[given] = values[given].astype(str)
+            df[col] = values
+
+
+def coerce_journal(df):
+    # Bring a journal DataFrame into the typed layout of journal_schema, missing columns are added empty
+    df = df.copy()
+    for col in data_specs.journal_data_df_colums:
+        if col not in df.columns:
+            df[col] = None
+    coerce_columns(df, df.columns)
+    return df
+
+
+def write_atomically(path, write):
+    # write(tmp_path) fills a temporary file which then replaces path in one step,
+    # so a crash during the write never leaves a half written journal behind
+    tmp_path = pathlib.Path(f"{path}.tmp")
+    write(tmp_path)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def file_fingerprint(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def empty_journal(columns=None):
+    df = coerce_journal(pd.DataFrame(columns=data_specs.journal_data_df_colums))
+    return df if columns is None else df[[c for c in columns if c in df.columns]]
+
+
+class JournalStore:
+    # Base class of the journal backends, load() and save() work on whole DataFrames
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def fingerprint(self):
+        # changes whenever the journal file is written, also by another process
+        return file_fingerprint(self.path)
+
+    def load(self, columns=None):
+        raise NotImplementedError
+
+    def save(self, df):
+        raise NotImplementedError
+
+    # Query helpers for the pages. This generic version filters a loaded DataFrame,
+    # SqliteStore answers them from its indexes and only reads the matching rows.
+
+    def query(self, mask, columns=None, filter_columns=()):
+        load_columns = None if columns is None else list(dict.fromkeys([*columns, *filter_columns]))
+        df = self.load(load_columns)
+        df = df[mask(df)]
+        return df if columns is None else df[[c for c in columns if c in df.columns]]
+
+    def open_trades(self, columns=None):
+        return self.query(lambda df: df["tradeinfo_exit_price"].isna(), columns, ["tradeinfo_exit_price"])
+
+    def closed_trades(self, columns=None):
+        return self.query(lambda df: df["tradeinfo_exit_price"].notna(), columns, ["tradeinfo_exit_price"])
+
+    def trades_for_ticker(self, ticker, columns=None):
+        return self.query(lambda df: df["tradeinfo_Ticker"] == ticker, columns, ["tradeinfo_Ticker"])
+
+    def trades_between(self, start, end, date_column="tradeinfo_entry_date", columns=None):
+        return self.query(lambda df: df[date_column].between(pd.Timestamp(start), pd.Timestamp(end)),
+                          columns, [date_column])
+
+    def get_trade(self, trade_id):
+        df = self.query(lambda df: df[TRADE_ID] == trade_id, None, [TRADE_ID])
+        return df.iloc[0] if len(df) > 0 else None
+
+
+class CsvStore(JournalStore):
+
+    def load(self, columns=None):
+        if not self.exists():
+            return empty_journal(columns)
+        usecols = None if columns is None else (lambda c: c in columns)
+        df = pd.read_csv(self.path, usecols=usecols)
+        # Bring the columns into their registry dtypes, e.g. dates to datetime
+        coerce_columns(df, df.columns)
+        print(f"loaded dataframe: {len(df)}")
+        return df
+
+    def save(self, df):
+        # Ensure the dates are in datetime format
+        coerce_columns(df, date_columns)
+        df = df.sort_values(by="tradeinfo_entry_date", ascending=False)
+        write_atomically(self.path, lambda tmp_path: df.to_csv(tmp_path, index=False))
+        print(f"saved dataframe: {len(df)}")
+
+
+class ParquetStore(JournalStore):
+
+    def load(self, columns=None):
+        if not self.exists():
+            return empty_journal(columns)
+        if columns is not None:
+            # only read the requested columns from disk
+            available = pq.read_schema(self.path).names
+            columns = [c for c in columns if c in available]
+        df = pq.read_table(self.path, columns=columns).to_pandas()
+        # categories as stored in the file plus the full vocabulary of the registry
+        coerce_columns(df, [col for col in df.columns if data_specs.field_spec(col).dtype == "category"])
+        print(f"loaded dataframe: {len(df)}")
+        return df
+
+    def save(self, df):
+        df = coerce_journal(df)
+        df = df.sort_values(by="tradeinfo_entry_date", ascending=False)
+        table = pa.Table.from_pandas(df, schema=journal_schema(df.columns), preserve_index=False)
+        write_atomically(self.path, lambda tmp_path: pq.write_table(table, tmp_path))
+        print(f"saved dataframe: {len(df)}")
+
+
+class SqliteStore(JournalStore):
+    # Embedded SQLite journal, trade changes are single row statements on the trades table
+    table = "trades"
+    indexed_columns = ["tradeinfo_Ticker", "tradeinfo_entry_date", "tradeinfo_exit_date", "is_open"]
+
+    def __init__(self, path):
+        super().__init__(path)
+        # One connection shared by the session threads of the journal model: every use holds the lock, so the
+        # statements of different threads never interleave within a transaction. Reentrant, ensure_columns()
+        # reads the table columns while holding it.
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.create_table(data_specs.journal_data_df_colums)
+
+    def sql_type(self, col):
+        return "REAL" if pa.types.is_floating(column_type(col)) else "TEXT"
+
+    def table_columns(self):
+        with self.lock:
+            return [row[1] for row in self.connection.execute(f"PRAGMA table_info({self.table})")]
+
+    def create_table(self, columns):
+        with self.lock, self.connection:
+            columns_sql = ", ".join(f'"{col}" {self.sql_type(col)}' for col in columns if col != TRADE_ID)
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS {self.table} "
+                                    f"({TRADE_ID} TEXT PRIMARY KEY, {columns_sql}, is_open INTEGER NOT NULL)")
+            for col in self.indexed_columns:
+                self.connection.execute(f'CREATE INDEX IF NOT EXISTS ix_{self.table}_{col} ON {self.table} ("{col}")')
+
+    def ensure_columns(self, columns):
+        # columns unknown to data_specs (e.g. from older journals) are added on first write
+        with self.lock, self.connection:
+            existing = self.table_columns()
+            for col in columns:
+                if col not in existing:
+                    self.connection.execute(f'ALTER TABLE {self.table} ADD COLUMN "{col}" {self.sql_type(col)}')
+
+    def exists(self):
+        # the database file is created on connect, user_version marks a journal which has been written
+        with self.lock:
+            return self.connection.execute("PRAGMA user_version").fetchone()[0] > 0
+
+    def fingerprint(self):
+        # data_version moves with commits of other connections, total_changes with our own
+        with self.lock:
+            data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+            return file_fingerprint(self.path), data_version, self.connection.total_changes
+
+    def to_rows(self, df):
+        # typed journal rows to plain python values, dates as sortable ISO text
+        df = df.copy()
+        coerce_columns(df, df.columns)
+        for col in df.columns:
+            if column_type(col) == pa.timestamp("ns"):
+                df[col] = df[col].dt.strftime("%Y-%m-%d %H:%M:%S")
+        df = df.astype(object).where(df.notna(), None)
+        return list(df.itertuples(index=False, name=None))
+
+    def read(self, where="", params=(), columns=None):
+        with self.lock:
+            available = [col for col in self.table_columns() if col != "is_open"]
+            columns = available if columns is None else [col for col in columns if col in available]
+            select = ", ".join(f'"{col}"' for col in columns)
+            df = pd.read_sql_query(f"SELECT {select} FROM {self.table} {where} ORDER BY tradeinfo_entry_date DESC",
+                                   self.connection, params=params)
+        coerce_columns(df, df.columns)
+        return df
+
+    def load(self, columns=None):
+        df = self.read(columns=columns)
+        print(f"loaded dataframe: {len(df)}")
+        return df
+
+    def save(self, df):
+        df = df.copy()
+        assign_trade_ids(df)
+        # columns are only ever added, so this needs no transaction with the write
+        self.ensure_columns(df.columns)
+        columns = ", ".join(f'"{col}"' for col in df.columns)
+        values = ", ".join("?" for _ in df.columns)
+        insert = f"INSERT INTO {self.table} ({columns}, is_open) VALUES ({values}, ?)"
+        is_open = df["tradeinfo_exit_price"].isna().astype(int).tolist() if "tradeinfo_exit_price" in df.columns \
+            else [1] * len(df)
+        # one transaction, a failing write leaves the previous journal in place
+        with self.lock, self.connection:
+            self.connection.execute(f"DELETE FROM {self.table}")
+            self.connection.executemany(insert, [(*row, flag) for row, flag in zip(self.to_rows(df), is_open)])
+            self.connection.execute("PRAGMA user_version = 1")
+        print(f"saved dataframe: {len(df)}")
+
+    def open_trade(self, fields):
+        trade_id = new_trade_id()
+        self.save_row(trade_id, fields, insert=True)
+        return trade_id
+
+    def save_row(self, trade_id, fields, insert=False):
+        fields = {col: value for col, value in fields.items() if col != TRADE_ID}
+        self.ensure_columns(fields)
+        row = self.to_rows(pd.DataFrame([fields]))[0]
+        columns = ", ".join(f'"{col}"' for col in fields)
+        with self.lock, self.connection:
+            if insert:
+                self.connection.execute(
+                    f"INSERT INTO {self.table} ({TRADE_ID}, {columns}, is_open) "
+                    f"VALUES (?, {', '.join('?' for _ in fields)}, 1)", (trade_id, *row))
+                self.connection.execute("PRAGMA user_version = 1")
+            else:
+                assignments = ", ".join(f'"{col}" = ?' for col in fields)
+                self.connection.execute(f"UPDATE {self.table} SET {assignments} WHERE {TRADE_ID} = ?",
+                                        (*row, trade_id))
+            self.connection.execute(f"UPDATE {self.table} SET is_open = (tradeinfo_exit_price IS NULL) "
+                                    f"WHERE {TRADE_ID} = ?", (trade_id,))
+
+    def close_trade(self, trade_id, fields):
+        self.save_row(trade_id, fields)
+
+    def edit_trade(self, trade_id, fields):
+        self.save_row(trade_id, fields)
+
+    def delete_trade(self, trade_id):
+        with self.lock, self.connection:
+            self.connection.execute(f"DELETE FROM {self.table} WHERE {TRADE_ID} = ?", (trade_id,))
+
+    def open_trades(self, columns=None):
+        return self.read("WHERE is_open = 1", columns=columns)
+
+    def closed_trades(self, columns=None):
+        return self.read("WHERE is_open = 0", columns=columns)
+
+    def trades_for_ticker(self, ticker, columns=None):
+        return self.read("WHERE tradeinfo_Ticker = ?", (ticker,), columns)
+
+    def trades_between(self, start, end, date_column="tradeinfo_entry_date", columns=None):
+        if date_column not in self.indexed_columns:
+            return super().trades_between(start, end, date_column, columns)
+        bounds = [pd.Timestamp(start).strftime("%Y-%m-%d %H:%M:%S"), pd.Timestamp(end).strftime("%Y-%m-%d %H:%M:%S")]
+        return self.read(f'WHERE "{date_column}" BETWEEN ? AND ?', bounds, columns)
+
+    def get_trade(self, trade_id):
+        df = self.read(f"WHERE {TRADE_ID} = ?", (trade_id,))
+        return df.iloc[0] if len(df) > 0 else None
+
+
+def migrate_csv(csv_path, store):
+    # One-shot migration into an empty store, the CSV file is left in place as a backup
+    if store.exists() or not os.path.exists(csv_path):
+        return False
+    store.save(CsvStore(csv_path).load())
+    print(f"migrated {csv_path} to {store.path}")
+    return True
+
+
+def open_store(backend, directory):
+    directory = pathlib.Path(directory)
+    if backend == "csv":
+        return CsvStore(directory.joinpath("trades.csv"))
+    if backend == "parquet":
+        store = ParquetStore(directory.joinpath("trades.parquet"))
+    elif backend == "sqlite":
+        store = SqliteStore(directory.joinpath("trades.sqlite"))
+    else:
+        raise ValueError(f"Unknown journal backend: {backend}")
+    migrate_csv(directory.joinpath("trades.csv"), store)
+    return store
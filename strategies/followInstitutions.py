@@ -1,6 +1,7 @@
 import backtrader as bt
+import strategy_events
 
-class FollowInstitutions(bt.Strategy):
+class FollowInstitutions(strategy_events.EventStrategy):
     # ADD the parameters here -----------------------------------------------------------------------------------------
     params = (
         ('volume_factor', 1.5),
@@ -8,11 +9,6 @@ class FollowInstitutions(bt.Strategy):
     )
     # -----------------------------------------------------------------------------------------------------------------
 
-    def log(self, txt, dt=None):
-        ''' Logging function fot this strategy'''
-        dt = dt or self.datas[0].datetime.date(0)
-        print('%s, %s' % (dt.isoformat(), txt))
-
     def __init__(self):
         # Keep a reference to the "close" line in the data[0] dataseries
         self.dataclose = self.datas[0].close
@@ -39,31 +35,14 @@ class FollowInstitutions(bt.Strategy):
 
         # Check if an order has been completed
         # Attention: broker could reject order if not enough cash
+        self.order_event(order)
         if order.status in [order.Completed]:
             if order.isbuy():
-                self.log(
-                    'BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %
-                    (order.executed.price,
-                     order.executed.value,
-                     order.executed.comm))
-
                 self.buyprice = order.executed.price
                 self.buycomm = order.executed.comm
-            else:  # Sell
-                self.log('SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %
-                         (order.executed.price,
-                          order.executed.value,
-                          order.executed.comm))
 
             self.bar_executed = len(self)
 
-        elif order.status == order.Canceled:
-            self.log('Order Canceled')
-        elif order.status == order.Margin:
-            self.log('Order Margin')
-        elif order.status == order.Rejected:
-            self.log('Order Rejected')
-
         # Write down: no pending order
         self.order = None
 
@@ -71,8 +50,7 @@ class FollowInstitutions(bt.Strategy):
         if not trade.isclosed:
             return
 
-        self.log('OPERATION PROFIT, GROSS %.2f, NET %.2f' %
-                 (trade.pnl, trade.pnlcomm))
+        self.event(strategy_events.TRADE_CLOSED, trade.price, pnl=trade.pnlcomm, comm=trade.commission)
 
     def next(self):
 
@@ -87,10 +65,10 @@ class FollowInstitutions(bt.Strategy):
             if self.data.volume[0] > self.params.volume_factor * self.sma_volume[0]:
                 if self.data.close[0] > self.data.close[-1] and self.obv[0] > self.obv[-1]:
                     self.buy()  # Institutional buying may be happening
-                    self.log('BUY CREATE, %.2f' % self.dataclose[0])
+                    self.event(strategy_events.BUY_CREATE, self.dataclose[0])
                 elif self.data.close[0] < self.data.close[-1] and self.obv[0] < self.obv[-1]:
                     self.sell()  # Institutional selling may be happening
-                    self.log('SELL CREATE, %.2f' % self.dataclose[0])
+                    self.event(strategy_events.SELL_CREATE, self.dataclose[0])
                 # ------------------------------------------------------------------------------------------------------
 
         else:
@@ -102,4 +80,4 @@ class FollowInstitutions(bt.Strategy):
                 self.close()  # Exit the position if OBV goes against our position
 
                 # ------------------------------------------------------------------------------------------------------
-                self.log('EXIT POSITION, %.2f' % self.dataclose[0])
+                self.event(strategy_events.EXIT_CREATE, self.dataclose[0])
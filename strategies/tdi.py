@@ -1,15 +1,11 @@
 import backtrader as bt
+import strategy_events
 
-class TDI(bt.Strategy):
+class TDI(strategy_events.EventStrategy):
     params = (
         ('maperiod', 200),
     )
 
-    def log(self, txt, dt=None):
-        ''' Logging function fot this strategy'''
-        dt = dt or self.datas[0].datetime.date(0)
-        print('%s, %s' % (dt.isoformat(), txt))
-
     def __init__(self):
         # Keep a reference to the "close" line in the data[0] dataseries
         self.dataclose = self.datas[0].close
@@ -56,31 +52,14 @@ class TDI(bt.Strategy):
 
         # Check if an order has been completed
         # Attention: broker could reject order if not enough cash
+        self.order_event(order)
         if order.status in [order.Completed]:
             if order.isbuy():
-                self.log(
-                    'BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %
-                    (order.executed.price,
-                     order.executed.value,
-                     order.executed.comm))
-
                 self.buyprice = order.executed.price
                 self.buycomm = order.executed.comm
-            else:  # Sell
-                self.log('SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %
-                         (order.executed.price,
-                          order.executed.value,
-                          order.executed.comm))
 
             self.bar_executed = len(self)
 
-        elif order.status == order.Canceled:
-            self.log('Order Canceled')
-        elif order.status == order.Margin:
-            self.log('Order Margin')
-        elif order.status == order.Rejected:
-            self.log('Order Rejected')
-
         # Write down: no pending order
         self.order = None
 
@@ -88,8 +67,7 @@ class TDI(bt.Strategy):
         if not trade.isclosed:
             return
 
-        self.log('OPERATION PROFIT, GROSS %.2f, NET %.2f' %
-                 (trade.pnl, trade.pnlcomm))
+        self.event(strategy_events.TRADE_CLOSED, trade.price, pnl=trade.pnlcomm, comm=trade.commission)
 
     def next(self):
 
@@ -105,7 +83,7 @@ class TDI(bt.Strategy):
             if self.rsi[0] <= 48 and self.bull_rsi_bb_crossover[0] and \
                     self.pivotindicator.s2[0] > self.dataclose[0] > self.pivotindicator.s3[0]:
                 # BUY, BUY, BUY!!! (with all possible default parameters)
-                self.log('BUY CREATE, %.2f' % self.dataclose[0])
+                self.event(strategy_events.BUY_CREATE, self.dataclose[0])
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.buy()
@@ -116,7 +94,7 @@ class TDI(bt.Strategy):
             if self.rsi[0] > 62 and self.bear_rsi_bb_crossover[0]and \
                     self.pivotindicator.r2[0] < self.dataclose[0] < self.pivotindicator.r3[0]:
                 # SELL, SELL, SELL!!! (with all possible default parameters)
-                self.log('SELL CREATE, %.2f' % self.dataclose[0])
+                self.event(strategy_events.SELL_CREATE, self.dataclose[0])
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.sell()
\ No newline at end of file
@@ -1,9 +1,10 @@
 import backtrader as bt
+import strategy_events
 
 # Good Performace Stocks for this strategay:
 # APPL, UNM,
 
-class BreakoutStrategy(bt.Strategy):
+class BreakoutStrategy(strategy_events.EventStrategy):
     # ADD the parameters here -----------------------------------------------------------------------------------------
     params = dict(
         breakout_period=15,  # look back period for highest high - the breakout level
@@ -11,11 +12,6 @@ class BreakoutStrategy(bt.Strategy):
     )
     # -----------------------------------------------------------------------------------------------------------------
 
-    def log(self, txt, dt=None):
-        ''' Logging function fot this strategy'''
-        dt = dt or self.datas[0].datetime.date(0)
-        print('%s, %s' % (dt.isoformat(), txt))
-
     def __init__(self):
         # Keep a reference to the "close" line in the data[0] dataseries
         self.data_close = self.datas[0].close
@@ -37,31 +33,14 @@ class BreakoutStrategy(bt.Strategy):
 
         # Check if an order has been completed
         # Attention: broker could reject order if not enough cash
+        self.order_event(order)
         if order.status in [order.Completed]:
             if order.isbuy():
-                self.log(
-                    'BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %
-                    (order.executed.price,
-                     order.executed.value,
-                     order.executed.comm))
-
                 self.buyprice = order.executed.price
                 self.buycomm = order.executed.comm
-            else:  # Sell
-                self.log('SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %
-                         (order.executed.price,
-                          order.executed.value,
-                          order.executed.comm))
 
             self.bar_executed = len(self)
 
-        elif order.status == order.Canceled:
-            self.log('Order Canceled')
-        elif order.status == order.Margin:
-            self.log('Order Margin')
-        elif order.status == order.Rejected:
-            self.log('Order Rejected')
-
         # Write down: no pending order
         self.order = None
 
@@ -69,8 +48,7 @@ class BreakoutStrategy(bt.Strategy):
         if not trade.isclosed:
             return
 
-        self.log('OPERATION PROFIT, GROSS %.2f, NET %.2f' %
-                 (trade.pnl, trade.pnlcomm))
+        self.event(strategy_events.TRADE_CLOSED, trade.price, pnl=trade.pnlcomm, comm=trade.commission)
 
     def next(self):
 
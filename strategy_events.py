@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+# Levels: an event is recorded when the recorder level is at least the level of its kind
+OFF, TRADES, ORDERS, DEBUG = 0, 1, 2, 3
+
+# Event kinds -> (name, level)
+BUY_CREATE, SELL_CREATE, EXIT_CREATE, BUY_EXECUTED, SELL_EXECUTED, ORDER_CANCELED, ORDER_MARGIN, ORDER_REJECTED, \
+    TRADE_CLOSED, MESSAGE = range(10)
+event_kinds = {
+    BUY_CREATE: ("buy create", ORDERS),
+    SELL_CREATE: ("sell create", ORDERS),
+    EXIT_CREATE: ("exit create", ORDERS),
+    BUY_EXECUTED: ("buy executed", TRADES),
+    SELL_EXECUTED: ("sell executed", TRADES),
+    ORDER_CANCELED: ("order canceled", ORDERS),
+    ORDER_MARGIN: ("order margin", ORDERS),
+    ORDER_REJECTED: ("order rejected", ORDERS),
+    TRADE_CLOSED: ("trade closed", TRADES),
+    MESSAGE: ("message", DEBUG),
+}
+# tuple lookup, cheaper than numpy indexing on the hot path
+kind_levels = tuple(event_kinds[kind][1] for kind in range(len(event_kinds)))
+
+event_dtype = np.dtype([("bar", "i8"), ("time", "f8"), ("kind", "i1"), ("price", "f8"), ("size", "f8"),
+                        ("value", "f8"), ("comm", "f8"), ("pnl", "f8")])
+
+# Level of new recorders. Batch runs and parameter sweeps switch it to OFF in their processes.
+level = TRADES
+
+
+class EventRecorder:
+    # Typed strategy events in a preallocated ring buffer, the newest `capacity` events are kept
+
+    def __init__(self, capacity=10_000, level=TRADES):
+        self.events = np.zeros(capacity, dtype=event_dtype)
+        self.texts = np.empty(capacity, dtype=object)
+        self.level = level
+        self.count = 0
+
+    def enabled(self, kind):
+        return kind_levels[kind] <= self.level
+
+    def record(self, kind, bar, time, price=np.nan, size=np.nan, value=np.nan, comm=np.nan, pnl=np.nan, text=None):
+        position = self.count % len(self.events)
+        self.events[position] = (bar, time, kind, price, size, value, comm, pnl)
+        self.texts[position] = text
+        self.count += 1
+
+    def dropped(self):
+        return max(self.count - len(self.events), 0)
+
+    def to_frame(self):
+        # oldest first; times are backtrader float days and become timestamps
+        capacity = len(self.events)
+        order = np.arange(self.count - min(self.count, capacity), self.count) % capacity
+        events = self.events[order]
+        names = np.array([event_kinds[kind][0] for kind in range(len(event_kinds))], dtype=object)
+        return pd.DataFrame({
+            "bar": events["bar"],
+            "time": pd.to_datetime([bt.num2date(time) for time in events["time"]]) if len(events) else
+            pd.DatetimeIndex([]),
+            "event": names[events["kind"]],
+            "price": events["price"],
+            "size": events["size"],
+            "value": events["value"],
+            "comm": events["comm"],
+            "pnl": events["pnl"],
+            "text": self.texts[order],
+        })
+
+
+class EventStrategy(bt.Strategy):
+    # Base class of the bundled strategies: self.event(...) instead of print. With the kind's level
+    # switched off an event costs one comparison.
+
+    def start(self):
+        self.events = EventRecorder(level=level)
+
+    def event(self, kind, price=np.nan, size=np.nan, value=np.nan, comm=np.nan, pnl=np.nan, text=None):
+        if kind_levels[kind] > self.events.level:
+            return
+        self.events.record(kind, len(self), self.datas[0].datetime[0], price, size, value, comm, pnl, text)
+
+    def log(self, txt, dt=None):
+        # free text messages of strategies written against the old print based log()
+        self.event(MESSAGE, text=txt)
+
+    def order_event(self, order):
+        # the notify_order handling shared by the bundled strategies
+        if order.status == order.Completed:
+            self.event(BUY_EXECUTED if order.isbuy() else SELL_EXECUTED, order.executed.price, order.executed.size,
+                       order.executed.value, order.executed.comm)
+        elif order.status == order.Canceled:
+            self.event(ORDER_CANCELED, order.created.price, order.created.size)
+        elif order.status == order.Margin:
+            self.event(ORDER_MARGIN, order.created.price, order.created.size)
+        elif order.status == order.Rejected:
+            self.event(ORDER_REJECTED, order.created.price, order.created.size)
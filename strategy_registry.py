@@ -0,0 +1,120 @@
+import ast
+import importlib
+import os
+import pathlib
+import threading
+from collections import namedtuple
+
+# What is known about a strategy without importing it, read from the source of its file
+StrategyInfo = namedtuple("StrategyInfo", ["key", "module", "class_name", "doc", "params", "path"])
+
+
+def is_strategy_class(node):
+    # class X(bt.Strategy), class X(Strategy) or a subclass of another ...Strategy base
+    for base in node.bases:
+        name = base.attr if isinstance(base, ast.Attribute) else getattr(base, "id", "")
+        if name.endswith("Strategy"):
+            return True
+    return False
+
+
+def literal_params(value):
+    # params = (('name', default), ...), params = {'name': default} or params = dict(name=default)
+    if isinstance(value, ast.Call) and getattr(value.func, "id", None) == "dict":
+        return {keyword.arg: ast.literal_eval(keyword.value) for keyword in value.keywords}
+    params = ast.literal_eval(value)
+    return dict(params) if not isinstance(params, dict) else params
+
+
+def class_params(node):
+    for statement in node.body:
+        if isinstance(statement, ast.Assign) and any(getattr(t, "id", None) == "params" for t in statement.targets):
+            return literal_params(statement.value)
+    return {}
+
+
+def scan_file(path, package):
+    # -> StrategyInfo of every strategy class in the file, the file is parsed but not executed
+    module = pathlib.Path(path).stem
+    tree = ast.parse(pathlib.Path(path).read_text(encoding="utf-8"), filename=str(path))
+    classes = [node for node in tree.body if isinstance(node, ast.ClassDef) and is_strategy_class(node)]
+    infos = []
+    for node in classes:
+        # one strategy per file keeps the file name as key, like before
+        key = module if len(classes) == 1 else f"{module}.{node.name}"
+        try:
+            params = class_params(node)
+        except ValueError:
+            # params which are not plain literals are only known after the import
+            params = None
+        infos.append(StrategyInfo(key, f"{package}.{module}", node.name, ast.get_docstring(node), params, str(path)))
+    return infos
+
+
+class StrategyRegistry:
+    # Strategies found in a directory by static scanning. A strategy module is imported the first time
+    # the strategy is loaded, the class is cached. Files which cannot be read, parsed or imported are
+    # reported in errors (path -> message) and skipped.
+
+    def __init__(self, directory, package="strategies"):
+        self.directory = pathlib.Path(directory)
+        self.package = package
+        self.lock = threading.Lock()
+        self.fingerprint = None
+        self.strategies = {}
+        self.errors = {}
+        self.classes = {}
+        # module -> mtime of its file when it was imported
+        self.imported = {}
+
+    def directory_fingerprint(self):
+        return tuple(sorted((entry.name, entry.stat().st_mtime_ns) for entry in os.scandir(self.directory)
+                            if entry.name.endswith(".py") and not entry.name.startswith("_")))
+
+    def refresh(self):
+        # rescans only when a strategy file was added, removed or changed
+        with self.lock:
+            fingerprint = self.directory_fingerprint()
+            if fingerprint == self.fingerprint:
+                return self
+            strategies, errors = {}, {}
+            for name, _ in fingerprint:
+                path = self.directory.joinpath(name)
+                try:
+                    infos = scan_file(path, self.package)
+                except (OSError, SyntaxError, UnicodeDecodeError) as e:
+                    errors[str(path)] = f"{type(e).__name__}: {e}"
+                    continue
+                if not infos:
+                    errors[str(path)] = "no strategy class found"
+                for info in infos:
+                    strategies[info.key] = info
+            # classes of changed or removed files are loaded again
+            mtimes = dict(fingerprint)
+            self.classes = {key: cls for key, cls in self.classes.items() if key in strategies and
+                            mtimes[pathlib.Path(strategies[key].path).name] == self.imported.get(strategies[key].module)}
+            self.strategies, self.errors, self.fingerprint = strategies, errors, fingerprint
+            return self
+
+    def keys(self):
+        return self.refresh().strategies.keys()
+
+    def info(self, key):
+        return self.refresh().strategies[key]
+
+    def load(self, key):
+        info = self.info(key)
+        with self.lock:
+            if key not in self.classes:
+                try:
+                    mtime = os.stat(info.path).st_mtime_ns
+                    module = importlib.import_module(info.module)
+                    if self.imported.setdefault(info.module, mtime) != mtime:
+                        # the file was edited since its first import
+                        module = importlib.reload(module)
+                        self.imported[info.module] = mtime
+                    self.classes[key] = getattr(module, info.class_name)
+                except Exception as e:
+                    self.errors[info.path] = f"{type(e).__name__}: {e}"
+                    raise
+            return self.classes[key]
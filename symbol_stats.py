@@ -0,0 +1,153 @@
+import heapq
+import math
+import pandas as pd
+import journal_stats
+from storage import TRADE_ID
+
+# Running aggregate per ticker, a list indexed by these positions. A trade has a result once its gain is known.
+TRADES, RESULTS, WINS, LOSSES, GROSS_PROFIT, GROSS_LOSS, HOLDING_SECONDS, HOLDING_COUNT = range(8)
+
+
+def metrics_of(aggregate):
+    results = aggregate[RESULTS]
+    gross_profit, gross_loss = aggregate[GROSS_PROFIT], aggregate[GROSS_LOSS]
+    if gross_loss:
+        profit_factor = gross_profit / gross_loss
+    else:
+        profit_factor = math.inf if gross_profit else math.nan
+    return {
+        "trades": aggregate[TRADES],
+        "wins": aggregate[WINS],
+        "losses": aggregate[LOSSES],
+        # of the trades with a result, open trades do not count
+        "win_rate": aggregate[WINS] / results * 100 if results else math.nan,
+        "gross_profit": gross_profit,
+        "gross_loss": gross_loss,
+        "net_profit": gross_profit - gross_loss,
+        "profit_factor": profit_factor,
+        # average gain per trade with a result
+        "expectancy": (gross_profit - gross_loss) / results if results else math.nan,
+        "average_holding_days": aggregate[HOLDING_SECONDS] / aggregate[HOLDING_COUNT] / 86400
+        if aggregate[HOLDING_COUNT] else math.nan,
+    }
+
+
+def record_contribution(record):
+    # (ticker, gain or None, holding period in seconds or None) of one trade, same rules as journal_stats
+    gain, _, holding = journal_stats.trade_contribution(record)
+    ticker = record.get("tradeinfo_Ticker")
+    ticker = str(ticker) if isinstance(ticker, str) or not pd.isna(ticker) else None
+    return ticker, gain, None if holding is None else holding / 1e9
+
+
+def frame_contributions(df):
+    # record_contribution for the whole journal at once
+    gain = journal_stats.frame_gains(df)
+    holding = (pd.to_datetime(df["tradeinfo_exit_date"], errors="coerce") -
+               pd.to_datetime(df["tradeinfo_entry_date"], errors="coerce")).dt.total_seconds().to_numpy()
+    tickers = df["tradeinfo_Ticker"].astype(object).where(df["tradeinfo_Ticker"].notna(), None).astype(object)
+    return pd.DataFrame({"ticker": tickers.map(lambda ticker: None if ticker is None else str(ticker)).to_numpy(),
+                         "gain": gain, "holding": holding}, index=df[TRADE_ID].to_numpy())
+
+
+def aggregate_frame(contributions):
+    # DataFrame of contributions -> {ticker: aggregate}, grouped in one pass
+    gain, holding = contributions["gain"], contributions["holding"]
+    parts = pd.DataFrame({
+        "ticker": contributions["ticker"],
+        "trades": 1,
+        "results": gain.notna(),
+        "wins": gain > 0,
+        "losses": gain < 0,
+        "gross_profit": gain.where(gain > 0, 0.0),
+        "gross_loss": -gain.where(gain < 0, 0.0),
+        "holding_seconds": holding.fillna(0.0),
+        "holding_count": holding.notna(),
+    }).dropna(subset=["ticker"])
+    grouped = parts.groupby("ticker", sort=False).sum()
+    return {ticker: [int(row[0]), int(row[1]), int(row[2]), int(row[3]), float(row[4]), float(row[5]),
+                     float(row[6]), int(row[7])]
+            for ticker, row in zip(grouped.index, grouped.to_numpy(dtype="float64"))}
+
+
+class SymbolStatistics:
+    # Per ticker statistics as running state, upsert()/discard() only touch the aggregate of one ticker
+
+    def __init__(self):
+        self.trades = {}
+        self.symbols = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        stats = cls()
+        contributions = frame_contributions(df)
+        stats.trades = {
+            trade_id: (ticker, None if math.isnan(gain) else gain, None if math.isnan(holding) else holding)
+            for trade_id, ticker, gain, holding in zip(contributions.index, contributions["ticker"],
+                                                       contributions["gain"], contributions["holding"])}
+        stats.symbols = aggregate_frame(contributions)
+        return stats
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def add(self, contribution, sign=1):
+        ticker, gain, holding = contribution
+        if ticker is None:
+            return
+        aggregate = self.symbols.setdefault(ticker, [0, 0, 0, 0, 0.0, 0.0, 0.0, 0])
+        aggregate[TRADES] += sign
+        if gain is not None:
+            aggregate[RESULTS] += sign
+            if gain > 0:
+                aggregate[WINS] += sign
+                aggregate[GROSS_PROFIT] += sign * gain
+            elif gain < 0:
+                aggregate[LOSSES] += sign
+                aggregate[GROSS_LOSS] -= sign * gain
+        if holding is not None:
+            aggregate[HOLDING_SECONDS] += sign * holding
+            aggregate[HOLDING_COUNT] += sign
+        if aggregate[TRADES] == 0:
+            del self.symbols[ticker]
+
+    def upsert(self, trade_id, record):
+        # open, close and edit: replace whatever the trade contributed before, also to another ticker
+        # record is the derived journal row, with the rounded values from_frame() reads
+        self.discard(trade_id)
+        contribution = record_contribution(record)
+        self.trades[trade_id] = contribution
+        self.add(contribution)
+
+    def discard(self, trade_id):
+        contribution = self.trades.pop(trade_id, None)
+        if contribution is not None:
+            self.add(contribution, sign=-1)
+
+    def metrics(self, ticker):
+        return metrics_of(self.symbols[ticker])
+
+    def table(self):
+        # all tickers with their metrics, most profitable first
+        table = pd.DataFrame.from_dict({ticker: metrics_of(aggregate) for ticker, aggregate in self.symbols.items()},
+                                       orient="index")
+        if len(table) == 0:
+            return table
+        table = table.astype({"trades": "int64", "wins": "int64", "losses": "int64"})
+        return table.rename_axis("ticker").sort_values("net_profit", ascending=False)
+
+    def top(self, metric, k=5, largest=True, min_results=1):
+        # k best (or worst) tickers by metric as (ticker, value), a heap instead of sorting every ticker
+        candidates = ((ticker, metrics_of(aggregate)[metric]) for ticker, aggregate in self.symbols.items()
+                      if aggregate[RESULTS] >= min_results)
+        candidates = ((ticker, value) for ticker, value in candidates if not math.isnan(value))
+        select = heapq.nlargest if largest else heapq.nsmallest
+        return select(k, candidates, key=lambda item: item[1])
+
+    def verify(self, df):
+        # Verification mode: compare the running state against a full recompute, returns the differing tickers
+        expected = aggregate_frame(frame_contributions(df))
+        return sorted(ticker for ticker in set(expected) | set(self.symbols)
+                      if ticker not in expected or ticker not in self.symbols or
+                      not all(journal_stats.same_value(a, b) for a, b in zip(metrics_of(expected[ticker]).values(),
+                                                                             self.metrics(ticker).values())))
@@ -0,0 +1,146 @@
+import binascii
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import data_specs
+import storage
+from storage import TRADE_ID
+
+# Seeded synthetic journals for benchmarks and demos, generated in chunks so 10M trades never have to
+# be held in memory at once. The same (seed, rows, chunk_rows) always gives the same journal.
+
+# Traded symbols, the first ones are traded far more often than the last ones
+default_tickers = ["AAPL", "MSFT", "TSLA", "NVDA", "AMZN", "GOOGL", "META", "NFLX", "AMD", "INTC", "JPM", "BAC", "XOM",
+                   "CVX", "PFE", "JNJ", "KO", "PEP", "DIS", "NKE", "BA", "CAT", "GS", "V", "MA", "WMT", "COST", "ORCL",
+                   "CRM", "ADBE", "SAP.DE", "SIE.DE", "ALV.DE", "BMW.DE", "VOW3.DE", "S92.DE", "ASML", "SHOP", "UBER",
+                   "PLTR"]
+
+# Uniform value ranges of the analysis fields, the same as the hand written test data used
+value_ranges = {
+    "fundamentals_price_to_earning": (10, 30),
+    "fundamentals_price_to_book": (1, 10),
+    "fundamentals_dept_to_equity": (0.1, 2),
+    "fundamentals_free_cash_flow": (10 ** 6, 10 ** 9),
+    "fundamentals_PEG_ratio": (0.5, 2),
+    "technical_RSI": (0, 100),
+    "technical_trend_mac_d": (-5, 5),
+    "technical_on_balance_volume": (10 ** 6, 10 ** 9),
+    "technical_AD_line": (0, 1),
+    "technical_ADX": (0, 100),
+    "technical_aroon_indicator": (0, 100),
+}
+
+# Fields which are only filled in when a trade is closed (exit date and price, mood on exit, mistake, ...)
+close_columns = [col for col, spec in data_specs.journal_schema.items() if spec.on_close and not spec.on_open]
+
+# Unknown while a trade is open: the close fields, the gain derived from the exit price and the tax on that gain
+open_missing_columns = close_columns + [col for col, spec in data_specs.journal_schema.items()
+                                        if spec.widget == "derived"] + ["tradeinfo_tax"]
+
+ONE_DAY = np.timedelta64(1, "D")
+
+
+def trade_ids(rng, n):
+    # 32 hex digits like storage.new_trade_id, drawn from the seeded generator in one go
+    return np.frombuffer(binascii.hexlify(rng.bytes(16 * n)), dtype="S32").astype(str).astype(object)
+
+
+def numbered(prefix, first, n):
+    return np.char.add(prefix, np.arange(first, first + n).astype(str)).astype(object)
+
+
+def journal_chunk(rng, first, n, start, end, open_fraction, tickers, ticker_weights):
+    # n trades entered between start and end (datetime64[D]), entry dates ascending
+    entry_date = np.sort(start + (rng.random(n) * (end - start).astype("int64")).astype("int64") * ONE_DAY)
+    # holding periods: most trades are short, some are held for months
+    holding_days = np.maximum(np.round(rng.lognormal(np.log(8), 1.0, n)), 1).astype("int64")
+    exit_date = entry_date + holding_days * ONE_DAY
+    # still open: exit after the end of the journal or randomly left open
+    is_open = (exit_date > end) | (rng.random(n) < open_fraction)
+
+    entry_price = np.round(rng.lognormal(np.log(80), 0.9, n), 2)
+    # the move over the holding period grows with its square root, a small drift keeps the journal profitable
+    move = rng.normal(0.001 * holding_days, 0.025 * np.sqrt(holding_days))
+    exit_price = np.round(np.maximum(entry_price * np.exp(move), 0.01), 2)
+    shares = rng.integers(1, 200, n).astype("float64")
+    gain = (exit_price - entry_price) * shares
+    # open trades have only paid the fee of the entry order
+    fees = 1.0 + 0.001 * entry_price * shares * np.where(is_open, 1, 2)
+
+    columns = {
+        TRADE_ID: trade_ids(rng, n),
+        "tradeinfo_Ticker": np.asarray(tickers, dtype=object)[rng.choice(len(tickers), n, p=ticker_weights)],
+        "tradeinfo_entry_date": entry_date.astype("datetime64[ns]"),
+        "tradeinfo_entry_price": entry_price,
+        "tradeinfo_exit_date": exit_date.astype("datetime64[ns]"),
+        "tradeinfo_exit_price": exit_price,
+        "tradeinfo_number_shares": shares,
+        "tradeinfo_gain_percentage": (exit_price / entry_price - 1) * 100,
+        "tradeinfo_gain_absolut": gain,
+        "tradeinfo_tax": 0.25 * np.maximum(gain, 0),
+        "tradeinfo_fees": fees,
+        "fundamentals_additional_ideas": np.full(n, None, dtype=object),
+        "human_trading_idea_description": numbered("Idea ", first + 1, n),
+        "human_reflection_for_improvement": numbered("Improvement ", first + 1, n),
+        "human_picture_path": np.full(n, None, dtype=object),
+    }
+    for col, (low, high) in value_ranges.items():
+        columns[col] = rng.uniform(low, high, n)
+    for col, spec in data_specs.journal_schema.items():
+        if spec.vocabulary is not None:
+            columns[col] = pd.Categorical.from_codes(rng.integers(0, len(spec.vocabulary), n),
+                                                     dtype=data_specs.journal_dtype(col))
+
+    df = pd.DataFrame(columns)[data_specs.journal_data_df_colums]
+    for col in open_missing_columns:
+        df.loc[is_open, col] = None
+    for col, spec in data_specs.journal_schema.items():
+        if spec.rounding is not None:
+            df[col] = df[col].round(spec.rounding)
+        if spec.dtype in ("float64", "float32"):
+            df[col] = df[col].astype(spec.dtype)
+    df.index = pd.RangeIndex(first, first + n)
+    return df
+
+
+def generate_chunks(rows, seed=42, chunk_rows=100_000, start="2015-01-01", end="2024-12-31", open_fraction=0.05,
+                    tickers=default_tickers):
+    # Yields typed journal DataFrames (data_specs layout, trade ids included) of up to chunk_rows trades.
+    # Entry dates ascend over all chunks, every chunk covers its share of the time range.
+    rng = np.random.default_rng(seed)
+    start, end = np.datetime64(start, "D"), np.datetime64(end, "D")
+    ticker_weights = 1.0 / np.arange(1, len(tickers) + 1)
+    ticker_weights /= ticker_weights.sum()
+    span = (end - start).astype("int64")
+    for first in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - first)
+        chunk_start = start + int(span * first // rows) * ONE_DAY
+        chunk_end = start + int(span * (first + n) // rows) * ONE_DAY
+        yield journal_chunk(rng, first, n, chunk_start, max(chunk_end, chunk_start + ONE_DAY), open_fraction,
+                            tickers, ticker_weights)
+
+
+def generate_journal(rows, **kwargs):
+    return pd.concat(generate_chunks(rows, **kwargs))
+
+
+def write_csv(chunks, path):
+    # streamed, only one chunk is in memory
+    rows = 0
+    with open(path, "w", newline="") as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=rows == 0, date_format="%Y-%m-%d")
+            rows += len(chunk)
+    return rows
+
+
+def write_parquet(chunks, path):
+    # one row group per chunk, in the layout ParquetStore writes
+    rows = 0
+    schema = storage.journal_schema(data_specs.journal_data_df_colums)
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    return rows
@@ -0,0 +1,64 @@
+import zlib
+import numpy as np
+import pandas as pd
+import ohlc_cache
+
+# Seeded synthetic bars for benchmarks and offline work: geometric Brownian motion closes with overnight
+# gaps, high/low excursions and volume which rises with the size of the move. The frames have the
+# columns of ohlc_cache.OHLC_COLUMNS, so they go straight into backtest_engine.ExtendedPandasData.
+
+SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60
+# trading days per year, daily and business day bars step one trading day
+TRADING_DAYS = 252
+
+
+def year_fraction(index):
+    # length of one bar in years, daily bars count trading days
+    if len(index) < 2:
+        return 1 / TRADING_DAYS
+    # median spacing, weekends and holidays do not count
+    step = pd.Series(index[:1000]).diff().median().total_seconds()
+    if step >= 24 * 60 * 60:
+        return step / (24 * 60 * 60) / TRADING_DAYS
+    # intraday: 6.5 trading hours per trading day
+    return step / (6.5 * 60 * 60) / TRADING_DAYS
+
+
+def gbm_bars(bars, freq="B", start="2000-01-03", seed=0, price=100.0, drift=0.08, volatility=0.3,
+             volume=10 ** 6, index=None):
+    # bars OHLCV rows, drift and volatility per year. Pass index to generate bars on given timestamps.
+    rng = np.random.default_rng(seed)
+    if index is None:
+        index = pd.date_range(start, periods=bars, freq=freq, name="Date")
+    n = len(index)
+    dt = year_fraction(index)
+    scale = volatility * np.sqrt(dt)
+    # one row of draws per bar: bar i is the same whatever the number of bars generated
+    close_draw, gap_draw, high_draw, low_draw, volume_draw = rng.standard_normal((n, 5)).T
+    returns = (drift - volatility ** 2 / 2) * dt + scale * close_draw
+    close = price * np.exp(np.cumsum(returns))
+    # the open gaps away from the previous close, high and low reach beyond the body of the bar
+    open_ = np.r_[price, close[:-1]] * np.exp(0.25 * scale * gap_draw)
+    high = np.maximum(open_, close) * np.exp(0.5 * scale * np.abs(high_draw))
+    low = np.minimum(open_, close) * np.exp(-0.5 * scale * np.abs(low_draw))
+    traded = np.round(volume * np.exp(0.4 * volume_draw) * (0.5 + np.abs(close_draw)))
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Adj Close": close,
+                         "Volume": traded}, index=pd.DatetimeIndex(index, name="Date"))
+
+
+class SyntheticDownloader:
+    # ohlc_cache downloader with reproducible business day bars per ticker, no network involved.
+    # Every ticker has one fixed path from origin on, so overlapping downloads always agree.
+
+    def __init__(self, seed=0, origin="1990-01-01", **gbm_params):
+        self.seed = seed
+        self.origin = pd.Timestamp(origin)
+        self.gbm_params = gbm_params
+
+    def download(self, ticker, start, end):
+        start, end = max(ohlc_cache.to_day(start), self.origin), ohlc_cache.to_day(end)
+        if end <= start:
+            return pd.DataFrame(columns=ohlc_cache.OHLC_COLUMNS)
+        index = pd.bdate_range(self.origin, end - ohlc_cache.ONE_DAY, name="Date")
+        data = gbm_bars(len(index), seed=[self.seed, zlib.crc32(ticker.encode())], index=index, **self.gbm_params)
+        return data.loc[data.index >= start]
@@ -0,0 +1,26 @@
+import pathlib
+import sys
+import pandas as pd
+import pytest
+
+# the modules live at the repository root, next to app.py
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+import derived_columns
+import journal_log
+import journal_model
+import storage
+import synthetic_journal
+
+# like app.py
+pd.set_option("mode.copy_on_write", True)
+
+
+@pytest.fixture
+def model(tmp_path):
+    # a loaded JournalModel on a small synthetic journal in a CSV store, the way app.py opens the journal
+    store = journal_log.LoggedStore(storage.open_store("csv", tmp_path))
+    store.save(synthetic_journal.generate_journal(300, seed=3))
+    model = journal_model.JournalModel(store, derived_columns.apply_derivations)
+    model.current()
+    return model
+
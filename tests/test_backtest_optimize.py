@@ -0,0 +1,30 @@
+import pytest
+import backtest_optimize
+
+
+def test_range_includes_the_stop_on_a_step():
+    assert backtest_optimize.parse_grid("10:30:5", 20) == [10, 15, 20, 25, 30]
+
+
+def test_range_stops_before_a_stop_off_the_step():
+    assert backtest_optimize.parse_grid("10:30:7", 20) == [10, 17, 24]
+
+
+def test_float_steps():
+    assert backtest_optimize.parse_grid("0.1:0.5:0.1", 0.2) == [0.1, 0.2, 0.3, 0.4, 0.5]
+    assert backtest_optimize.parse_grid("1:2:0.3", 1.5) == [1.0, 1.3, 1.6, 1.9]
+
+
+def test_stop_below_start_is_empty():
+    assert backtest_optimize.parse_grid("30:10:5", 20) == []
+
+
+@pytest.mark.parametrize("text", ["10:30:0", "10:30:-5"])
+def test_step_has_to_be_positive(text):
+    with pytest.raises(ValueError, match="greater than 0"):
+        backtest_optimize.parse_grid(text, 20)
+
+
+def test_lists_and_defaults():
+    assert backtest_optimize.parse_grid("10, 15,20", 20) == [10, 15, 20]
+    assert backtest_optimize.parse_grid("  ", 20) == [20]
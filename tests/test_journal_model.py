@@ -0,0 +1,29 @@
+import pandas as pd
+import derived_columns
+import storage
+
+
+def running_state_mismatches(model, df):
+    return model.stats.verify(df), model.symbols.verify(df), model.rollups.verify(df)
+
+
+def test_edit_with_unrounded_price_matches_a_fresh_load(model):
+    trade = model.closed_trades().iloc[0]
+    trade_id = trade[storage.TRADE_ID]
+    # the journal keeps prices rounded, the running state has to see the rounded price too
+    model.edit_trade(trade_id, {"tradeinfo_exit_price": 12.555, "tradeinfo_number_shares": 1000}, trade)
+    fresh = derived_columns.apply_derivations(model.store.load())
+    assert running_state_mismatches(model, fresh) == ([], [], [])
+    pd.testing.assert_frame_equal(model.current(), fresh, check_categorical=False)
+
+
+def test_open_close_and_delete_follow_the_store(model):
+    trade_id = model.open_trade({"tradeinfo_Ticker": "NVDA", "tradeinfo_entry_date": pd.Timestamp("2024-03-04"),
+                                 "tradeinfo_entry_price": 100.004, "tradeinfo_number_shares": 33})
+    assert running_state_mismatches(model, model.current()) == ([], [], [])
+    model.close_trade(trade_id, {"tradeinfo_exit_date": pd.Timestamp("2024-04-02"),
+                                 "tradeinfo_exit_price": 98.7651}, model.get_trade(trade_id))
+    assert running_state_mismatches(model, derived_columns.apply_derivations(model.store.load())) == ([], [], [])
+    model.delete_trade(trade_id)
+    assert model.get_trade(trade_id) is None
+    assert running_state_mismatches(model, derived_columns.apply_derivations(model.store.load())) == ([], [], [])
@@ -0,0 +1,24 @@
+import pandas as pd
+import derived_columns
+import pnl_rollups
+import storage
+
+
+def test_edit_to_another_day_matches_a_fresh_load(model):
+    trade = model.closed_trades().iloc[0]
+    # into another quarter and year, with prices the journal rounds
+    exit_date = trade["tradeinfo_exit_date"] + pd.DateOffset(months=14)
+    model.edit_trade(trade[storage.TRADE_ID], {"tradeinfo_exit_date": exit_date, "tradeinfo_exit_price": 12.555,
+                                               "tradeinfo_number_shares": 1000, "tradeinfo_fees": 3.3333}, trade)
+    fresh = derived_columns.apply_derivations(model.store.load())
+    assert model.rollups.verify(fresh) == []
+    expected = pnl_rollups.PnlRollups.from_frame(fresh)
+    for level in pnl_rollups.rollup_levels:
+        pd.testing.assert_frame_equal(model.rollups.frame(level), expected.frame(level))
+
+
+def test_reopened_trade_leaves_the_rollups(model):
+    trade = model.closed_trades().iloc[0]
+    model.edit_trade(trade[storage.TRADE_ID], {"tradeinfo_exit_date": None, "tradeinfo_exit_price": None}, trade)
+    assert model.rollups.verify(derived_columns.apply_derivations(model.store.load())) == []
+    assert model.rollups.frame("Year")["trades"].sum() == len(model.closed_trades())
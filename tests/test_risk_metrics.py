@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+import risk_metrics
+
+
+def pandas_metrics(returns, window):
+    gains = pd.Series(returns)
+    rolling = gains.rolling(window)
+    mean, std = rolling.mean(), rolling.std()
+    downside = np.sqrt((gains.clip(upper=0.0) ** 2).rolling(window).mean())
+    return {
+        "sharpe": (mean / std).where(std > 0).to_numpy(),
+        "sortino": (mean / downside).where(downside > 0).to_numpy(),
+        "win_rate": ((gains > 0).rolling(window).mean() * 100).to_numpy(),
+        "expectancy": mean.to_numpy(),
+    }
+
+
+# not 2: the sharpe of two nearly equal gains loses digits in pandas and in the kernel alike
+@pytest.mark.parametrize("window", [1, 5, 20, 333, 10_000])
+def test_rolling_metrics_match_pandas(window):
+    returns = np.random.default_rng(42).normal(20.0, 500.0, 10_000)
+    kernel, reference = risk_metrics.rolling_metrics(returns, window), pandas_metrics(returns, window)
+    for name in reference:
+        np.testing.assert_allclose(kernel[name], reference[name], rtol=1e-7, atol=1e-6, err_msg=name)
+
+
+@pytest.mark.parametrize("window", [1, 3, 7, 10])
+def test_window_sums_of_any_length(window):
+    values = np.arange(1.0, 11.0)
+    expected = pd.Series(values).rolling(window).sum().to_numpy()
+    np.testing.assert_array_equal(risk_metrics.window_sums(values, window), expected)
+    np.testing.assert_array_equal(risk_metrics.window_sums(np.stack([values, -values]), window),
+                                  np.stack([expected, -expected]))
+
+
+def test_window_longer_than_the_series():
+    assert np.isnan(risk_metrics.window_sums(np.ones(3), 4)).all()
+    assert np.isnan(risk_metrics.rolling_metrics(np.ones(3), 4)["sharpe"]).all()
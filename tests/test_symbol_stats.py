@@ -0,0 +1,19 @@
+import pytest
+import derived_columns
+import storage
+import symbol_stats
+
+
+def test_edit_to_another_ticker_matches_a_fresh_load(model):
+    trade = model.closed_trades().iloc[0]
+    ticker = "NVDA" if trade["tradeinfo_Ticker"] != "NVDA" else "MSFT"
+    model.edit_trade(trade[storage.TRADE_ID], {"tradeinfo_Ticker": ticker, "tradeinfo_exit_price": 12.555,
+                                               "tradeinfo_number_shares": 1000}, trade)
+    fresh = derived_columns.apply_derivations(model.store.load())
+    assert model.symbols.verify(fresh) == []
+    expected = symbol_stats.SymbolStatistics.from_frame(fresh)
+    for metric in ["net_profit", "profit_factor", "win_rate"]:
+        for largest in [True, False]:
+            top, wanted = model.symbols.top(metric, 3, largest), expected.top(metric, 3, largest)
+            assert [ticker for ticker, _ in top] == [ticker for ticker, _ in wanted]
+            assert [value for _, value in top] == pytest.approx([value for _, value in wanted])
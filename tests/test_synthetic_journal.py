@@ -0,0 +1,24 @@
+import numpy as np
+import derived_columns
+import journal_stats
+import synthetic_journal
+
+
+def test_open_trades_have_no_close_side_values():
+    df = synthetic_journal.generate_journal(2000, seed=7, chunk_rows=500)
+    is_open = df["tradeinfo_exit_price"].isna()
+    assert is_open.any() and not is_open.all()
+    for col in ["tradeinfo_exit_date", "tradeinfo_gain_absolut", "tradeinfo_gain_percentage", "tradeinfo_tax"]:
+        assert df.loc[is_open, col].isna().all(), col
+        assert df.loc[~is_open, col].notna().all(), col
+    # open trades carry the fee of the entry order only
+    entry_fee = 1.0 + 0.001 * df["tradeinfo_entry_price"] * df["tradeinfo_number_shares"]
+    assert np.allclose(df.loc[is_open, "tradeinfo_fees"], entry_fee[is_open], atol=0.01)
+
+
+def test_open_trades_do_not_count_as_closed():
+    df = derived_columns.apply_derivations(synthetic_journal.generate_journal(2000, seed=7))
+    is_open = df["tradeinfo_exit_price"].isna()
+    assert np.isnan(journal_stats.frame_gains(df)[is_open.to_numpy()]).all()
+    summary = journal_stats.JournalStatistics.from_frame(df).summary()
+    assert summary["winning_trades"] + summary["losing_trades"] <= (~is_open).sum()
@@ -0,0 +1,147 @@
+import functools
+import threading
+import numpy as np
+import pandas as pd
+from storage import TRADE_ID
+
+# Server side trade table of Manage Trades: filtering, sorting and paging run on the journal frame,
+# only the rows of the visible page are styled and sent to the browser.
+
+STATUS_ALL, STATUS_OPEN, STATUS_CLOSED = "All", "Open", "Closed"
+
+# Columns the free text search looks into
+search_columns = ["tradeinfo_Ticker", "fundamentals_additional_ideas", "human_trading_idea_description",
+                  "human_mistake", "human_reflection_for_improvement"]
+
+# Columns colored by gain_colors when they are shown
+gain_colored_columns = ["tradeinfo_gain_percentage"]
+
+
+class TradeTableIndex:
+    # Built once per journal version by the journal model. Sort orders are computed per column on first
+    # use and kept, so sorting a filtered view is a single pass over a precomputed order.
+
+    def __init__(self, df):
+        self.df = df
+        self.lock = threading.Lock()
+        self.orders = {}
+        self.is_open = df["tradeinfo_exit_price"].isna().to_numpy() if "tradeinfo_exit_price" in df.columns \
+            else np.ones(len(df), dtype=bool)
+
+    def __len__(self):
+        return len(self.df)
+
+    def sort_order(self, col):
+        # -> (row positions ascending by col with missing values last, number of rows with a value)
+        with self.lock:
+            if col not in self.orders:
+                values = self.df[col]
+                missing = values.isna().to_numpy()
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    # vocabulary order, e.g. moods from FOMO to Desperate
+                    keys = values.cat.codes.to_numpy()
+                elif values.dtype.kind in "biufM":
+                    keys = values.to_numpy()
+                else:
+                    # text: sort the distinct values case insensitively, then the rows by the rank of their value
+                    codes, uniques = pd.factorize(values)
+                    ranks = np.empty(len(uniques), dtype="int64")
+                    ranks[np.argsort(pd.Index(uniques).astype(str).str.lower().to_numpy(), kind="stable")] = \
+                        np.arange(len(uniques))
+                    keys = np.where(codes >= 0, ranks[codes], -1)
+                order = np.argsort(keys, kind="stable")
+                order = np.concatenate([order[~missing[order]], np.flatnonzero(missing)])
+                self.orders[col] = (order, int((~missing).sum()))
+            return self.orders[col]
+
+    @functools.cached_property
+    def search_text(self):
+        # lower case text of the search columns per row, built on the first search
+        texts = [self.df[col].astype(object).fillna("").astype(str).str.lower()
+                 for col in search_columns if col in self.df.columns]
+        return functools.reduce(lambda a, b: a + "\n" + b, texts) if texts else pd.Series("", index=self.df.index)
+
+    @functools.cached_property
+    def positions(self):
+        # trade id -> row position, built on the first lookup
+        return pd.Index(self.df[TRADE_ID])
+
+    def trades(self, mask, columns=None):
+        # matching rows, only the given columns when asked for
+        df = self.df[mask]
+        return df if columns is None else df[[col for col in columns if col in df.columns]]
+
+    def trade(self, trade_id):
+        # -> the row of a trade or None
+        try:
+            position = self.positions.get_loc(trade_id)
+        except KeyError:
+            return None
+        return self.df.iloc[position] if isinstance(position, (int, np.integer)) else None
+
+    def options(self, col):
+        # values to offer in a filter: the vocabulary of categorical columns, else the values in the journal
+        if col not in self.df.columns:
+            return []
+        values = self.df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return list(values.cat.categories)
+        return sorted(values.dropna().astype(str).unique())
+
+    def entry_date_range(self, start, end):
+        # rows entered between start and end (inclusive days), binary search in the entry date order
+        order, valid = self.sort_order("tradeinfo_entry_date")
+        dates = self.df["tradeinfo_entry_date"].to_numpy()[order[:valid]]
+        low = np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side="left")
+        high = np.searchsorted(dates, np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1)), side="left")
+        in_range = np.zeros(len(self.df), dtype=bool)
+        in_range[order[low:high]] = True
+        return in_range
+
+    def mask(self, tickers=(), status=STATUS_ALL, sectors=(), moods=(), entry_between=None, search=""):
+        # boolean row mask of the filters, empty filters match everything
+        df = self.df
+        mask = np.ones(len(df), dtype=bool)
+        for col, selected in [("tradeinfo_Ticker", tickers), ("fundamentals_sector", sectors),
+                              ("human_mood_on_entry", moods)]:
+            if selected and col in df.columns:
+                mask &= df[col].isin(selected).to_numpy()
+        if status == STATUS_OPEN:
+            mask &= self.is_open
+        elif status == STATUS_CLOSED:
+            mask &= ~self.is_open
+        if entry_between is not None and "tradeinfo_entry_date" in df.columns:
+            mask &= self.entry_date_range(*entry_between)
+        if search:
+            mask &= self.search_text.str.contains(search.lower(), regex=False).to_numpy()
+        return mask
+
+    def rows(self, mask, sort_by=None, ascending=True):
+        # positions of the matching rows in display order, missing values last in both directions
+        if sort_by is None or sort_by not in self.df.columns:
+            return np.flatnonzero(mask)
+        order, valid = self.sort_order(sort_by)
+        if not ascending:
+            order = np.concatenate([order[:valid][::-1], order[valid:]])
+        return order[mask[order]]
+
+    def page(self, rows, page, page_size):
+        # page is 0 based
+        return self.df.iloc[rows[page * page_size:(page + 1) * page_size]]
+
+
+def page_count(rows, page_size):
+    return max((len(rows) + page_size - 1) // page_size, 1)
+
+
+def gain_colors(values):
+    # background per cell: red below 1, green above 1, white otherwise (also for missing values)
+    values = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64")
+    return np.where(values < 1, "background-color: red",
+                    np.where(values > 1, "background-color: green", "background-color: white"))
+
+
+def style_page(page):
+    # one vectorized call per colored column, on the rows of the page only
+    subset = [col for col in gain_colored_columns if col in page.columns]
+    return page.style.apply(gain_colors, subset=subset) if subset else page
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Vectorized fast path for strategies whose rules only look at close prices. Signals, positions and the
+# equity curve are NumPy array operations; only the fills are stepped through, one step per order.
+# The fills follow backtrader's defaults as set up by backtest_engine.build_cerebro: market orders are
+# created on the close of the signal bar and filled on the next open, an order that does not fit into the
+# cash (first checked at the signal close, then at the fill open, commission included) is rejected.
+
+
+def rolling_extreme(close, period, reduce):
+    # reduce over the `period` closes before each bar, like bt.indicators.Highest(close(-1), period)
+    out = np.full(len(close), np.nan)
+    if len(close) > period:
+        out[period:] = reduce(sliding_window_view(close, period), axis=1)[:len(close) - period]
+    return out
+
+
+def buy_and_hold_signals(close):
+    # enter whenever flat, never exit
+    return np.ones(len(close), dtype=bool), np.zeros(len(close), dtype=bool), 1
+
+
+def breakout_signals(close, breakout_period=15, close_period=8):
+    with np.errstate(invalid="ignore"):
+        entries = close > rolling_extreme(close, breakout_period, np.max)
+        exits = close < rolling_extreme(close, close_period, np.min)
+    # warm up of the strategy's indicators: Highest/Lowest of close(-1), RSI(14) and SmoothedMovingAverage(100)
+    return entries, exits, max(breakout_period + 1, close_period + 1, 15, 100)
+
+
+# Strategy class name -> (signal function, order size for the available cash at a price)
+vector_strategies = {
+    "BuyAndHold": (buy_and_hold_signals, lambda cash, price: int(cash / price)),
+    "BreakoutStrategy": (breakout_signals, lambda cash, price: int(cash // price)),
+}
+
+
+def supports(strategy):
+    return getattr(strategy, "__name__", strategy) in vector_strategies
+
+
+def first_next_bar(index, minperiod):
+    # next() only starts once the monthly resampled data1 has a bar (first bar of the second month)
+    # and the indicators of data0 are warmed up
+    months = np.asarray(index.year * 12 + index.month)
+    new_month = np.flatnonzero(months != months[0])
+    return max(minperiod - 1, new_month[0] if len(new_month) else len(index))
+
+
+def simulate(open_, close, entries, exits, start, cash, comission, size_for):
+    # Steps from fill to fill: the next candidate bar is found with searchsorted on the signal bars
+    commission = comission / 100
+    n = len(close)
+    entry_bars = np.flatnonzero(entries[start:]) + start
+    exit_bars = np.flatnonzero(exits[start:]) + start
+    trades = []
+    bar = start
+    while True:
+        candidates = entry_bars[np.searchsorted(entry_bars, bar):]
+        entered = None
+        for signal in candidates:
+            # last bar: the order is never filled
+            if signal + 1 >= n:
+                break
+            size = size_for(cash, close[signal])
+            if size <= 0:
+                continue
+            if cash - size * close[signal] - size * close[signal] * commission < 0:
+                continue
+            fill_price = open_[signal + 1]
+            if cash - size * fill_price - size * fill_price * commission < 0:
+                continue
+            entered = signal + 1, size, fill_price
+            break
+        if entered is None:
+            break
+        entry_bar, size, entry_price = entered
+        entry_comm = size * entry_price * commission
+        cash = cash - size * entry_price - entry_comm
+        trade = {"entry_bar": entry_bar, "size": size, "entry_price": entry_price, "entry_comm": entry_comm}
+        trades.append(trade)
+
+        # the strategy sees the position from the fill bar on
+        pending = exit_bars[np.searchsorted(exit_bars, entry_bar):]
+        if len(pending) == 0 or pending[0] + 1 >= n:
+            break
+        exit_bar = pending[0] + 1
+        exit_price = open_[exit_bar]
+        exit_comm = size * exit_price * commission
+        cash = cash + size * exit_price - exit_comm
+        pnl = size * (exit_price - entry_price)
+        trade.update(exit_bar=exit_bar, exit_price=exit_price, exit_comm=exit_comm, pnl=pnl,
+                     pnlcomm=pnl - entry_comm - exit_comm)
+        bar = exit_bar
+    return trades
+
+
+def equity_curve(close, trades, cash):
+    # cash and shares as step functions of the fills, value = cash + shares * close
+    n = len(close)
+    cash_flow = np.zeros(n)
+    share_flow = np.zeros(n)
+    for trade in trades:
+        cash_flow[trade["entry_bar"]] -= trade["size"] * trade["entry_price"] + trade["entry_comm"]
+        share_flow[trade["entry_bar"]] += trade["size"]
+        if "exit_bar" in trade:
+            cash_flow[trade["exit_bar"]] += trade["size"] * trade["exit_price"] - trade["exit_comm"]
+            share_flow[trade["exit_bar"]] -= trade["size"]
+    return cash + np.cumsum(cash_flow) + np.cumsum(share_flow) * close
+
+
+def run_backtest(OHLC_dataframe, strategy, cash, comission, strategy_params=None):
+    # -> (trades DataFrame, equity Series, summary with the keys of backtest_engine.summarize)
+    name = getattr(strategy, "__name__", strategy)
+    signal_function, size_for = vector_strategies[name]
+    open_ = OHLC_dataframe["Open"].to_numpy(dtype="float64")
+    close = OHLC_dataframe["Close"].to_numpy(dtype="float64")
+    entries, exits, minperiod = signal_function(close, **(strategy_params or {}))
+    start = first_next_bar(OHLC_dataframe.index, minperiod)
+
+    trades = simulate(open_, close, entries, exits, start, cash, comission, size_for)
+    equity = pd.Series(equity_curve(close, trades, cash), index=OHLC_dataframe.index)
+
+    trades = pd.DataFrame(trades, columns=["entry_bar", "size", "entry_price", "entry_comm",
+                                           "exit_bar", "exit_price", "exit_comm", "pnl", "pnlcomm"])
+    trades["entry_date"] = OHLC_dataframe.index[trades["entry_bar"].to_numpy(dtype=int)]
+    closed = trades[trades["exit_bar"].notna()]
+    trades["exit_date"] = pd.Series(OHLC_dataframe.index[closed["exit_bar"].to_numpy(dtype=int)], index=closed.index)
+
+    # backtrader counts a trade with pnlcomm == 0 as won
+    won = int((closed["pnlcomm"] >= 0).sum())
+    values = equity.to_numpy()
+    peak = np.maximum.accumulate(values)
+    final_value = float(values[-1]) if len(values) else cash
+    summary = {
+        'trades': len(closed),
+        'wins': won,
+        'losses': len(closed) - won,
+        'win_rate': won / len(closed) * 100 if len(closed) else float('nan'),
+        'final_value': final_value,
+        'gain': final_value - cash,
+        'max_drawdown': float(np.max((peak - values) / peak) * 100) if len(values) else 0.0,
+    }
+    return trades, equity, summary